@@ -1,113 +1,355 @@
 #!/usr/bin/env python3
 """
 gamepad2car.py - Control a car using gamepad and PyVESC with video game-like controls
+
+Startup only loads what the selected mode uses: pygame and the SDL joystick
+subsystem are started for a local gamepad only, and the helper modules
+import their heavy dependencies (cProfile, http.server, ctypes...) only
+when their option is used. Run startup_budget.py to check the time to the
+first VESC command.
 """
 
+import gc
 import os
+import struct
 import sys
 import time
+from binascii import crc_hqx
 
 # Set environment variables to prevent D-Bus issues
 os.environ["SDL_AUDIODRIVER"] = "dummy"
 os.environ["SDL_DBUS_SCREENSAVER_INHIBIT"] = "0"
 
-import pygame
-import serial.tools.list_ports
-from serial import Serial, SerialException
-import pyvesc
+from serial import SerialException
 import argparse
 from pyvesc import SetDutyCycle, SetRPM, SetCurrent, SetCurrentBrake, SetPosition
-from gamepad_config import GamepadConfig, Colors
+from gamepad_config import GamepadConfig, Colors, init_input, quit_input, merge_config, device_guid, pygame
+from vehicle_model import DUTY, RPM, CURRENT, BRAKE
+from vesc_telemetry import FeedbackReader
+from traction_control import TractionControl
+from loop_profiler import LoopProfiler, NullTickTimer, PROFILE_MODES, DETERMINISTIC
+from loop_metrics import LoopMetrics, MetricsServer
+from remote_link import RemoteGamepad, REMOTE_PORT
+from vesc_transport import open_transport
+from realtime import apply_realtime, print_report as print_realtime_report, SCHED_FIFO
+from link_probe import probe_port, PROBE_REQUESTS, PROBE_RATE, DEFAULT_PROBE_REQUEST
+from live_state import (LiveStateWriter, LIVE_STATE_NAME, COMMAND_KINDS, FLAG_REVERSE, FLAG_CRUISE,
+                        FLAG_BOOST, FLAG_GAMEPAD, FLAG_VESC)
+from session_log import SessionWriter, SESSION_DIR, NO_INPUTS, NO_TELEMETRY, new_session_path
 import logging
 
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+# Frame of the single int32 command messages: start byte, length, id, value, CRC, end byte
+COMMAND_FRAME = struct.Struct(">BBBiHB")
+COMMAND_PAYLOAD = struct.Struct(">Bi")
+COMMAND_CRC = struct.Struct(">H")
+
+# VESC wire scales: duty x1e5, currents in mA, position x1e6
+DUTY_SCALE = 100000
+CURRENT_SCALE = 1000
+POSITION_SCALE = 1000000
+
+# Command kind, limit setting and wire scale of each performance.control_mode
+MODE_COMMANDS = {
+    "duty_cycle": (DUTY, "max_duty_cycle", DUTY_SCALE),
+    "rpm": (RPM, "max_rpm", 1),
+    "current": (CURRENT, "max_current", CURRENT_SCALE),
+}
+
+# Command kind, limit setting and wire scale of the proportional brake
+BRAKE_COMMAND = (BRAKE, "max_brake_current", CURRENT_SCALE)
+
+# Seconds between two checks of the configuration file for changes
+CONFIG_CHECK_INTERVAL = 1.0
+
+# Telemetry field giving the operating point in each command kind's units, for a mode switch
+# ramp starting from what the motor does; older telemetry (s) waits for a new reply
+HANDOVER_FIELDS = {DUTY: "duty", RPM: "rpm", CURRENT: "current_motor"}
+HANDOVER_TELEMETRY_AGE = 0.1
+
+
+def next_deadline(deadline, period, now):
+    """Advance a periodic deadline; missed periods are skipped instead of run in a burst"""
+    deadline += period
+    if deadline <= now:
+        deadline = now + period
+    return deadline
+
+
+def blend_throttle_brake(throttle_value, brake_value):
+    """Combine throttle and brake inputs into the (throttle, brake) actually applied.
+
+    Rules:
+    - Any brake input (past its deadzone) wins and the throttle is ignored,
+      so the motor never drives against the brake.
+    - Braking is proportional: the brake value scales max_brake_current.
+    - Without brake input the throttle drives as usual.
+    """
+    if brake_value > 0.0:
+        return 0.0, brake_value
+    return throttle_value, 0.0
+
+
+class CommandPacket:
+    """A preallocated VESC frame for one int32 command, re-encoded in place.
+
+    Equivalent to pyvesc.encode(Message(value)) but without building a
+    message object and a new bytes packet on every call. The returned
+    buffer is overwritten by the next encode().
+    """
+
+    def __init__(self, message_id):
+        self.id = message_id
+        self.buffer = bytearray(COMMAND_FRAME.size)
+        COMMAND_FRAME.pack_into(self.buffer, 0, 2, COMMAND_PAYLOAD.size, message_id, 0, 0, 3)
+        self._payload = memoryview(self.buffer)[2:2 + COMMAND_PAYLOAD.size]
+        self._crc_offset = 2 + COMMAND_PAYLOAD.size
+
+    def encode(self, value):
+        """Encode an int32 value and return the frame buffer"""
+        buffer = self.buffer
+        COMMAND_PAYLOAD.pack_into(buffer, 2, self.id, value)
+        COMMAND_CRC.pack_into(buffer, self._crc_offset, crc_hqx(self._payload, 0))
+        return buffer
+
+
+class CommandEncoder:
+    """One CommandPacket per command kind, for the control loop"""
+
+    def __init__(self):
+        self.duty = CommandPacket(SetDutyCycle.id)
+        self.rpm = CommandPacket(SetRPM.id)
+        self.current = CommandPacket(SetCurrent.id)
+        self.brake = CommandPacket(SetCurrentBrake.id)
+        self.position = CommandPacket(SetPosition.id)
+
+    def steering(self, position):
+        """Encode a steering position in [-1, 1]"""
+        return self.position.encode(int(position * POSITION_SCALE))
+
+
+class CommandStrategy:
+    """One control mode, or the brake, compiled from the performance settings.
+
+    The limit and the VESC wire scale are resolved once, so a tick turns
+    the throttle or brake input into a command and a packet without looking
+    up the mode or the settings again. This is the only way commands are
+    encoded, in the controller as in the tools replaying or timing them.
+    """
+
+    def __init__(self, mode, performance, packet, command=None):
+        self.mode = mode
+        self.kind, limit, self.wire_scale = command or MODE_COMMANDS[mode]
+        self.scale = getattr(performance, limit)
+        self.packet = packet
+
+    def value(self, input_value):
+        """Command value in physical units (duty fraction, ERPM or amps)"""
+        return input_value * self.scale
+
+    def encode(self, value):
+        """Encode a command value into the strategy's packet, in place"""
+        return self.packet.encode(int(value * self.wire_scale))
+
+
+def compile_strategies(performance, encoder):
+    """A CommandStrategy per control mode, sharing the encoder's packets"""
+    packets = {DUTY: encoder.duty, RPM: encoder.rpm, CURRENT: encoder.current}
+    return {mode: CommandStrategy(mode, performance, packets[kind])
+            for mode, (kind, _, _) in MODE_COMMANDS.items()}
+
+
+def compile_brake(performance, encoder):
+    """The proportional brake's CommandStrategy: brake input to current up to max_brake_current"""
+    return CommandStrategy(BRAKE, performance, encoder.brake, BRAKE_COMMAND)
 
 
 class GamepadController:
-    def __init__(self, config_only=False):
+    def __init__(self, config_only=False, remote_port=None, share_state=LIVE_STATE_NAME, serial_port=None,
+                 realtime=None, performance=None, session_dir=None):
         self.running = True
         self.config_manager = GamepadConfig()
         logging.debug("GamepadConfig initialized")
         self.joystick = None
+        self.joystick_id = None     # SDL instance id of the gamepad driving the car
+        self.lost_time = None       # When the driving gamepad was lost, until it is resumed
+        self.lost_guid = None       # GUID of the lost gamepad: only the same model resumes on its own
+        self.standby = {}           # Other gamepads, by instance id, that take over with the takeover button
         self.serial_conn = None
+        self.metrics = LoopMetrics()
+        self.remote = None
+        self.live_state = None
+        self.session = None
+        self.encoder = CommandEncoder()
+        self.gc_thresholds = gc.get_threshold()
 
         # Control state variables
         self.throttle = 0.0
         self.steering = 0.0  # Initialize steering to 0
+        self.brake = 0.0
         self.in_reverse_gear = False
         self.cruise_control_active = False
         self.cruise_control_speed = 0.0
         self.boost_active = False
+        self.estop_requested = False
+        self.throttle_interlock = False
+        self.last_command = ("", 0.0)
+        self.steering_position = 0.0
+        self.buttons = []
+        self.tick = 0
+        self.overrides = {}
+
+        # Command strategy of the active control mode, the ramp from the previous mode's
+        # command after a switch, and a switch waiting for that command to be known
+        self.strategies = {}
+        self.strategy = None
+        self.brake_strategy = None
+        self.mode_ramp = 1.0
+        self.mode_ramp_step = 1.0
+        self.mode_ramp_start = 0.0
+        self.pending_mode = None
 
         # Settings from configuration
         self.config = self.config_manager.config
+        self.settings = self.config_manager.settings
 
         # Run calibration if requested
         if config_only:
             self.config_manager.run_calibration_menu()
             return
         logging.debug("Calibration menu completed")
-        
+
+        # Command line overrides of the VESC port (e.g. a simulator's pty), loop rates and scheduling
+        # options; kept to be merged again over a reloaded configuration file
+        if serial_port:
+            self.overrides.setdefault("performance", {})["serial_port"] = serial_port
+        if performance:
+            self.overrides.setdefault("performance", {}).update(performance)
+        if realtime:
+            self.overrides["realtime"] = dict(realtime)
+        if self.overrides:
+            self.config_manager.config = merge_config(self.config_manager.config, self.overrides)
+            self.config_manager.update_settings()
+
         # Settings from configuration
         self.config = self.config_manager.config
+        self.settings = self.config_manager.settings
 
-        # Initialize PyGame for controller input
-        logging.debug("About to initialize pygame modules")
-        # Initialize only necessary subsystems
-        try:
-            pygame.display.init()  # Pour l'affichage uniquement
-            logging.debug("Display module initialized")
-        except Exception as e:
-            logging.error(f"Failed to initialize display: {e}")
-            # Try with dummy display
-            os.environ["SDL_VIDEODRIVER"] = "dummy"
-            try:
-                pygame.display.init()
-                logging.debug("Display module initialized with dummy driver")
-            except Exception as e:
-                logging.error(f"Failed even with dummy display: {e}")
-
-        pygame.joystick.init() # Pour les manettes uniquement
-        logging.debug("Joystick module initialized")
+        # Optional closed-loop traction control fed by VESC telemetry
+        self.feedback = FeedbackReader()
+        self.traction = TractionControl(self.settings.traction_control,
+                                        1.0 / self.settings.performance.command_rate_hz)
+        self.last_command_time = None
+        self.strategies = compile_strategies(self.settings.performance, self.encoder)
+        self.strategy = self.strategies[self.settings.performance.control_mode]
+        self.brake_strategy = compile_brake(self.settings.performance, self.encoder)
 
-        # Connect to the gamepad
-        self.connect_gamepad()
+        # Connect to the gamepad, local or over the UDP link. Only a local gamepad
+        # needs pygame and SDL, which connect_gamepad() starts
+        if remote_port is not None:
+            self.remote = RemoteGamepad(remote_port)
+            try:
+                self.remote.open()
+                print(f"{Colors.YELLOW}Waiting for a remote gamepad on UDP port {self.remote.port}...{Colors.RESET}")
+            except OSError as e:
+                print(f"{Colors.RED}Cannot listen on UDP port {remote_port}: {e}{Colors.RESET}")
+                self.remote = None
+        else:
+            self.connect_gamepad()
 
         # Connect to the VESC
         self.connect_vesc()
 
+        # Publish the per-tick state for the GUI and other tools
+        if share_state:
+            self.live_state = LiveStateWriter(share_state)
+            try:
+                self.live_state.open()
+            except OSError as e:
+                print(f"{Colors.YELLOW}Live state sharing disabled: {e}{Colors.RESET}")
+                self.live_state = None
+
+        # Record every command tick for analysis after the run (session_log.py)
+        if session_dir:
+            path = new_session_path(session_dir)
+            self.session = SessionWriter(path, {"performance": self.config["performance"],
+                                                "traction_control": self.config["traction_control"]})
+            try:
+                self.session.open()
+                print(f"{Colors.GREEN}Recording the session to {path}{Colors.RESET}")
+            except OSError as e:
+                print(f"{Colors.YELLOW}Session recording disabled: {e}{Colors.RESET}")
+                self.session = None
+
     def connect_gamepad(self):
-        """Connect to gamepad"""
+        """Connect to the first gamepad"""
         print(f"{Colors.YELLOW}Looking for gamepad...{Colors.RESET}")
+        init_input()
 
         # Check if any joysticks/gamepads are connected
         if pygame.joystick.get_count() < 1:
             print(f"{Colors.RED}No gamepads found. Please connect a gamepad.{Colors.RESET}")
             return False
 
-        # Initialize the first joystick
-        self.joystick = pygame.joystick.Joystick(0)
-        self.joystick.init()
+        self.attach_joystick(pygame.joystick.Joystick(0))
+        return True
+
+    def attach_joystick(self, joystick):
+        """Drive with joystick from now on, tracked by its SDL instance id"""
+        joystick.init()
+        self.joystick = joystick
+        self.joystick_id = joystick.get_instance_id()
 
         # Let the config manager know about the joystick
-        self.config_manager.joystick = self.joystick
+        self.config_manager.joystick = joystick
+
+        self.metrics.gamepad_connects += 1
 
         # Display gamepad info
-        name = self.joystick.get_name()
-        print(f"{Colors.GREEN}Connected to: {name}{Colors.RESET}")
+        print(f"{Colors.GREEN}Connected to: {joystick.get_name()}{Colors.RESET}")
 
-        return True
+        # Mapping and calibration of this gamepad, prebuilt when the configuration was loaded.
+        # The same gamepad coming back keeps the ones in use
+        guid = device_guid(joystick)
+        if guid is None or guid != self.config_manager.device_guid:
+            self.config_manager.attach_profile(joystick)
+            self.config = self.config_manager.config
+            self.settings = self.config_manager.settings
+
+    def resume_gamepad(self, joystick):
+        """Drive with joystick, opened after the previous gamepad was lost"""
+        start = time.perf_counter()
+        self.attach_joystick(joystick)
+        self.resume_driving()
+        elapsed = time.perf_counter() - start
+        self.metrics.gamepad_resume_seconds = elapsed
+        outage = f" after {start - self.lost_time:.1f} s without a gamepad" if self.lost_time is not None else ""
+        self.lost_time = None
+        self.lost_guid = None
+        self.standby.clear()
+        print(f"{Colors.GREEN}Gamepad resumed in {elapsed * 1000:.1f} ms{outage}; "
+              f"return the throttle to neutral to drive{Colors.RESET}")
+
+    def resume_driving(self):
+        """Reset the per-period input state of a reconnected gamepad and hold the throttle at zero until neutral"""
+        # Samples and button latches from before the loss must not reach the first command,
+        # and the reconnected trigger may read 0 again until it moves
+        self.config_manager.averager = None
+        self.config_manager.brake_moved = False
+        self.estop_requested = False
+        self.throttle_interlock = True
 
     def connect_vesc(self):
         """Connect to the VESC motor controller"""
-        serial_port = self.config['performance'].get('serial_port', '/dev/ttyACM0')
-        baud_rate = self.config['performance'].get('baud_rate', 115200)
+        serial_port = self.settings.performance.serial_port
+        baud_rate = self.settings.performance.baud_rate
+        transport = self.settings.performance.serial_transport
 
         try:
-            self.serial_conn = Serial(serial_port, baud_rate, timeout=0.05)
-            print(f"{Colors.GREEN}Connected to VESC at {serial_port}{Colors.RESET}")
+            self.serial_conn = open_transport(transport, serial_port, baud_rate, timeout=0.05)
+            self.metrics.vesc_connects += 1
+            print(f"{Colors.GREEN}Connected to VESC at {serial_port} ({transport}){Colors.RESET}")
             return True
-        except SerialException as e:
+        except (SerialException, OSError) as e:
             print(f"{Colors.RED}Error connecting to VESC: {e}{Colors.RESET}")
             print(f"Make sure the VESC is connected to {serial_port} and you have permission to access it.")
             print("You may need to run: sudo chmod 666 " + serial_port)
@@ -119,73 +361,120 @@ class GamepadController:
             return
 
         try:
-            # Get control mode and max values from config
-            control_mode = self.config['performance']['control_mode']
-            max_duty_cycle = self.config['performance']['max_duty_cycle']
-            max_rpm = self.config['performance']['max_rpm']
-            max_current = self.config['performance']['max_current']
+            performance = self.settings.performance
 
             # Apply boost if active
             if self.boost_active:
-                boost_multiplier = self.config['performance']['boost_multiplier']
-                throttle_value *= boost_multiplier
+                throttle_value *= performance.boost_multiplier
 
             # Apply reverse gear if active
             if self.in_reverse_gear and throttle_value > 0:
                 throttle_value = -throttle_value
 
-            # Scale the throttle value based on the control mode
-            if control_mode == 'duty_cycle':
-                # Duty cycle ranges from -1.0 to 1.0 (converted to int for PyVESC)
-                scaled_value = int(throttle_value * max_duty_cycle * 100000)
-                msg = SetDutyCycle(scaled_value)
-            elif control_mode == 'rpm':
-                # RPM control
-                scaled_value = int(throttle_value * max_rpm)
-                msg = SetRPM(scaled_value)
-            elif control_mode == 'current':
-                # Current control
-                scaled_value = throttle_value * max_current
-                msg = SetCurrent(scaled_value)
-            else:
-                # Default to duty cycle
-                scaled_value = int(throttle_value * max_duty_cycle * 100000)
-                msg = SetDutyCycle(scaled_value)
+            # Limit the rise of the command when the wheel spins up too fast
+            if self.settings.traction_control.enabled:
+                throttle_value = self.apply_traction_control(throttle_value)
+
+            # Scale the throttle value with the active control mode's strategy
+            strategy = self.strategy
+            value = strategy.value(throttle_value)
+
+            # After a control mode switch, blend from the command the previous mode was sending
+            # so the motor doesn't jerk. Releasing the throttle ends the blend at once
+            if self.mode_ramp < 1.0:
+                if throttle_value == 0.0:
+                    self.mode_ramp = 1.0
+                else:
+                    value = self.mode_ramp_start + (value - self.mode_ramp_start) * self.mode_ramp
 
-            # Encode and send the message
-            packet = pyvesc.encode(msg)
-            self.serial_conn.write(packet)
+            # Encode and send
+            self.write_packet(strategy.encode(value))
+            self.last_command = (strategy.kind, value)
 
         except Exception as e:
+            self.metrics.serial_errors += 1
             print(f"{Colors.RED}Error sending command to VESC: {e}{Colors.RESET}")
-            
+
+    def apply_traction_control(self, throttle_value):
+        """Feed the latest VESC telemetry to traction control and limit the command.
+
+        The reply to the previous tick's GetValues request is read without
+        blocking and a new request is sent, so feedback lags one tick.
+        """
+        now = time.monotonic()
+        dt = now - self.last_command_time if self.last_command_time is not None else 0.0
+        self.last_command_time = now
+
+        telemetry = self.poll_feedback()
+        if telemetry is not None:
+            self.traction.update_feedback(telemetry.rpm, telemetry.current_motor, telemetry.timestamp)
+        return self.traction.limit(throttle_value, dt)
+
+    def restart_command(self):
+        """Restart the throttle command from zero, as after braking: end traction control's limit and any mode ramp"""
+        self.traction.reset()
+        # The next throttle tick rises from zero instead of over the time spent without throttle commands
+        self.last_command_time = None
+        self.mode_ramp = 1.0
+
+    def poll_feedback(self):
+        """Read the reply to the previous GetValues request and send the next one"""
+        telemetry = self.feedback.poll(self.serial_conn)
+        self.metrics.record_write(self.feedback.request(self.serial_conn))
+        return telemetry
+
+    def send_brake_to_vesc(self, brake_value):
+        """Send a proportional regenerative brake command (brake_value in [0, 1])"""
+        if self.serial_conn is None or not self.serial_conn.is_open:
+            return
+
+        try:
+            brake = self.brake_strategy
+            current = brake.value(brake_value)
+            self.write_packet(brake.encode(current))
+            self.last_command = (BRAKE, current)
+            self.restart_command()
+        except Exception as e:
+            self.metrics.serial_errors += 1
+            print(f"{Colors.RED}Error sending brake command to VESC: {e}{Colors.RESET}")
+
+    def write_packet(self, packet):
+        """Write an encoded packet to the VESC and count it"""
+        self.serial_conn.write(packet)
+        self.metrics.record_write(len(packet))
+
+    def send_drive_command(self):
+        """Send either the throttle or the brake command for this tick"""
+        throttle_value, brake_value = blend_throttle_brake(self.throttle, self.brake)
+        if self.pending_mode is not None:
+            self.retry_mode_switch()
+        if self.mode_ramp < 1.0:
+            self.mode_ramp = min(1.0, self.mode_ramp + self.mode_ramp_step)
+        if brake_value > 0.0:
+            self.send_brake_to_vesc(brake_value)
+        else:
+            self.send_to_vesc(throttle_value)
+
     def send_steering_to_vesc(self, steering_value):
         """Send steering command to the VESC for direction control"""
         if self.serial_conn is None or not self.serial_conn.is_open:
             return
 
         try:
-            # Get maximum steering angle from config (default to 1.0 if not set)
-            max_steering_angle = self.config['performance'].get('max_steering_angle', 1.0)
+            # Get maximum steering angle from config
+            max_steering_angle = self.settings.performance.max_steering_angle
             
             # Scale the steering value (-1.0 to 1.0) to the appropriate range for SetPosition
-            # Limit to the range that fits in a 32-bit signed integer
-            # SetPosition expects a value between -1.0 and 1.0 multiplied by 1000000
-            # Make sure we stay within int32 limits (-2147483648 to 2147483647)
             scaled_value = steering_value * max_steering_angle
             # Clamp the value to ensure it stays within bounds
             scaled_value = max(-0.9, min(0.9, scaled_value))
-            # Now multiply by 1000000 as required by VESC protocol for the SetPosition command
-            scaled_position = int(scaled_value * 1000000)
-            
-            # Create the SetPosition message
-            msg = SetPosition(scaled_position)
-            
-            # Encode and send the message
-            packet = pyvesc.encode(msg)
-            self.serial_conn.write(packet)
+
+            # SetPosition carries the value multiplied by 1000000 on the wire
+            self.write_packet(self.encoder.steering(scaled_value))
+            self.steering_position = scaled_value
             
         except Exception as e:
+            self.metrics.serial_errors += 1
             print(f"{Colors.RED}Error sending steering command to VESC: {e}{Colors.RESET}")
 
     def handle_events(self):
@@ -194,40 +483,215 @@ class GamepadController:
             if event.type == pygame.QUIT:
                 self.running = False
 
-            # Handle controller disconnect/reconnect
+            # Hotplug: only the driving gamepad, tracked by its SDL instance id, matters.
+            # Another gamepad being plugged in or removed never interrupts control
             if event.type == pygame.JOYDEVICEREMOVED:
-                print(f"{Colors.RED}Gamepad disconnected!{Colors.RESET}")
-                self.joystick = None
-                self.config_manager.joystick = None
-                # Send zero throttle for safety
-                self.throttle = 0.0
-                self.send_to_vesc(0.0)
+                if self.joystick is not None and event.instance_id == self.joystick_id:
+                    print(f"{Colors.RED}Gamepad disconnected!{Colors.RESET}")
+                    self.gamepad_lost()
+                    self.open_standby_gamepads()
+                elif self.joystick is not None:
+                    print(f"\n{Colors.YELLOW}Another gamepad was disconnected; "
+                          f"still driving with {self.joystick.get_name()}{Colors.RESET}")
+                else:
+                    self.standby.pop(event.instance_id, None)
 
-            if event.type == pygame.JOYDEVICEADDED:
-                print(f"{Colors.GREEN}Gamepad connected!{Colors.RESET}")
-                self.connect_gamepad()
+            # SDL also reports the gamepads present at startup, including the driving one:
+            # a new device is only considered while there is none
+            if event.type == pygame.JOYDEVICEADDED and self.joystick is None:
+                self.gamepad_added(pygame.joystick.Joystick(event.device_index))
 
-            # Handle button presses for control toggles
+            # Handle button presses of the driving gamepad for control toggles, and the
+            # takeover button of another gamepad while none drives
             if event.type == pygame.JOYBUTTONDOWN:
-                # Toggle reverse gear
-                if self.config_manager.is_button_pressed("reverse"):
-                    self.in_reverse_gear = not self.in_reverse_gear
-                    print(f"{Colors.YELLOW}Reverse gear: {'ON' if self.in_reverse_gear else 'OFF'}{Colors.RESET}")
-                    # Apply brakes when switching gears
-                    self.send_emergency_brake()
-                    time.sleep(0.1)
-
-                # Toggle cruise control
-                if self.config_manager.is_button_pressed("cruise_toggle"):
-                    if not self.cruise_control_active:
-                        # Activate cruise control at current speed
-                        self.cruise_control_active = True
-                        self.cruise_control_speed = self.throttle
-                        print(f"{Colors.YELLOW}Cruise control activated at: {self.cruise_control_speed:.2f}{Colors.RESET}")
-                    else:
-                        # Deactivate cruise control
-                        self.cruise_control_active = False
-                        print(f"{Colors.YELLOW}Cruise control deactivated{Colors.RESET}")
+                if event.instance_id == self.joystick_id:
+                    self.handle_button_down()
+                elif (self.joystick is None and event.instance_id in self.standby
+                      and event.button == self.settings.controls.takeover_btn):
+                    self.resume_gamepad(self.standby[event.instance_id])
+
+    def gamepad_added(self, joystick):
+        """Resume with a gamepad plugged in while none drives, or hold it until its takeover button.
+
+        Without a gamepad since startup the first one plugged in drives. After
+        a loss, only a gamepad with the lost one's GUID resumes on its own, so
+        a different pad plugged in nearby can't take the car.
+        """
+        guid = device_guid(joystick)
+        if self.lost_time is None or (guid is not None and guid == self.lost_guid):
+            self.resume_gamepad(joystick)
+            return
+        joystick.init()
+        self.standby[joystick.get_instance_id()] = joystick
+        print(f"\n{Colors.YELLOW}{joystick.get_name()} connected; press its button "
+              f"{self.settings.controls.takeover_btn} to drive with it{Colors.RESET}")
+
+    def open_standby_gamepads(self):
+        """Open the gamepads still plugged in after a loss so their takeover button is seen"""
+        for index in range(pygame.joystick.get_count()):
+            joystick = pygame.joystick.Joystick(index)
+            joystick.init()
+            self.standby[joystick.get_instance_id()] = joystick
+        if self.standby:
+            print(f"{Colors.YELLOW}Press button {self.settings.controls.takeover_btn} on another gamepad "
+                  f"to drive with it{Colors.RESET}")
+
+    def handle_button_down(self):
+        """Apply the control toggles for a button press"""
+        # Toggle reverse gear
+        if self.config_manager.is_button_pressed("reverse"):
+            self.in_reverse_gear = not self.in_reverse_gear
+            print(f"{Colors.YELLOW}Reverse gear: {'ON' if self.in_reverse_gear else 'OFF'}{Colors.RESET}")
+            # Apply brakes when switching gears
+            self.send_emergency_brake()
+            time.sleep(0.1)
+
+        # Switch to the next control mode
+        if self.config_manager.is_button_pressed("mode_cycle"):
+            self.cycle_control_mode()
+
+        # Toggle cruise control
+        if self.config_manager.is_button_pressed("cruise_toggle"):
+            if not self.cruise_control_active:
+                # Activate cruise control at current speed
+                self.cruise_control_active = True
+                self.cruise_control_speed = self.throttle
+                print(f"{Colors.YELLOW}Cruise control activated at: {self.cruise_control_speed:.2f}{Colors.RESET}")
+            else:
+                # Deactivate cruise control
+                self.cruise_control_active = False
+                print(f"{Colors.YELLOW}Cruise control deactivated{Colors.RESET}")
+
+    def switch_control_mode(self, mode, ramp=True):
+        """Send commands through mode's strategy from the next tick on; returns False if the switch waits.
+
+        Called between two ticks, so a tick always uses a single strategy.
+        With ramp, the command starts from the one the previous mode was
+        sending, in the new mode's units, and blends into the stick's over
+        performance.mode_ramp_time. Between two kinds of command, that value is
+        the motor's operating point from a recent GetValues reply; without
+        one, the previous mode keeps driving until a reply arrives or the
+        throttle is released (see retry_mode_switch()).
+        """
+        performance = self.settings.performance
+        strategy = self.strategies[mode]
+        ramp = ramp and performance.mode_ramp_time > 0
+        start = self.handover_value(strategy) if ramp else 0.0
+        if start is None:
+            self.pending_mode = mode
+            return False
+
+        self.pending_mode = None
+        self.strategy = strategy
+        self.restart_command()
+        if ramp and start != 0.0:
+            # Traction control goes on limiting rises from the handover command
+            self.traction.reset(max(-1.0, min(1.0, start / strategy.scale)))
+            self.mode_ramp_start = start
+            self.mode_ramp = 0.0
+            self.mode_ramp_step = 1.0 / (performance.mode_ramp_time * performance.command_rate_hz)
+        return True
+
+    def handover_value(self, strategy):
+        """The command the active strategy is sending, in strategy's units; None while it isn't known"""
+        kind, value = self.last_command
+        if kind != self.strategy.kind or value == 0.0:
+            # Braking, or no throttle: the new mode starts from zero anyway
+            return 0.0
+        if strategy.kind == kind:
+            return value
+        telemetry = self.feedback.latest
+        if telemetry is None or time.monotonic() - telemetry.timestamp > HANDOVER_TELEMETRY_AGE:
+            return None
+        return getattr(telemetry, HANDOVER_FIELDS[strategy.kind])
+
+    def retry_mode_switch(self):
+        """Complete a switch waiting for the operating point, with a new GetValues reply if one arrived"""
+        # Traction control and the session log exchange GetValues every tick already
+        if (not self.settings.traction_control.enabled and self.session is None
+                and self.serial_conn is not None and self.serial_conn.is_open):
+            try:
+                self.poll_feedback()
+            except Exception as e:
+                self.metrics.serial_errors += 1
+                print(f"{Colors.RED}Error reading VESC telemetry: {e}{Colors.RESET}")
+        mode = self.pending_mode
+        if self.switch_control_mode(mode):
+            print(f"\n{Colors.YELLOW}Control mode: {mode}{Colors.RESET}")
+
+    def cycle_control_mode(self):
+        """Switch to the next control mode (mode cycle button); not saved to the configuration"""
+        modes = list(self.strategies)
+        mode = modes[(modes.index(self.pending_mode or self.strategy.mode) + 1) % len(modes)]
+        if self.switch_control_mode(mode):
+            print(f"\n{Colors.YELLOW}Control mode: {mode}{Colors.RESET}")
+        else:
+            print(f"\n{Colors.YELLOW}Control mode: {mode} once the VESC reports its operating point "
+                  f"or the throttle is released{Colors.RESET}")
+
+    def reload_config(self):
+        """Apply the configuration file if it changed since it was read.
+
+        The strategies are recompiled from the new limits. A mode picked with
+        the button is kept unless the file changes the control mode itself;
+        the command ramps over whenever the active mode or its limit changed.
+        Traction control keeps its state unless its own settings changed.
+        """
+        previous_settings = self.settings
+        previous = self.strategy
+        if not self.config_manager.reload_config(self.overrides):
+            return False
+        self.config = self.config_manager.config
+        self.settings = self.config_manager.settings
+        if (self.settings.traction_control != previous_settings.traction_control
+                or self.settings.performance.command_rate_hz != previous_settings.performance.command_rate_hz):
+            self.traction = TractionControl(self.settings.traction_control,
+                                            1.0 / self.settings.performance.command_rate_hz)
+            self.last_command_time = None
+        mode = self.settings.performance.control_mode
+        if mode == previous_settings.performance.control_mode:
+            mode = self.pending_mode or previous.mode
+        self.strategies = compile_strategies(self.settings.performance, self.encoder)
+        self.brake_strategy = compile_brake(self.settings.performance, self.encoder)
+        current = self.strategies[mode]
+        if (current.mode, current.scale) == (previous.mode, previous.scale):
+            # Same command as before: keep driving, without a ramp or a restart
+            self.strategy = current
+            self.pending_mode = None
+        else:
+            self.switch_control_mode(mode)
+        return True
+
+    def gamepad_lost(self):
+        """Drop the gamepad and stop driving until it comes back"""
+        self.metrics.gamepad_disconnects += 1
+        self.lost_guid = device_guid(self.joystick) if self.joystick is not None else None
+        self.joystick = None
+        self.joystick_id = None
+        self.lost_time = time.perf_counter()
+        self.config_manager.joystick = None
+        # Send zero throttle for safety; cruise must not resume on reconnect
+        self.throttle = 0.0
+        self.cruise_control_active = False
+        self.send_to_vesc(0.0)
+
+    def poll_remote(self):
+        """Read the UDP gamepad link and fail safe when it goes quiet"""
+        pressed = self.remote.poll()
+        if self.remote.active and self.joystick is None:
+            self.joystick = self.remote
+            self.config_manager.joystick = self.remote
+            self.metrics.gamepad_connects += 1
+            print(f"\n{Colors.GREEN}Connected to: {self.remote.get_name()}{Colors.RESET}")
+            if self.lost_time is not None:
+                self.lost_time = None
+                self.resume_driving()
+        elif not self.remote.active and self.joystick is not None:
+            print(f"\n{Colors.RED}Remote gamepad link lost ({self.remote.loss_ratio:.1%} packets lost, "
+                  f"jitter {self.remote.jitter * 1000:.1f} ms)!{Colors.RESET}")
+            self.gamepad_lost()
+        elif pressed:
+            self.handle_button_down()
 
     def send_emergency_brake(self):
         """Apply emergency brake"""
@@ -238,13 +702,13 @@ class GamepadController:
         # Apply brake and then zero throttle
         if self.serial_conn and self.serial_conn.is_open:
             try:
-                max_current = self.config['performance']['max_current']
-                msg = SetCurrentBrake(max_current)
-                packet = pyvesc.encode(msg)
-                self.serial_conn.write(packet)
+                max_current = self.settings.performance.max_current
+                self.write_packet(self.brake_strategy.encode(max_current))
+                self.restart_command()
                 time.sleep(0.1)  # Short delay to ensure brake is applied
                 self.send_to_vesc(0.0)
             except Exception as e:
+                self.metrics.serial_errors += 1
                 print(f"{Colors.RED}Error applying emergency brake: {e}{Colors.RESET}")
 
     def update_controls(self):
@@ -253,24 +717,27 @@ class GamepadController:
             return
 
         try:
-            # Check for emergency stop
-            if self.config_manager.is_button_pressed("emergency_stop"):
+            # Check for emergency stop, pressed at any input sample since the last command
+            if self.estop_requested or self.config_manager.is_button_pressed("emergency_stop"):
+                self.estop_requested = False
                 self.send_emergency_brake()
                 return
 
             # Check boost button
             self.boost_active = self.config_manager.is_button_pressed("boost")
 
+            # Average of the axes sampled since the last command, normalized in one step
+            throttle_value, steering_value, brake_value = self.config_manager.read_averaged_controls()
+
             # Handle cruise control
             if self.cruise_control_active:
                 # Use the current cruise control speed
                 self.throttle = self.cruise_control_speed
 
                 # Allow fine adjustment with throttle controls
-                throttle_value = self.config_manager.get_control_value("throttle")
                 if abs(throttle_value) > 0.5:  # Significant throttle input
                     # Adjust cruise control speed
-                    increment = self.config['performance']['cruise_increment']
+                    increment = self.settings.performance.cruise_increment
                     if throttle_value > 0:
                         self.cruise_control_speed += increment
                     else:
@@ -281,23 +748,25 @@ class GamepadController:
                     self.throttle = self.cruise_control_speed
                     print(f"{Colors.YELLOW}Cruise speed adjusted to: {self.cruise_control_speed:.2f}{Colors.RESET}")
 
-                # Brake pedal or brake button cancels cruise control
-                if self.config_manager.get_control_value("brake") > 0.2:
+                # Any brake input cancels cruise control
+                if brake_value > 0.0:
                     self.cruise_control_active = False
                     self.throttle = 0.0
                     print(f"{Colors.YELLOW}Cruise control deactivated by brake{Colors.RESET}")
             else:
-                # Normal throttle control
-                self.throttle = self.config_manager.get_control_value("throttle")
-
-            # Steering control
-            steering_raw = self.config_manager.get_control_value("steering")
-            # Apply deadzone and make sure we get a clean zero when not touching the controller
-            deadzone = self.config['calibration'].get('steering_deadzone', 0.05)
-            if abs(steering_raw) < deadzone:
-                self.steering = 0.0
-            else:
-                self.steering = steering_raw
+                # Normal throttle control; after a reconnect the stick must first return to neutral
+                if self.throttle_interlock:
+                    if throttle_value != 0.0:
+                        throttle_value = 0.0
+                    else:
+                        self.throttle_interlock = False
+                self.throttle = throttle_value
+
+            # Proportional brake, blended with the throttle when commands are sent
+            self.brake = brake_value
+
+            # Steering control (deadzone already applied by the normalizer)
+            self.steering = steering_value
 
         except Exception as e:
             print(f"{Colors.RED}Error reading gamepad: {e}{Colors.RESET}")
@@ -305,8 +774,14 @@ class GamepadController:
     def display_controls(self):
         """Display current control state"""
         status = []
+        if self.pending_mode is not None:
+            status.append(f"{self.strategy.mode}>{self.pending_mode}")
+        else:
+            status.append(self.strategy.mode if self.mode_ramp >= 1.0 else f"{self.strategy.mode} {self.mode_ramp:.0%}")
         status.append(f"Throttle: {self.throttle:+.2f}")
         status.append(f"Steering: {self.steering:+.2f}")
+        if self.brake > 0.0:
+            status.append(f"{Colors.RED}BRAKE:{self.brake:.2f}{Colors.RESET}")
 
         if self.in_reverse_gear:
             status.append(f"{Colors.RED}REVERSE{Colors.RESET}")
@@ -319,11 +794,144 @@ class GamepadController:
 
         print(f"\r{' | '.join(status)}", end="")
 
-    def run(self):
-        """Main control loop"""
+    def state_flags(self):
+        """live_state FLAG_* bits of the current control state"""
+        return ((FLAG_REVERSE if self.in_reverse_gear else 0)
+                | (FLAG_CRUISE if self.cruise_control_active else 0)
+                | (FLAG_BOOST if self.boost_active else 0)
+                | (FLAG_GAMEPAD if self.joystick is not None else 0)
+                | (FLAG_VESC if self.serial_conn is not None and self.serial_conn.is_open else 0))
+
+    def publish_state(self):
+        """Copy this tick's inputs, controls and commands into the shared live state"""
+        joystick = self.joystick
+        buttons = self.read_buttons() if joystick else ()
+        self.live_state.publish(self.tick, self.config_manager.last_axes if joystick else (), buttons,
+                                (self.throttle, self.steering, self.brake), self.last_command,
+                                self.steering_position, self.state_flags(), self.cruise_control_speed,
+                                self.feedback.latest)
+
+    def read_buttons(self):
+        """Read every button of the gamepad once into self.buttons and return it"""
+        get_button = self.joystick.get_button
+        buttons = self.buttons
+        num_buttons = self.joystick.get_numbuttons()
+        if len(buttons) != num_buttons:
+            buttons = self.buttons = [0] * num_buttons
+        # Fill the same list every tick instead of building a new one
+        for i in range(num_buttons):
+            buttons[i] = get_button(i)
+        return buttons
+
+    def record_session(self, tick_start, tick_seconds):
+        """Append this tick's inputs, controls, commands and telemetry to the session log"""
+        axes = self.config_manager.last_axes
+        controls = self.settings.controls
+        if self.joystick is not None and len(axes) > max(controls.throttle_axis, controls.steering_axis,
+                                                         controls.brake_axis):
+            inputs = (axes[controls.throttle_axis], axes[controls.steering_axis], axes[controls.brake_axis])
+        else:
+            inputs = NO_INPUTS
+        telemetry = self.feedback.latest
+        telemetry = (NO_TELEMETRY if telemetry is None else
+                     (telemetry.rpm, telemetry.current_motor, telemetry.current_in, telemetry.duty,
+                      telemetry.voltage, telemetry.temp_fet))
+        kind, value = self.last_command
+        self.session.record((tick_start - self.session.start, tick_seconds, *inputs,
+                             self.throttle, self.steering, self.brake, COMMAND_KINDS.index(kind), value,
+                             self.steering_position, self.state_flags(), *telemetry))
+
+    def control_state(self):
+        """Current control state, as gauges for the metrics endpoint"""
+        return {
+            "throttle": self.throttle,
+            "steering": self.steering,
+            "brake": self.brake,
+            "reverse": self.in_reverse_gear,
+            "cruise": self.cruise_control_active,
+            "boost": self.boost_active,
+            "gamepad_connected": self.joystick is not None,
+            "vesc_connected": self.serial_conn is not None and self.serial_conn.is_open,
+        }
+
+    def sample_tick(self):
+        """One input sample: handle the events and add the axes to the command period's average"""
+        # Handle pygame events (including controller connect/disconnect), or
+        # the UDP link that replaces the local gamepad
+        if self.remote is None:
+            self.handle_events()
+        else:
+            self.poll_remote()
+
+        if self.joystick is not None:
+            self.config_manager.sample_controls()
+            # Latch the emergency stop so a tap between two commands isn't missed
+            if self.config_manager.is_button_pressed("emergency_stop"):
+                self.estop_requested = True
+        self.metrics.input_samples += 1
+
+    def control_tick(self, timer):
+        """One command tick: shape the sampled inputs, send the commands and publish the state.
+
+        Commands are encoded into preallocated packets and the inputs read into
+        reused buffers, so a tick leaves nothing behind for the cyclic GC.
+        """
+        # Update control values from the inputs sampled since the last command
+        self.update_controls()
+        timer.lap("controls")
+
+        # Send commands to VESC
+        self.send_drive_command()
+        timer.lap("drive")
+
+        # Only send steering commands if there's an actual steering input
+        # This prevents unnecessary commands when the joystick is centered
+        self.send_steering_to_vesc(self.steering)
+        timer.lap("steering")
+
+        # Traction control already exchanges GetValues each tick; the session log needs it too
+        if (self.session is not None and not self.settings.traction_control.enabled
+                and self.serial_conn is not None and self.serial_conn.is_open):
+            try:
+                self.poll_feedback()
+            except Exception as e:
+                self.metrics.serial_errors += 1
+                print(f"{Colors.RED}Error reading VESC telemetry: {e}{Colors.RESET}")
+
+        self.tick += 1
+        if self.live_state is not None:
+            self.publish_state()
+        timer.lap("publish")
+
+    def collect_garbage(self):
+        """Run the cyclic GC, with the automatic collector's thresholds, when a collection is due"""
+        count0, count1, count2 = gc.get_count()
+        threshold0, threshold1, threshold2 = self.gc_thresholds
+        if count0 < threshold0:
+            return
+        if count2 >= threshold2:
+            generation = 2
+        elif count1 >= threshold1:
+            generation = 1
+        else:
+            generation = 0
+        gc.collect(generation)
+        self.metrics.gc_collections += 1
+
+    def run(self, profiler=None, metrics_server=None):
+        """Main control loop; with a LoopProfiler, stop once its duration has elapsed.
+
+        Inputs are sampled at performance.input_rate_hz and commands sent at
+        performance.command_rate_hz, each on its own deadline; the loop sleeps
+        until whichever comes first.
+        """
+        performance = self.settings.performance
         print(f"\n{Colors.CYAN}=== Gamepad to Car Controller ==={Colors.RESET}")
         print("-" * 50)
-        print(f"Control mode: {self.config['performance']['control_mode']}")
+        print(f"Control mode: {performance.control_mode}")
+        print(f"Inputs sampled at {performance.input_rate_hz:g} Hz, commands sent at {performance.command_rate_hz:g} Hz")
+        if self.settings.traction_control.enabled:
+            print(f"Traction control: ON (spin threshold {self.settings.traction_control.max_wheel_accel:.0f} ERPM/s)")
         print(f"{Colors.YELLOW}Controls:{Colors.RESET}")
         print("  Throttle/Brake: Mapped in configuration")
         print("  Steering: Mapped in configuration")
@@ -331,55 +939,198 @@ class GamepadController:
         print("  X Button: Toggle reverse gear")
         print("  B Button: Emergency stop")
         print("  Y Button: Toggle cruise control")
+        print("  Back Button: Next control mode")
         print("  Ctrl+C: Quit")
         print(f"{Colors.YELLOW}Tip: Run with --config to calibrate your gamepad{Colors.RESET}")
         print("-" * 50)
 
+        timer = profiler.timer if profiler else NullTickTimer()
+        if profiler:
+            print(f"{Colors.YELLOW}Profiling the control loop for {profiler.duration:.0f} s ({profiler.mode}){Colors.RESET}")
+            profiler.start()
+
+        if metrics_server:
+            metrics_server.start()
+
+        # After the helper threads have started, so only the control thread is pinned or promoted
+        print_realtime_report(apply_realtime(self.settings.realtime))
+        record_tick = self.metrics.record_tick
+
+        # Everything allocated during startup lives for the whole run: move it out of
+        # the collector's reach, and collect only at idle points of the loop from now on
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+
         try:
             last_display_time = 0
+            input_period = 1.0 / performance.input_rate_hz
+            command_period = 1.0 / performance.command_rate_hz
+            clock = time.perf_counter
+            next_sample = next_command = clock()
+            next_config_check = next_command + CONFIG_CHECK_INTERVAL
+            timer.start()
 
             while self.running:
-                # Handle pygame events (including controller connect/disconnect)
-                self.handle_events()
+                now = clock()
+                # Sample first, so a command due at the same time includes this sample
+                if now >= next_sample:
+                    self.sample_tick()
+                    next_sample = next_deadline(next_sample, input_period, now)
+                    timer.lap("inputs")
 
-                # Update control values from gamepad
-                self.update_controls()
+                if now >= next_command:
+                    timer.start()
+                    tick_start = clock()
+                    self.control_tick(timer)
 
-                # Send commands to VESC
-                self.send_to_vesc(self.throttle)
-                
-                # Only send steering commands if there's an actual steering input
-                # This prevents unnecessary commands when the joystick is centered
-                self.send_steering_to_vesc(self.steering)
+                    # Display current values (but not too frequently)
+                    current_time = time.time()
+                    if current_time - last_display_time > 0.3:  # Update display every 0.3 seconds
+                        self.display_controls()
+                        last_display_time = current_time
+                    timer.lap("display")
+                    tick_seconds = clock() - tick_start
+                    record_tick(tick_seconds)
+                    if self.session is not None:
+                        self.record_session(tick_start, tick_seconds)
 
-                # Display current values (but not too frequently)
-                current_time = time.time()
-                if current_time - last_display_time > 0.3:  # Update display every 0.3 seconds
-                    self.display_controls()
-                    last_display_time = current_time
+                    if profiler and profiler.expired():
+                        break
 
-                # Sleep to reduce CPU usage
-                time.sleep(0.01)
+                    # The tick's work is done: this is the one point where collecting is harmless
+                    self.collect_garbage()
+                    timer.lap("gc")
+
+                    # Configuration changes take effect here, between two ticks
+                    if now >= next_config_check:
+                        self.reload_config()
+                        next_config_check = now + CONFIG_CHECK_INTERVAL
+                    timer.lap("config")
+                    next_command = next_deadline(next_command, command_period, now)
+
+                # Sleep until the next sample or command is due
+                delay = min(next_sample, next_command) - clock()
+                if delay > 0:
+                    time.sleep(delay)
+                timer.lap("sleep")
 
         except KeyboardInterrupt:
             print(f"\n{Colors.YELLOW}Exiting...{Colors.RESET}")
         finally:
+            gc.enable()
+            if profiler:
+                profiler.stop()
+            if metrics_server:
+                metrics_server.stop()
+
             # Cleanup
             if self.serial_conn and self.serial_conn.is_open:
                 # Send zero command before closing
                 self.send_to_vesc(0.0)
                 self.serial_conn.close()
 
-            pygame.quit()
+            if self.remote is not None:
+                self.remote.close()
+            if self.live_state is not None:
+                self.live_state.close()
+            if self.session is not None:
+                self.session.close()
+                print(f"\n{Colors.GREEN}Session saved: {self.session.rows} ticks in {self.session.directory} "
+                      f"(./session_log.py report){Colors.RESET}")
+
+            quit_input()
             print(f"\n{Colors.GREEN}Controller stopped. Goodbye!{Colors.RESET}")
 
 
 if __name__ == "__main__":
+    # Configured here rather than at import, so tools importing this module keep their own logging
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
     parser = argparse.ArgumentParser(description='Control a car with a gamepad using PyVESC')
     parser.add_argument('--config', action='store_true', help='Run gamepad configuration and calibration')
+    parser.add_argument('--auto-calibrate', action='store_true',
+                        help='Calibrate all axes automatically (no keyboard needed) and save the configuration')
+    parser.add_argument('--profile', type=float, metavar='SECONDS',
+                        help='Run the control loop for SECONDS while profiling it, then write the results')
+    parser.add_argument('--profile-mode', choices=PROFILE_MODES, default=DETERMINISTIC,
+                        help='deterministic: cProfile .pstats (adds overhead to every call); '
+                             'sampling: collapsed stacks for flamegraphs (low overhead)')
+    parser.add_argument('--profile-output', metavar='PREFIX',
+                        help='Path prefix of the profile files (default: gamepad2car-profile-<date>)')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='Serve loop and link metrics on http://127.0.0.1:PORT/metrics (Prometheus) and /metrics.json')
+    parser.add_argument('--metrics-socket', metavar='PATH',
+                        help='Serve the same metrics on a Unix socket instead of a TCP port')
+    parser.add_argument('--remote-listen', type=int, metavar='PORT', nargs='?', const=REMOTE_PORT,
+                        help=f'Take the gamepad from the UDP link (remote_link.py send) instead of a local device '
+                             f'(default port {REMOTE_PORT})')
+    parser.add_argument('--share-state', default=LIVE_STATE_NAME, metavar='NAME',
+                        help=f'Shared memory block the live state is published to (default {LIVE_STATE_NAME})')
+    parser.add_argument('--no-share-state', dest='share_state', action='store_const', const=None,
+                        help='Do not publish the live state')
+    parser.add_argument('--session-dir', default=SESSION_DIR, metavar='DIR',
+                        help=f'Directory the session log is recorded under (default {SESSION_DIR})')
+    parser.add_argument('--no-session', dest='session_dir', action='store_const', const=None,
+                        help='Do not record the session')
+    parser.add_argument('--serial-port', metavar='PATH',
+                        help='VESC serial port, overriding the configuration (e.g. a vesc_simulator.py pty)')
+    parser.add_argument('--probe-link', type=float, metavar='SECONDS',
+                        help='Measure the serial link round-trip latency, loss and throughput ceiling '
+                             'for SECONDS, print a report and exit (no gamepad needed)')
+    parser.add_argument('--probe-rate', type=float, default=PROBE_RATE, metavar='HZ',
+                        help=f'Request rate of the link probe (default {PROBE_RATE:g})')
+    parser.add_argument('--probe-request', choices=sorted(PROBE_REQUESTS), default=DEFAULT_PROBE_REQUEST,
+                        help='Request timed by the link probe: GetValues or the firmware version')
+    parser.add_argument('--input-rate', type=float, metavar='HZ',
+                        help='Gamepad sampling rate, overriding performance.input_rate_hz (up to 1000)')
+    parser.add_argument('--command-rate', type=float, metavar='HZ',
+                        help='VESC command rate, overriding performance.command_rate_hz')
+    parser.add_argument('--cpu', type=int, metavar='N', help='Pin the control thread to CPU N')
+    parser.add_argument('--sched-fifo', type=int, metavar='PRIORITY', nargs='?', const=50,
+                        help='Run the control thread under SCHED_FIFO (default priority 50; needs CAP_SYS_NICE)')
+    parser.add_argument('--nice', type=int, metavar='LEVEL', help='Nice level of the control thread (-20 to 19)')
+    parser.add_argument('--mlockall', action='store_true', help='Lock the process memory in RAM (mlockall)')
     args = parser.parse_args()
     logging.debug("Command line arguments parsed")
-    controller = GamepadController(config_only=args.config)
+
+    rates = {}
+    if args.input_rate is not None:
+        rates["input_rate_hz"] = args.input_rate
+    if args.command_rate is not None:
+        rates["command_rate_hz"] = args.command_rate
+
+    realtime = {}
+    if args.cpu is not None:
+        realtime["cpu"] = args.cpu
+    if args.sched_fifo is not None:
+        realtime.update(scheduler=SCHED_FIFO, priority=args.sched_fifo)
+    if args.nice is not None:
+        realtime["nice"] = args.nice
+    if args.mlockall:
+        realtime["lock_memory"] = True
+
+    if args.auto_calibrate:
+        config_manager = GamepadConfig()
+        if config_manager.connect_gamepad() and config_manager.auto_calibrate():
+            config_manager.save_config()
+        quit_input()
+        sys.exit(0)
+    if args.probe_link:
+        performance = GamepadConfig().settings.performance
+        sys.exit(probe_port(args.serial_port or performance.serial_port, performance.baud_rate,
+                            performance.serial_transport, args.probe_link, args.probe_rate,
+                            args.probe_request))
+    controller = GamepadController(config_only=args.config, remote_port=args.remote_listen,
+                                   share_state=args.share_state, serial_port=args.serial_port,
+                                   realtime=realtime, performance=rates, session_dir=args.session_dir)
     logging.debug("GamepadController initialized")
     if not args.config:
-        controller.run()
\ No newline at end of file
+        profiler = None
+        if args.profile:
+            profiler = LoopProfiler(args.profile, args.profile_mode, args.profile_output)
+        metrics_server = None
+        if args.metrics_port is not None or args.metrics_socket:
+            metrics_server = MetricsServer(controller.metrics, controller.control_state,
+                                           port=args.metrics_port, socket_path=args.metrics_socket)
+        controller.run(profiler, metrics_server)
\ No newline at end of file
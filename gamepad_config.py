@@ -7,19 +7,47 @@ This module provides:
 2. Control mapping customization
 3. Configuration saving/loading
 4. User-friendly key handling
+
+pygame and numpy are imported lazily, on first use: tools that only need
+the configuration (trace replay, the link probe) never load them, and SDL
+subsystems are started only when gamepad input is actually read.
 """
 
 import os
+import copy
+import importlib.util
 import json
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
 # Set environment variables to prevent D-Bus issues BEFORE importing pygame
 os.environ["SDL_AUDIODRIVER"] = "dummy"
 os.environ["SDL_DBUS_SCREENSAVER_INHIBIT"] = "0"
 os.environ["SDL_VIDEODRIVER"] = "dummy"  # Prevent display initialization issues
+# pygame may now be loaded in the middle of the controller's output
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
 
-import pygame
 import time
 import sys
 
+
+def lazy_import(name):
+    """Return module name, executed only when one of its attributes is first used"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+np = lazy_import("numpy")
+pygame = lazy_import("pygame")
+
 # Default configuration
 DEFAULT_CONFIG = {
     # Control mappings
@@ -31,32 +59,90 @@ DEFAULT_CONFIG = {
         "boost_btn": 0,           # A button (F710)
         "reverse_btn": 2,         # X button (F710)
         "cruise_toggle_btn": 3,   # Y button (F710)
+        "mode_cycle_btn": 6,      # Back button (F710): switch to the next control mode
+        "takeover_btn": 7,        # Start button (F710): drive with this gamepad after the driving one was lost
     },
     # Calibration settings
     "calibration": {
         "throttle_deadzone": 0.05,
         "steering_deadzone": 0.05,
+        "brake_deadzone": 0.05,
         "throttle_min": -1.0,
         "throttle_max": 1.0,
         "steering_min": -1.0,
         "steering_max": 1.0,
         "invert_throttle": True,   # Invert throttle so pushing up is positive
         "invert_steering": False,
+        "axes": {},                # Per-axis results of automatic calibration, keyed by axis index
     },
     # Performance settings
     "performance": {
         "max_duty_cycle": 0.3,    # Maximum duty cycle (0.0 to 1.0)
         "max_rpm": 5000,          # Maximum motor RPM
         "max_current": 10,        # Maximum motor current (Amps)
+        "max_brake_current": 20,  # Brake current at full brake trigger (Amps)
         "max_steering_angle": 1.0, # Maximum steering angle (-1.0 to 1.0)
         "control_mode": "duty_cycle",  # Options: 'duty_cycle', 'rpm', 'current'
         "boost_multiplier": 1.5,  # Multiplier when boost button is pressed
         "cruise_increment": 0.05, # Increment for cruise control
-    }
+        "serial_port": "/dev/ttyACM0",  # VESC serial port
+        "baud_rate": 115200,      # VESC serial baud rate
+        "serial_transport": "pyserial",  # "pyserial" or "rawfd" (termios fd written with os.write)
+        "input_rate_hz": 500,     # Gamepad sampling rate; samples are averaged over each command period
+        "command_rate_hz": 100,   # Rate of the motor and steering commands sent to the VESC
+        "mode_ramp_time": 0.5,    # Seconds for the command to ramp back in after a control mode switch
+    },
+    # Closed-loop launch/traction control (uses VESC feedback every tick)
+    "traction_control": {
+        "enabled": False,
+        "max_wheel_accel": 30000.0,  # Wheel acceleration (ERPM/s) above which the wheel is considered spinning
+        "min_current": 1.0,          # Motor current (A) below which the wheel isn't being driven
+        "rise_rate": 4.0,            # Max throttle increase per second with grip (full scale in 0.25 s)
+        "slip_rise_rate": 0.5,       # Max throttle increase per second while spinning
+        "slip_cutback": 0.9,         # Fraction of the command kept each tick while spinning
+    },
+    # Scheduling of the control thread (see realtime.py); privileged options fall back with a report
+    "realtime": {
+        "cpu": -1,              # CPU to pin the control thread to, -1 to leave it free
+        "scheduler": "other",   # "other" (normal) or "fifo" (SCHED_FIFO, needs CAP_SYS_NICE)
+        "priority": 50,         # SCHED_FIFO priority (1-99)
+        "nice": 0,              # Nice level under the normal scheduler (negative needs CAP_SYS_NICE)
+        "lock_memory": False,   # mlockall() so the loop never waits on a page fault
+    },
+    # Mapping and calibration per gamepad, keyed by SDL joystick GUID: {"name", "controls", "calibration"}.
+    # The top-level controls and calibration apply to gamepads without a profile
+    "profiles": {},
 }
 
+CONTROL_MODES = ("duty_cycle", "rpm", "current")
+
+SERIAL_TRANSPORTS = ("pyserial", "rawfd")
+
+SCHEDULERS = ("other", "fifo")
+
 CONFIG_FILE = "gamepad_config.json"
 
+# Sections a device profile can override
+PROFILE_SECTIONS = ("controls", "calibration")
+
+# Settings a running controller can't pick up from a reloaded file: they need a restart
+RESTART_SETTINGS = {
+    "performance": ("serial_port", "baud_rate", "serial_transport", "input_rate_hz", "command_rate_hz"),
+    "realtime": tuple(DEFAULT_CONFIG["realtime"]),
+}
+
+# Highest gamepad sampling rate (Hz): SDL's joystick state doesn't update faster in practice
+MAX_INPUT_RATE_HZ = 1000.0
+
+# Automatic calibration: sampling rate, phase durations (s) and deadzone derivation
+AUTO_CALIBRATION_RATE_HZ = 500
+AUTO_CALIBRATION_REST_TIME = 2.0
+AUTO_CALIBRATION_SWEEP_TIME = 6.0
+DEADZONE_NOISE_MARGIN = 1.5    # Deadzone = margin x largest deviation from centre at rest
+MIN_AUTO_DEADZONE = 0.02
+MAX_AUTO_DEADZONE = 0.3
+MIN_AXIS_TRAVEL = 0.5          # Axes that moved less than this during the sweep are left as is
+
 class Colors:
     """ANSI color codes for terminal output"""
     BLACK = "\033[0;30m"
@@ -70,53 +156,650 @@ class Colors:
     BOLD = "\033[1m"
     RESET = "\033[0m"
 
+
+
+class ConfigError(ValueError):
+    """Raised when a configuration does not match the expected schema"""
+
+
+class ControlsConfig(NamedTuple):
+    """Validated control mappings (axis and button indices)"""
+    throttle_axis: int
+    brake_axis: int
+    steering_axis: int
+    emergency_stop_btn: int
+    boost_btn: int
+    reverse_btn: int
+    cruise_toggle_btn: int
+    mode_cycle_btn: int
+    takeover_btn: int
+
+
+class AxisCalibration(NamedTuple):
+    """Measured calibration of a single axis"""
+    center: float
+    min: float
+    max: float
+    deadzone: float
+    noise: float
+
+
+class CalibrationConfig(NamedTuple):
+    """Validated axis calibration settings"""
+    throttle_deadzone: float
+    steering_deadzone: float
+    brake_deadzone: float
+    throttle_min: float
+    throttle_max: float
+    steering_min: float
+    steering_max: float
+    invert_throttle: bool
+    invert_steering: bool
+    axes: Mapping[int, AxisCalibration]
+
+
+class PerformanceConfig(NamedTuple):
+    """Validated performance settings"""
+    max_duty_cycle: float
+    max_rpm: float
+    max_current: float
+    max_brake_current: float
+    max_steering_angle: float
+    control_mode: str
+    boost_multiplier: float
+    cruise_increment: float
+    serial_port: str
+    baud_rate: int
+    serial_transport: str
+    input_rate_hz: float
+    command_rate_hz: float
+    mode_ramp_time: float
+
+
+class TractionConfig(NamedTuple):
+    """Validated traction control settings"""
+    enabled: bool
+    max_wheel_accel: float
+    min_current: float
+    rise_rate: float
+    slip_rise_rate: float
+    slip_cutback: float
+
+
+class RealtimeConfig(NamedTuple):
+    """Validated scheduling options of the control thread"""
+    cpu: int
+    scheduler: str
+    priority: int
+    nice: int
+    lock_memory: bool
+
+
+class Settings(NamedTuple):
+    """Immutable, fully validated view of the configuration.
+
+    Built once when the configuration is loaded or changed, so the control
+    loop can read plain attributes without fallbacks or KeyError handling.
+    """
+    controls: ControlsConfig
+    calibration: CalibrationConfig
+    performance: PerformanceConfig
+    traction_control: TractionConfig
+    realtime: RealtimeConfig
+
+
+# Inclusive (min, max) bounds for numeric settings; None means unbounded
+VALUE_RANGES = {
+    "controls": {key: (0, None) for key in ControlsConfig._fields},
+    "calibration": {
+        "throttle_deadzone": (0.0, 1.0),
+        "steering_deadzone": (0.0, 1.0),
+        "brake_deadzone": (0.0, 1.0),
+        "throttle_min": (-1.0, 1.0),
+        "throttle_max": (-1.0, 1.0),
+        "steering_min": (-1.0, 1.0),
+        "steering_max": (-1.0, 1.0),
+    },
+    "performance": {
+        "max_duty_cycle": (0.0, 1.0),
+        "max_rpm": (0.0, None),
+        "max_current": (0.0, None),
+        "max_brake_current": (0.0, None),
+        "max_steering_angle": (0.0, 1.0),
+        "boost_multiplier": (0.0, None),
+        "cruise_increment": (0.0, 1.0),
+        "baud_rate": (1, None),
+        "input_rate_hz": (1.0, MAX_INPUT_RATE_HZ),
+        "command_rate_hz": (1.0, MAX_INPUT_RATE_HZ),
+        "mode_ramp_time": (0.0, 10.0),
+    },
+    "traction_control": {
+        "max_wheel_accel": (0.0, None),
+        "min_current": (0.0, None),
+        "rise_rate": (0.0, None),
+        "slip_rise_rate": (0.0, None),
+        "slip_cutback": (0.0, 1.0),
+    },
+    "realtime": {
+        "cpu": (-1, None),
+        "priority": (1, 99),
+        "nice": (-20, 19),
+    },
+}
+
+SECTION_TYPES = {
+    "controls": ControlsConfig,
+    "calibration": CalibrationConfig,
+    "performance": PerformanceConfig,
+    "traction_control": TractionConfig,
+    "realtime": RealtimeConfig,
+}
+
+
+def merge_config(base, override):
+    """Return a deep copy of base with override recursively merged on top"""
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def _check_value(section, key, value, expected):
+    """Check the type and range of a single setting and return it coerced"""
+    name = f"{section}.{key}"
+    if expected is bool:
+        if not isinstance(value, bool):
+            raise ConfigError(f"{name} must be true or false, got {value!r}")
+        return value
+    if expected is str:
+        if not isinstance(value, str):
+            raise ConfigError(f"{name} must be a string, got {value!r}")
+        return value
+
+    # Numbers: bool is an int subclass but never a valid number here
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ConfigError(f"{name} must be a number, got {value!r}")
+    if expected is int:
+        if value != int(value):
+            raise ConfigError(f"{name} must be an integer, got {value!r}")
+        value = int(value)
+    else:
+        value = float(value)
+
+    low, high = VALUE_RANGES.get(section, {}).get(key, (None, None))
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ConfigError(f"{name}={value} is out of range [{low}, {high}]")
+    return value
+
+
+def _check_axis_calibrations(values):
+    """Validate the per-axis calibration table and return it as a read-only mapping"""
+    if not isinstance(values, dict):
+        raise ConfigError("calibration.axes must be a mapping of axis index to calibration")
+    axes = {}
+    for index, entry in values.items():
+        name = f"calibration.axes.{index}"
+        try:
+            axis = int(index)
+        except ValueError:
+            raise ConfigError(f"{name}: axis index must be an integer")
+        if axis < 0:
+            raise ConfigError(f"{name}: axis index must not be negative")
+        if not isinstance(entry, dict):
+            raise ConfigError(f"{name} must be a mapping")
+        fields = {}
+        for key in AxisCalibration._fields:
+            value = entry.get(key)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ConfigError(f"{name}.{key} must be a number, got {value!r}")
+            fields[key] = float(value)
+        calibration = AxisCalibration(**fields)
+        if not -1.0 <= calibration.min <= calibration.center <= calibration.max <= 1.0 \
+                or calibration.min == calibration.max:
+            raise ConfigError(f"{name} must satisfy -1 <= min <= center <= max <= 1 with min < max")
+        if not 0.0 <= calibration.deadzone <= 1.0 or calibration.noise < 0.0:
+            raise ConfigError(f"{name}: deadzone must be in [0, 1] and noise non-negative")
+        axes[axis] = calibration
+    return MappingProxyType(axes)
+
+
+def validate_config(config):
+    """Validate a configuration dict and build the typed Settings from it.
+
+    Raises ConfigError describing the first invalid setting found.
+    """
+    sections = {}
+    for section, section_type in SECTION_TYPES.items():
+        values = config.get(section)
+        if not isinstance(values, dict):
+            raise ConfigError(f"Section '{section}' is missing or not a mapping")
+        fields = {}
+        for key, expected in section_type.__annotations__.items():
+            if key not in values:
+                raise ConfigError(f"Missing setting {section}.{key}")
+            if section == "calibration" and key == "axes":
+                fields[key] = _check_axis_calibrations(values[key])
+            else:
+                fields[key] = _check_value(section, key, values[key], expected)
+        sections[section] = section_type(**fields)
+
+    performance = sections["performance"]
+    if performance.control_mode not in CONTROL_MODES:
+        raise ConfigError(f"performance.control_mode must be one of {', '.join(CONTROL_MODES)}, "
+                          f"got {performance.control_mode!r}")
+    if performance.serial_transport not in SERIAL_TRANSPORTS:
+        raise ConfigError(f"performance.serial_transport must be one of {', '.join(SERIAL_TRANSPORTS)}, "
+                          f"got {performance.serial_transport!r}")
+    if sections["realtime"].scheduler not in SCHEDULERS:
+        raise ConfigError(f"realtime.scheduler must be one of {', '.join(SCHEDULERS)}, "
+                          f"got {sections['realtime'].scheduler!r}")
+    calibration = sections["calibration"]
+    for axis in ("throttle", "steering"):
+        if getattr(calibration, f"{axis}_min") >= getattr(calibration, f"{axis}_max"):
+            raise ConfigError(f"calibration.{axis}_min must be lower than calibration.{axis}_max")
+    if performance.command_rate_hz > performance.input_rate_hz:
+        raise ConfigError("performance.command_rate_hz must not exceed performance.input_rate_hz "
+                          "(each command averages the inputs sampled since the previous one)")
+
+    return Settings(**sections)
+
+
+def profile_config(config, base, profile):
+    """config with the sections of a device profile shallow-merged over the base ones"""
+    merged = dict(config, profiles={})
+    for section in PROFILE_SECTIONS:
+        merged[section] = dict(base[section], **profile.get(section, {}))
+    return merged
+
+
+def validate_profiles(config, base=None):
+    """Validate the device profiles of a configuration and build their Settings.
+
+    base holds the controls and calibration the profiles apply over
+    (default: the top-level ones). Returns {guid: Settings}.
+    """
+    profiles = config.get("profiles", {})
+    if not isinstance(profiles, dict):
+        raise ConfigError("profiles must be a mapping of joystick GUID to profile")
+    base = base or config
+    settings = {}
+    for guid, profile in profiles.items():
+        if not isinstance(profile, dict):
+            raise ConfigError(f"profiles.{guid} must be a mapping")
+        unknown = set(profile) - {"name", *PROFILE_SECTIONS}
+        if unknown:
+            raise ConfigError(f"profiles.{guid}: unknown keys {', '.join(sorted(unknown))}")
+        try:
+            settings[guid] = validate_config(profile_config(config, base, profile))
+        except ConfigError as e:
+            raise ConfigError(f"profiles.{guid} ({profile.get('name', 'unnamed')}): {e}")
+    return settings
+
+
+def device_guid(joystick):
+    """SDL GUID of a joystick, or None for stand-ins without one (remote link, tests)"""
+    get_guid = getattr(joystick, "get_guid", None)
+    return get_guid() if get_guid is not None else None
+
+
+class ControlValues(NamedTuple):
+    """Shaped control inputs: throttle and steering in [-1, 1], brake in [0, 1]"""
+    throttle: float
+    steering: float
+    brake: float
+
+
+NEUTRAL_CONTROLS = ControlValues(0.0, 0.0, 0.0)
+
+# Button names accepted by is_button_pressed() and their settings field, built once
+BUTTON_FIELDS = {field[:-len("_btn")]: field for field in ControlsConfig._fields if field.endswith("_btn")}
+
+
+class AxisNormalizer:
+    """Precomputed per-axis centre correction, scaling and deadzone.
+
+    Each side of an axis's centre gets its own scale so that the measured
+    extremes map to -1 and +1, and a pad that only reaches 0.92 still gives
+    full deflection. The whole axis snapshot is normalized in one vectorized
+    step. Sources, by priority: the throttle/steering min/max and deadzone
+    settings, the automatic calibration table, then identity.
+    """
+
+    def __init__(self, settings, num_axes):
+        self.num_axes = num_axes
+        center = np.zeros(num_axes)
+        low = np.full(num_axes, -1.0)
+        high = np.ones(num_axes)
+        deadzone = np.zeros(num_axes)
+
+        calibration = settings.calibration
+        controls = settings.controls
+
+        # Triggers rest at one end of their travel: without a measured centre
+        # the brake axis is treated as resting at -1 so its full travel maps to [0, 1]
+        if controls.brake_axis < num_axes and controls.brake_axis not in calibration.axes:
+            center[controls.brake_axis] = -1.0
+
+        for axis, measured in calibration.axes.items():
+            if axis < num_axes:
+                center[axis] = measured.center
+                low[axis] = measured.min
+                high[axis] = measured.max
+                deadzone[axis] = measured.deadzone
+
+        if controls.brake_axis < num_axes:
+            deadzone[controls.brake_axis] = calibration.brake_deadzone
+
+        for name in ("throttle", "steering"):
+            axis = getattr(controls, f"{name}_axis")
+            if axis < num_axes:
+                low[axis] = getattr(calibration, f"{name}_min")
+                high[axis] = getattr(calibration, f"{name}_max")
+                deadzone[axis] = getattr(calibration, f"{name}_deadzone")
+
+        # A side with no travel (e.g. below a trigger's rest position) scales to zero
+        center = np.clip(center, low, high)
+        below = center - low
+        above = high - center
+        self.center = center
+        self.neg_scale = np.divide(1.0, below, out=np.zeros(num_axes), where=below > 0)
+        self.pos_scale = np.divide(1.0, above, out=np.zeros(num_axes), where=above > 0)
+        self.deadzone = deadzone
+
+        # Work buffers, so normalizing allocates no arrays
+        self._values = np.zeros(num_axes)
+        self._scale = np.zeros(num_axes)
+        self._magnitude = np.zeros(num_axes)
+        self._mask = np.zeros(num_axes, dtype=bool)
+
+    def normalize(self, axes):
+        """Return the normalized snapshot as an array of values in [-1, 1].
+
+        The array is a buffer of the normalizer, overwritten by the next call.
+        """
+        values = self._values
+        mask = self._mask
+        values[:] = axes
+        np.subtract(values, self.center, out=values)
+        np.copyto(self._scale, self.neg_scale)
+        np.greater_equal(values, 0.0, out=mask)
+        np.copyto(self._scale, self.pos_scale, where=mask)
+        np.multiply(values, self._scale, out=values)
+        np.minimum(values, 1.0, out=values)
+        np.maximum(values, -1.0, out=values)
+        np.absolute(values, out=self._magnitude)
+        np.less(self._magnitude, self.deadzone, out=mask)
+        np.copyto(values, 0.0, where=mask)
+        return values
+
+
+class AxisAverager:
+    """Running mean of the axis snapshots sampled during one command period.
+
+    Inputs are sampled faster than commands are sent; averaging them is a
+    boxcar low-pass filter over the command period, so a flick between two
+    commands still moves the command instead of being aliased away, and
+    stick noise is smoothed before the deadzone is applied. Buffers are
+    preallocated so sampling allocates nothing that outlives the call.
+    """
+
+    def __init__(self, num_axes):
+        self.num_axes = num_axes
+        self.count = 0
+        self._sum = np.zeros(num_axes)
+        self._sample = np.zeros(num_axes)
+        self._mean = np.zeros(num_axes)
+
+    def add(self, axes):
+        """Add one axis snapshot to the current period"""
+        self._sample[:] = axes
+        np.add(self._sum, self._sample, out=self._sum)
+        self.count += 1
+
+    def take(self):
+        """Return the mean of the period's samples and start a new period.
+
+        The array is a buffer of the averager, overwritten by the next call.
+        """
+        np.divide(self._sum, self.count, out=self._mean)
+        self._sum.fill(0.0)
+        self.count = 0
+        return self._mean
+
+
+def compute_axis_calibration(rest, sweep):
+    """Compute per-axis calibration from rest and sweep samples.
+
+    rest and sweep are (samples, axes) arrays. Returns {axis: AxisCalibration}
+    for the axes whose sweep covered at least MIN_AXIS_TRAVEL.
+    """
+    center = np.median(rest, axis=0)
+    deviation = np.abs(rest - center).max(axis=0)
+    noise = rest.std(axis=0)
+    deadzone = np.clip(deviation * DEADZONE_NOISE_MARGIN, MIN_AUTO_DEADZONE, MAX_AUTO_DEADZONE)
+
+    # Ignore the most extreme 0.1% so a single glitch doesn't set the range
+    low = np.minimum(np.percentile(sweep, 0.1, axis=0), center)
+    high = np.maximum(np.percentile(sweep, 99.9, axis=0), center)
+
+    results = {}
+    for axis in np.flatnonzero(high - low >= MIN_AXIS_TRAVEL):
+        results[int(axis)] = AxisCalibration(
+            center=float(np.clip(center[axis], -1.0, 1.0)),
+            min=float(max(low[axis], -1.0)),
+            max=float(min(high[axis], 1.0)),
+            deadzone=float(deadzone[axis]),
+            noise=float(noise[axis]),
+        )
+    return results
+
+
+# Whether init_input() has started SDL, so quit_input() knows there is something to stop
+_input_started = False
+
+
+def config_file_mtime():
+    """Modification time of CONFIG_FILE in ns, or None when there is no file"""
+    try:
+        return os.stat(CONFIG_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+
+def init_input():
+    """Start only the SDL subsystems gamepad input needs.
+
+    That is the joystick subsystem, plus video on the dummy driver because
+    pygame keeps its event queue there (pygame.event.get() fails without it).
+    Unlike pygame.init(), audio and the other modules are never started.
+    """
+    global _input_started
+    if not pygame.display.get_init():
+        pygame.display.init()
+    if not pygame.joystick.get_init():
+        pygame.joystick.init()
+        print(f"{Colors.GREEN}Pygame joystick module initialized{Colors.RESET}")
+    _input_started = True
+
+
+def quit_input():
+    """Stop SDL if init_input() started it, without importing pygame otherwise"""
+    global _input_started
+    if _input_started:
+        pygame.quit()
+        _input_started = False
+
+
 class GamepadConfig:
     def __init__(self):
         """Initialize the gamepad configuration manager"""
         self.config = self.load_config()
+        self.settings = validate_config(self.config)
+        self.normalizer = None
+        self.averager = None
         self.joystick = None
+        self.last_axes = []
+        self.brake_moved = False
+
+        # The controls and calibration sections of self.config are those of the
+        # attached device; base keeps the top-level ones, used by gamepads without a profile
+        self.device_guid = None
+        self.device_name = None
+        self.base = {section: copy.deepcopy(self.config[section]) for section in PROFILE_SECTIONS}
+        self.base_settings = self.settings
+        self.profile_settings = validate_profiles(self.config)
 
         print(f"{Colors.GREEN}Gamepad configuration initialized{Colors.RESET}")
-        # Initialize only joystick subsystem, avoid display/audio to prevent D-Bus issues
-        if not pygame.get_init():
-            pygame.init()
-            # Immediately quit any potentially problematic subsystems
-            try:
-                # Check if mixer module is available before quitting it
-                if hasattr(pygame, 'mixer') and pygame.mixer:
-                    pygame.mixer.quit()
-            except (AttributeError, ImportError):
-                # Module not available, ignore error
-                pass
-            print(f"{Colors.GREEN}Pygame initialized with limited subsystems{Colors.RESET}")
-        
-        # Make sure joystick module is initialized
-        if not pygame.joystick.get_init():
-            pygame.joystick.init()
-            print(f"{Colors.GREEN}Pygame joystick module initialized{Colors.RESET}")
+        # SDL is started by connect_gamepad(), only when a gamepad is actually needed
 
     def load_config(self):
-        """Load configuration from file or create default config"""
+        """Load configuration from file merged over the defaults, or create default config"""
+        self.config_mtime = config_file_mtime()
         if os.path.exists(CONFIG_FILE):
             try:
                 with open(CONFIG_FILE, 'r') as f:
-                    config = json.load(f)
+                    file_config = json.load(f)
+                if not isinstance(file_config, dict):
+                    raise ConfigError("Top-level configuration must be a JSON object")
+                config = merge_config(DEFAULT_CONFIG, file_config)
+                validate_config(config)
+                validate_profiles(config)
                 print(f"{Colors.GREEN}Configuration loaded from {CONFIG_FILE}{Colors.RESET}")
                 return config
-            except (json.JSONDecodeError, IOError) as e:
+            except (json.JSONDecodeError, IOError, ConfigError) as e:
                 print(f"{Colors.RED}Error loading configuration: {e}{Colors.RESET}")
                 print(f"{Colors.YELLOW}Using default configuration{Colors.RESET}")
-                return DEFAULT_CONFIG.copy()
+                return copy.deepcopy(DEFAULT_CONFIG)
         else:
             print(f"{Colors.YELLOW}No configuration file found. Using default configuration.{Colors.RESET}")
-            return DEFAULT_CONFIG.copy()
+            return copy.deepcopy(DEFAULT_CONFIG)
+
+    def update_settings(self):
+        """Revalidate the configuration dict and rebuild the typed settings.
+
+        Returns True on success. On failure the previous settings are kept and
+        the error is reported.
+        """
+        try:
+            settings = validate_config(self.config)
+            if self.device_guid is None:
+                base_settings = settings
+                profile_settings = validate_profiles(self.config)
+            else:
+                base_settings = validate_config(profile_config(self.config, self.base, {}))
+                profile_settings = validate_profiles(self.config, self.base)
+        except ConfigError as e:
+            print(f"{Colors.RED}Invalid configuration: {e}{Colors.RESET}")
+            return False
+        self.settings = settings
+        self.base_settings = base_settings
+        self.profile_settings = profile_settings
+        self.normalizer = None
+        return True
+
+    def use_device(self, guid, name=None):
+        """Switch the mapping and calibration to the profile of the gamepad with this GUID.
+
+        Gamepads without a profile use the base sections. Every profile's
+        Settings are built with the configuration, so switching is a lookup.
+        Unsaved mapping or calibration changes of the previous device are dropped.
+        """
+        if self.device_guid is None:
+            # Edits made without a device belong to the base sections
+            self.base = {section: copy.deepcopy(self.config[section]) for section in PROFILE_SECTIONS}
+        profile = self.config["profiles"].get(guid) if guid else None
+        sections = profile_config(self.config, self.base, profile or {})
+        for section in PROFILE_SECTIONS:
+            self.config[section] = copy.deepcopy(sections[section])
+        self.device_guid = guid
+        self.device_name = name
+        self.settings = self.profile_settings[guid] if profile is not None else self.base_settings
+        self.normalizer = None
+        return profile is not None
+
+    def file_config(self):
+        """The configuration as saved: base sections at the top level, the device's in its profile"""
+        config = copy.deepcopy(self.config)
+        if self.device_guid is not None:
+            config["profiles"][self.device_guid] = dict(
+                {"name": self.device_name or ""},
+                **{section: config[section] for section in PROFILE_SECTIONS})
+            config.update(copy.deepcopy(self.base))
+        return config
+
+    def reload_config(self, overrides=None):
+        """Reload CONFIG_FILE if it changed on disk since it was last read.
+
+        overrides (e.g. command line options) are merged on top again. Returns
+        True when new settings were applied; an unreadable or invalid file is
+        reported and the current settings are kept.
+        """
+        mtime = config_file_mtime()
+        if mtime is None or mtime == self.config_mtime:
+            return False
+        self.config_mtime = mtime
+        try:
+            with open(CONFIG_FILE, 'r') as f:
+                file_config = json.load(f)
+            if not isinstance(file_config, dict):
+                raise ConfigError("Top-level configuration must be a JSON object")
+            config = merge_config(merge_config(DEFAULT_CONFIG, file_config), overrides or {})
+            settings = validate_config(config)
+        except (json.JSONDecodeError, IOError, ConfigError) as e:
+            print(f"\n{Colors.RED}Configuration not reloaded: {e}{Colors.RESET}")
+            return False
+
+        ignored = [f"{section}.{key}" for section, keys in RESTART_SETTINGS.items() for key in keys
+                   if config[section][key] != self.config[section][key]]
+        for name in ignored:
+            section, key = name.split(".")
+            config[section][key] = self.config[section][key]
+        try:
+            profile_settings = validate_profiles(config)
+        except ConfigError as e:
+            print(f"\n{Colors.RED}Configuration not reloaded: {e}{Colors.RESET}")
+            return False
+        if ignored:
+            print(f"\n{Colors.YELLOW}Restart to apply {', '.join(ignored)}{Colors.RESET}")
+            settings = validate_config(config)
+
+        self.config = config
+        self.base = {section: copy.deepcopy(config[section]) for section in PROFILE_SECTIONS}
+        self.settings = self.base_settings = settings
+        self.profile_settings = profile_settings
+        self.normalizer = None
+        if self.device_guid is not None:
+            # The file's top-level sections are the new base; apply the device's profile over them
+            guid, self.device_guid = self.device_guid, None
+            self.use_device(guid, self.device_name)
+        print(f"\n{Colors.GREEN}Configuration reloaded from {CONFIG_FILE}{Colors.RESET}")
+        return True
+
+    def reset_config(self):
+        """Reset the configuration, device profiles included, to an independent copy of the defaults"""
+        self.config = copy.deepcopy(DEFAULT_CONFIG)
+        self.base = {section: copy.deepcopy(self.config[section]) for section in PROFILE_SECTIONS}
+        self.settings = self.base_settings = validate_config(self.config)
+        self.profile_settings = {}
+        self.normalizer = None
 
     def save_config(self):
         """Save current configuration to file"""
+        if not self.update_settings():
+            return False
+        config = self.file_config()
         try:
             with open(CONFIG_FILE, 'w') as f:
-                json.dump(self.config, f, indent=4)
+                json.dump(config, f, indent=4)
+            self.config_mtime = config_file_mtime()
+            self.config["profiles"] = config["profiles"]
+            if self.device_guid is not None:
+                print(f"{Colors.GREEN}Profile of {self.device_name} ({self.device_guid}) saved{Colors.RESET}")
             print(f"{Colors.GREEN}Configuration saved to {CONFIG_FILE}{Colors.RESET}")
+            self.update_settings()
             return True
         except IOError as e:
             print(f"{Colors.RED}Error saving configuration: {e}{Colors.RESET}")
@@ -124,6 +807,7 @@ class GamepadConfig:
 
     def connect_gamepad(self):
         """Connect to the first available gamepad"""
+        init_input()
         if pygame.joystick.get_count() < 1:
             print(f"{Colors.RED}No gamepads found. Please connect a gamepad.{Colors.RESET}")
             return False
@@ -132,8 +816,23 @@ class GamepadConfig:
         self.joystick.init()
         name = self.joystick.get_name()
         print(f"{Colors.GREEN}Connected to: {name}{Colors.RESET}")
+        self.attach_profile(self.joystick)
         return True
 
+    def attach_profile(self, joystick):
+        """Apply the profile of a newly attached gamepad and report which mapping is in use"""
+        self.brake_moved = False
+        guid = device_guid(joystick)
+        if guid is None:
+            return False
+        name = joystick.get_name()
+        if self.use_device(guid, name):
+            print(f"{Colors.GREEN}Profile loaded for {name} ({guid}){Colors.RESET}")
+            return True
+        print(f"{Colors.YELLOW}No profile for {name} ({guid}): using the default mapping; "
+              f"save the configuration with this gamepad connected to create one{Colors.RESET}")
+        return False
+
     def display_gamepad_info(self):
         """Display information about the connected gamepad"""
         if not self.joystick:
@@ -198,6 +897,12 @@ class GamepadConfig:
         print(f"\nDo you want to invert the {axis_name}? (y/n)")
         invert = input().strip().lower() == 'y'
 
+        # Keep the recorded range ordered whichever way the axis was moved
+        min_value, max_value = min(min_value, max_value), max(min_value, max_value)
+        if min_value == max_value:
+            print(f"{Colors.RED}Axis did not move, calibration ignored{Colors.RESET}")
+            return False
+
         # Update configuration
         if axis_name == "throttle":
             self.config["calibration"]["throttle_min"] = min_value
@@ -208,7 +913,67 @@ class GamepadConfig:
             self.config["calibration"]["steering_max"] = max_value
             self.config["calibration"]["invert_steering"] = invert
 
-        return True
+        return self.update_settings()
+
+    def sample_axes(self, duration, rate_hz=AUTO_CALIBRATION_RATE_HZ):
+        """Sample every axis for duration seconds into a (samples, axes) array"""
+        num_axes = self.joystick.get_numaxes()
+        samples = np.empty((int(duration * rate_hz), num_axes))
+        period = 1.0 / rate_hz
+        get_axis = self.joystick.get_axis
+        next_sample = time.monotonic()
+        for row in samples:
+            pygame.event.pump()
+            for i in range(num_axes):
+                row[i] = get_axis(i)
+            next_sample += period
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return samples
+
+    def auto_calibrate(self, rest_time=AUTO_CALIBRATION_REST_TIME, sweep_time=AUTO_CALIBRATION_SWEEP_TIME):
+        """Calibrate every axis from sampled statistics, without any keyboard input.
+
+        Phase 1 samples the axes at rest to measure centre and noise, phase 2
+        samples while the user sweeps every stick and trigger to its limits.
+        Deadzones are derived from the measured noise.
+        """
+        if not self.joystick:
+            print(f"{Colors.RED}No gamepad connected{Colors.RESET}")
+            return False
+
+        print(f"\n{Colors.CYAN}{Colors.BOLD}Automatic calibration{Colors.RESET}")
+        print(f"Leave all sticks and triggers untouched for {rest_time:.0f} seconds...")
+        time.sleep(1.0)
+        rest = self.sample_axes(rest_time)
+
+        print(f"Now move every stick and trigger to its limits, in all directions, for {sweep_time:.0f} seconds...")
+        sweep = self.sample_axes(sweep_time)
+
+        results = compute_axis_calibration(rest, sweep)
+        if not results:
+            print(f"{Colors.RED}No axis moved during the sweep, calibration ignored{Colors.RESET}")
+            return False
+
+        axes = self.config["calibration"]["axes"]
+        for axis, calibration in results.items():
+            axes[str(axis)] = calibration._asdict()
+            print(f"  Axis {axis}: centre {calibration.center:+.3f}, range [{calibration.min:+.3f}, "
+                  f"{calibration.max:+.3f}], noise {calibration.noise:.4f}, deadzone {calibration.deadzone:.3f}")
+
+        # Keep the throttle/steering settings in line with the measured axes
+        for name in ("throttle", "steering"):
+            calibration = results.get(getattr(self.settings.controls, f"{name}_axis"))
+            if calibration is not None:
+                self.config["calibration"][f"{name}_min"] = calibration.min
+                self.config["calibration"][f"{name}_max"] = calibration.max
+                self.config["calibration"][f"{name}_deadzone"] = calibration.deadzone
+
+        skipped = self.joystick.get_numaxes() - len(results)
+        if skipped:
+            print(f"{Colors.YELLOW}{skipped} axis/axes did not move enough and were left unchanged{Colors.RESET}")
+        return self.update_settings()
 
     def map_control(self, control_name, control_type):
         """Map a control to a button or axis"""
@@ -227,7 +992,7 @@ class GamepadConfig:
                         button = event.button
                         print(f"{control_name} mapped to button {button}")
                         self.config["controls"][f"{control_name}_btn"] = button
-                        return True
+                        return self.update_settings()
                 time.sleep(0.1)
 
         elif control_type == "axis":
@@ -244,7 +1009,7 @@ class GamepadConfig:
                     if abs(current - baseline[i]) > 0.5:
                         print(f"{control_name} mapped to axis {i}")
                         self.config["controls"][f"{control_name}_axis"] = i
-                        return True
+                        return self.update_settings()
                 time.sleep(0.1)
 
         return False
@@ -260,7 +1025,7 @@ class GamepadConfig:
             if 0.0 <= value <= 1.0:
                 self.config["calibration"][f"{control_name}_deadzone"] = value
                 print(f"Deadzone set to {value}")
-                return True
+                return self.update_settings()
             else:
                 print(f"{Colors.RED}Invalid value. Must be between 0.0 and 1.0{Colors.RESET}")
         except ValueError:
@@ -274,22 +1039,26 @@ class GamepadConfig:
         print(f"Current value: {self.config['performance'][param_name]}")
 
         if param_name == "control_mode":
-            print("Available modes: duty_cycle, rpm, current")
+            print(f"Available modes: {', '.join(CONTROL_MODES)}")
             print("Enter new mode:")
             mode = input().strip()
-            if mode in ["duty_cycle", "rpm", "current"]:
+            if mode in CONTROL_MODES:
                 self.config["performance"]["control_mode"] = mode
                 print(f"Control mode set to {mode}")
-                return True
+                return self.update_settings()
             else:
-                print(f"{Colors.RED}Invalid mode. Must be duty_cycle, rpm, or current{Colors.RESET}")
+                print(f"{Colors.RED}Invalid mode. Must be one of {', '.join(CONTROL_MODES)}{Colors.RESET}")
                 return False
         else:
             print(f"Enter new value:")
             try:
                 value = float(input().strip())
                 if value >= 0:
+                    previous = self.config["performance"][param_name]
                     self.config["performance"][param_name] = value
+                    if not self.update_settings():
+                        self.config["performance"][param_name] = previous
+                        return False
                     print(f"{param_name} set to {value}")
                     return True
                 else:
@@ -306,10 +1075,6 @@ class GamepadConfig:
         os.environ["SDL_DBUS_SCREENSAVER_INHIBIT"] = "0"
         os.environ["SDL_VIDEODRIVER"] = "dummy"
 
-        # Initialize joystick if not already done
-        if not pygame.joystick.get_init():
-            pygame.joystick.init()
-
         if not self.connect_gamepad():
             print("Please connect a gamepad and restart the calibration.")
             return
@@ -336,6 +1101,9 @@ class GamepadConfig:
             print(f"{Colors.YELLOW}12. Test Current Configuration{Colors.RESET}")
             print(f"{Colors.YELLOW}13. Save Configuration{Colors.RESET}")
             print(f"{Colors.YELLOW}14. Reset to Default Configuration{Colors.RESET}")
+            print(f"{Colors.YELLOW}15. Automatic Calibration (all axes){Colors.RESET}")
+            print(f"{Colors.YELLOW}16. Map Control Mode Button{Colors.RESET}")
+            print(f"{Colors.YELLOW}17. Map Takeover Button{Colors.RESET}")
             print(f"{Colors.YELLOW}0. Exit{Colors.RESET}")
 
             choice = input("\nEnter your choice: ").strip()
@@ -367,8 +1135,14 @@ class GamepadConfig:
             elif choice == "13":
                 self.save_config()
             elif choice == "14":
-                self.config = DEFAULT_CONFIG.copy()
+                self.reset_config()
                 print(f"{Colors.YELLOW}Configuration reset to defaults{Colors.RESET}")
+            elif choice == "15":
+                self.auto_calibrate()
+            elif choice == "16":
+                self.map_control("mode_cycle", "button")
+            elif choice == "17":
+                self.map_control("takeover", "button")
             elif choice == "0":
                 running = False
             else:
@@ -377,7 +1151,7 @@ class GamepadConfig:
             if running:
                 input("\nPress Enter to continue...")
 
-        pygame.quit()
+        quit_input()
         print(f"{Colors.GREEN}Calibration complete!{Colors.RESET}")
 
     def test_configuration(self):
@@ -391,17 +1165,10 @@ class GamepadConfig:
         print("Press ESC to exit test mode")
 
         # Get control mappings
-        throttle_axis = self.config["controls"]["throttle_axis"]
-        steering_axis = self.config["controls"]["steering_axis"]
-        emergency_btn = self.config["controls"]["emergency_stop_btn"]
-        boost_btn = self.config["controls"]["boost_btn"]
-        reverse_btn = self.config["controls"]["reverse_btn"]
-
-        # Calibration settings
-        throttle_dz = self.config["calibration"]["throttle_deadzone"]
-        steering_dz = self.config["calibration"]["steering_deadzone"]
-        invert_throttle = self.config["calibration"]["invert_throttle"]
-        invert_steering = self.config["calibration"]["invert_steering"]
+        controls = self.settings.controls
+        emergency_btn = controls.emergency_stop_btn
+        boost_btn = controls.boost_btn
+        reverse_btn = controls.reverse_btn
 
         testing = True
         clock = pygame.time.Clock()
@@ -411,26 +1178,8 @@ class GamepadConfig:
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                     testing = False
 
-            # Get raw values
-            raw_throttle = self.joystick.get_axis(throttle_axis)
-            raw_steering = self.joystick.get_axis(steering_axis)
-
-            # Apply inversion if configured
-            if invert_throttle:
-                raw_throttle = -raw_throttle
-            if invert_steering:
-                raw_steering = -raw_steering
-
-            # Apply deadzone
-            if abs(raw_throttle) < throttle_dz:
-                throttle = 0.0
-            else:
-                throttle = raw_throttle
-
-            if abs(raw_steering) < steering_dz:
-                steering = 0.0
-            else:
-                steering = raw_steering
+            # Normalized, inverted and deadzoned values
+            throttle, steering, brake = self.read_controls()
 
             # Get button states
             e_stop = self.joystick.get_button(emergency_btn)
@@ -438,7 +1187,7 @@ class GamepadConfig:
             reverse = self.joystick.get_button(reverse_btn)
 
             # Clear the line and print the current values
-            print(f"\rThrottle: {throttle:+.2f} | Steering: {steering:+.2f} | E-Stop: {'ON' if e_stop else 'off'} | Boost: {'ON' if boost else 'off'} | Reverse: {'ON' if reverse else 'off'}", end="")
+            print(f"\rThrottle: {throttle:+.2f} | Steering: {steering:+.2f} | Brake: {brake:.2f} | E-Stop: {'ON' if e_stop else 'off'} | Boost: {'ON' if boost else 'off'} | Reverse: {'ON' if reverse else 'off'}", end="")
 
             clock.tick(30)  # 30 FPS
 
@@ -449,49 +1198,89 @@ class GamepadConfig:
         if not self.joystick:
             return default
 
-        if control_name == "throttle":
-            axis = self.config["controls"]["throttle_axis"]
-            deadzone = self.config["calibration"]["throttle_deadzone"]
-            raw_value = self.joystick.get_axis(axis)
+        values = self.read_controls()
+        return getattr(values, control_name, default)
 
-            # Apply inversion if configured
-            if self.config["calibration"]["invert_throttle"]:
-                raw_value = -raw_value
-
-            # Apply deadzone
-            if abs(raw_value) < deadzone:
-                return 0.0
-
-            return raw_value
+    def read_axes(self):
+        """Read every axis once into last_axes and return it"""
+        get_axis = self.joystick.get_axis
+        axes = self.last_axes
+        num_axes = self.joystick.get_numaxes()
+        if len(axes) != num_axes:
+            axes = self.last_axes = [0.0] * num_axes
+        # Fill the same list every tick instead of building a new one
+        for i in range(num_axes):
+            axes[i] = get_axis(i)
+        return axes
+
+    def read_controls(self):
+        """Read every axis once and return the shaped ControlValues"""
+        if not self.joystick:
+            return NEUTRAL_CONTROLS
+        return self.shape_axes(self.read_axes())
 
-        elif control_name == "steering":
-            axis = self.config["controls"]["steering_axis"]
-            deadzone = self.config["calibration"]["steering_deadzone"]
-            raw_value = self.joystick.get_axis(axis)
+    def sample_controls(self):
+        """Read every axis once and add it to the current command period"""
+        if not self.joystick:
+            return
+        axes = self.read_axes()
+        averager = self.averager
+        if averager is None or averager.num_axes != len(axes):
+            averager = self.averager = AxisAverager(len(axes))
+        averager.add(axes)
 
-            # Apply inversion if configured
-            if self.config["calibration"]["invert_steering"]:
-                raw_value = -raw_value
+    def read_averaged_controls(self):
+        """Return the shaped mean of the axes sampled since the last call, and start a new period.
 
-            # Apply deadzone
-            if abs(raw_value) < deadzone:
-                return 0.0
+        Reads the axes directly when nothing was sampled (or the gamepad changed).
+        """
+        if not self.joystick:
+            return NEUTRAL_CONTROLS
+        averager = self.averager
+        if averager is None or averager.count == 0 or averager.num_axes != len(self.last_axes):
+            return self.read_controls()
+        return self.shape_axes(averager.take())
+
+    def shape_axes(self, axes):
+        """Normalize a full axis snapshot in one step and pick out the mapped controls"""
+        normalizer = self.normalizer
+        if normalizer is None or normalizer.num_axes != len(axes):
+            normalizer = self.normalizer = AxisNormalizer(self.settings, len(axes))
+        values = normalizer.normalize(axes)
+
+        controls = self.settings.controls
+        calibration = self.settings.calibration
+        num_axes = len(axes)
+        throttle = float(values[controls.throttle_axis]) if controls.throttle_axis < num_axes else 0.0
+        steering = float(values[controls.steering_axis]) if controls.steering_axis < num_axes else 0.0
+        brake = float(values[controls.brake_axis]) if controls.brake_axis < num_axes else 0.0
+
+        # SDL reports some triggers as 0, half their travel, until their first
+        # move: the brake stays released until its axis has read anything else
+        if not self.brake_moved:
+            if controls.brake_axis < num_axes and axes[controls.brake_axis] == 0.0:
+                brake = 0.0
+            else:
+                self.brake_moved = True
 
-            return raw_value
+        # Apply inversion if configured
+        if calibration.invert_throttle:
+            throttle = -throttle
+        if calibration.invert_steering:
+            steering = -steering
 
-        return default
+        return ControlValues(throttle, steering, max(0.0, brake))
 
     def is_button_pressed(self, button_name):
         """Check if a button is pressed"""
         if not self.joystick:
             return False
 
-        button_key = f"{button_name}_btn"
-        if button_key in self.config["controls"]:
-            button_index = self.config["controls"][button_key]
-            return self.joystick.get_button(button_index)
-
-        return False
+        field = BUTTON_FIELDS.get(button_name)
+        if field is None:
+            return False
+        button_index = getattr(self.settings.controls, field)
+        return self.joystick.get_button(button_index)
 
 
 if __name__ == "__main__":
@@ -7,10 +7,234 @@ import os
 import sys
 import json
 import time
+import argparse
+from collections import deque
 import tkinter as tk
 from tkinter import ttk, messagebox, StringVar, IntVar, DoubleVar
+import numpy as np
 import pygame
-from gamepad_config import GamepadConfig, DEFAULT_CONFIG, CONFIG_FILE, Colors
+from gamepad_config import GamepadConfig, CONFIG_FILE, Colors, CONTROL_MODES, SERIAL_TRANSPORTS
+from input_sampler import (InputSampler, BUTTON_DOWN, AXIS_MOTION,
+                           DEVICE_OPENED, DEVICE_REMOVED)
+from vesc_telemetry import TelemetryPoller
+from live_state import LiveStateReader, LIVE_STATE_STALE, format_state
+
+
+# Tab indices in the notebook
+MAPPING_TAB = 1
+TEST_TAB = 4
+HISTORY_TAB = 5
+TELEMETRY_TAB = 6
+
+# Polling interval bounds (ms): poll fast while input is changing, back off when idle
+MIN_POLL_INTERVAL = 16
+MAX_POLL_INTERVAL = 200
+
+# Number of recent frames kept for frame time statistics
+FRAME_TIME_WINDOW = 500
+
+# Delay between attempts to attach to a running controller's live state (s)
+LIVE_STATE_ATTACH_INTERVAL = 1.0
+
+# VESC output log size (lines) and minimum delay between widget writes (s)
+VESC_LOG_LINES = 50
+VESC_LOG_FLUSH_INTERVAL = 0.1
+
+
+class TextLog:
+    """Fixed-capacity line log displayed in a Text widget.
+
+    New lines go into a ring buffer and are written to the widget in
+    batches. The widget line count is tracked here rather than read back,
+    so each update costs the same however long the log has been running.
+    """
+
+    def __init__(self, widget, capacity=VESC_LOG_LINES, flush_interval=VESC_LOG_FLUSH_INTERVAL):
+        self.widget = widget
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.pending = deque(maxlen=capacity)
+        self.widget_lines = 0
+        self.last_flush = 0.0
+
+    def append(self, line):
+        """Queue a line; the oldest pending line is dropped when the buffer is full"""
+        self.pending.append(line)
+
+    def flush(self, force=False):
+        """Write pending lines to the widget, at most once per flush interval"""
+        if not self.pending:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_flush < self.flush_interval:
+            return
+        self.last_flush = now
+
+        self.widget.insert(tk.END, "\n".join(self.pending) + "\n")
+        self.widget_lines += len(self.pending)
+        self.pending.clear()
+
+        # Drop the oldest lines beyond capacity in a single delete
+        excess = self.widget_lines - self.capacity
+        if excess > 0:
+            self.widget.delete("1.0", f"{excess + 1}.0")
+            self.widget_lines = self.capacity
+        self.widget.see(tk.END)
+
+# Minimum delay between telemetry display refreshes (s)
+TELEMETRY_DISPLAY_INTERVAL = 0.1
+
+# Telemetry fields shown in the telemetry tab: (attribute, label, format)
+TELEMETRY_FIELDS = (
+    ("rpm", "RPM", "{:.0f}"),
+    ("current_motor", "Courant moteur (A)", "{:.2f}"),
+    ("current_in", "Courant d'entrée (A)", "{:.2f}"),
+    ("duty", "Duty cycle", "{:.3f}"),
+    ("voltage", "Tension (V)", "{:.1f}"),
+    ("temp_fet", "Température FET (°C)", "{:.1f}"),
+    ("temp_motor", "Température moteur (°C)", "{:.1f}"),
+)
+
+# Axis history plots: time window (s), buffer capacity (samples) and redraw period (s)
+HISTORY_SECONDS = 10.0
+HISTORY_CAPACITY = 10000
+HISTORY_REDRAW_INTERVAL = 0.05
+
+# Plotted channels: (label, deadzone key drawn as a band, or None)
+HISTORY_CHANNELS = (
+    ("Accélérateur (brut)", "throttle_deadzone"),
+    ("Frein (brut)", None),
+    ("Direction (brut)", "steering_deadzone"),
+    ("Accélérateur (mis en forme)", None),
+    ("Direction (mis en forme)", None),
+)
+
+
+class HistoryBuffer:
+    """Preallocated ring buffer of timestamped samples for several channels"""
+
+    def __init__(self, channels, capacity=HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.times = np.zeros(capacity)
+        self.values = np.zeros((channels, capacity))
+        self.index = 0
+        self.count = 0
+
+    def append(self, timestamp, values):
+        """Store one sample, overwriting the oldest when full"""
+        self.times[self.index] = timestamp
+        self.values[:, self.index] = values
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def window(self, since):
+        """Return (times, values) in chronological order for samples taken at or after since"""
+        if self.count < self.capacity:
+            times = self.times[:self.count]
+            values = self.values[:, :self.count]
+        else:
+            order = np.r_[self.index:self.capacity, 0:self.index]
+            times = self.times[order]
+            values = self.values[:, order]
+        first = np.searchsorted(times, since)
+        return times[first:], values[:, first:]
+
+
+def decimate_minmax(times, values, t_start, duration, width):
+    """Reduce samples to one min/max pair per pixel column.
+
+    Returns (x, mins, maxs) where x holds the column of each pair and mins/maxs
+    have one row per channel. The envelope keeps noise spikes visible while
+    bounding the number of drawn points to twice the plot width.
+    """
+    columns = ((times - t_start) * ((width - 1) / duration)).astype(np.intp)
+    starts = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+    mins = np.minimum.reduceat(values, starts, axis=1)
+    maxs = np.maximum.reduceat(values, starts, axis=1)
+    return columns[starts], mins, maxs
+
+
+class AxisHistoryPlot:
+    """Scrolling plots of the last HISTORY_SECONDS of each channel on a single canvas.
+
+    Canvas items are created once; each redraw only updates their coordinates.
+    """
+
+    def __init__(self, canvas, channels=HISTORY_CHANNELS):
+        self.canvas = canvas
+        self.channels = channels
+        self.buffer = HistoryBuffer(len(channels))
+        self.size = None
+        self.last_redraw = 0.0
+
+        self.traces = []
+        self.bands = []
+        self.axes = []
+        self.labels = []
+        for label, deadzone_key in channels:
+            self.axes.append(canvas.create_line(0, 0, 0, 0, fill="#bbbbbb"))
+            self.bands.append(canvas.create_rectangle(0, 0, 0, 0, fill="#e6f0ff", outline="",
+                                                      state=tk.NORMAL if deadzone_key else tk.HIDDEN))
+            self.traces.append(canvas.create_line(0, 0, 0, 0, fill="#0066cc", state=tk.HIDDEN))
+            self.labels.append(canvas.create_text(0, 0, text=label, anchor=tk.NW, font=("Arial", 9)))
+        # Keep the traces above the deadzone bands and zero lines
+        for trace in self.traces:
+            canvas.tag_raise(trace)
+
+    def append(self, timestamp, values):
+        """Record one sample of every channel"""
+        self.buffer.append(timestamp, values)
+
+    def row_geometry(self, row):
+        """Return (top, height) of a channel's plot row"""
+        height = self.size[1] / len(self.channels)
+        return row * height, height
+
+    def to_y(self, row, value):
+        """Map a value in [-1, 1] to a canvas y coordinate within a row"""
+        top, height = self.row_geometry(row)
+        return top + 4 + (1.0 - (value + 1.0) / 2.0) * (height - 8)
+
+    def redraw(self, calibration, now=None, force=False):
+        """Redraw all traces if the redraw period has elapsed"""
+        now = time.monotonic() if now is None else now
+        if not force and now - self.last_redraw < HISTORY_REDRAW_INTERVAL:
+            return
+        self.last_redraw = now
+
+        width = max(self.canvas.winfo_width(), 2)
+        height = max(self.canvas.winfo_height(), 2)
+        if (width, height) != self.size:
+            self.size = (width, height)
+            for row in range(len(self.channels)):
+                top, _ = self.row_geometry(row)
+                zero = self.to_y(row, 0.0)
+                self.canvas.coords(self.axes[row], 0, zero, width, zero)
+                self.canvas.coords(self.labels[row], 4, top + 2)
+
+        for row, (_, deadzone_key) in enumerate(self.channels):
+            if deadzone_key:
+                deadzone = getattr(calibration, deadzone_key)
+                self.canvas.coords(self.bands[row], 0, self.to_y(row, deadzone),
+                                   width, self.to_y(row, -deadzone))
+
+        times, values = self.buffer.window(now - HISTORY_SECONDS)
+        if len(times) < 2:
+            return
+        x, mins, maxs = decimate_minmax(times, values, now - HISTORY_SECONDS, HISTORY_SECONDS, width)
+
+        # Interleave (x, min) and (x, max) so each column draws as a vertical stroke
+        points = np.empty((2 * len(x), 2))
+        points[0::2, 0] = x
+        points[1::2, 0] = x
+        for row, trace in enumerate(self.traces):
+            top, row_height = self.row_geometry(row)
+            scale = (row_height - 8) / 2.0
+            base = top + 4 + scale
+            points[0::2, 1] = base - mins[row] * scale
+            points[1::2, 1] = base - maxs[row] * scale
+            self.canvas.coords(trace, points.ravel().tolist())
+            self.canvas.itemconfigure(trace, state=tk.NORMAL)
 
 
 class GamepadGUI:
@@ -36,26 +260,44 @@ class GamepadGUI:
         self.config_manager = GamepadConfig()
         self.config = self.config_manager.config
 
-        # Initialize pygame for gamepad input
-        if not pygame.get_init():
-            pygame.init()
-        if not pygame.joystick.get_init():
-            pygame.joystick.init()
-
         self.gamepad_name = StringVar(value="Non connecté")
 
-        # Connect to gamepad
-        self.joystick = None
-        self.connect_gamepad()
-
         # Status variables
         self.status_text = StringVar(value="Prêt")
 
+        # Background input sampling; the sampler thread initialises SDL input, pumps
+        # its events, and opens the gamepad and applies its profile. The Tk thread
+        # only drains its results, and takes the gamepad from its DEVICE_OPENED event
+        self.joystick = None
+        self.sampler = InputSampler(open_devices=True, on_open=self.config_manager.attach_profile)
+        self.sampler.start()
+        self.show_no_gamepad()
+
         # For gamepad detection
         self.axis_values = {}
         self.button_states = {}
         self.listening_for = None
+
+        # Live display widgets, created once per device layout
+        self.input_layout = None
+        self.axis_rows = []
+        self.axis_vars = []
+        self.button_rows = []
+        self.button_vars = []
+
+        # Adaptive polling and frame time measurement
+        self.poll_interval = MIN_POLL_INTERVAL
+        self.frame_times = deque(maxlen=FRAME_TIME_WINDOW)
+        self.frame_time_text = StringVar(value="")
+        self.last_frame_report = 0.0
+        self.last_test_state = None
+        self.history_axes = ()
+        self.telemetry_poller = None
+        self.last_telemetry_display = 0.0
         self.detected_input = None
+        self.live_reader = LiveStateReader()
+        self.last_live_attach = 0.0
+        self.last_live_seq = None
 
         # Input mapping variables
         self.mapping_vars = {}
@@ -66,30 +308,37 @@ class GamepadGUI:
         # Start the update loop for gamepad feedback
         self.update_gamepad_status()
 
-    def connect_gamepad(self):
-        """Connect to the first available gamepad"""
-        if pygame.joystick.get_count() > 0:
-            if self.joystick is None:
-                self.joystick = pygame.joystick.Joystick(0)
-                self.joystick.init()
-                self.config_manager.joystick = self.joystick
-                self.gamepad_name.set(self.joystick.get_name())
-                self.status_text.set(f"Connecté à {self.joystick.get_name()}")
-
-                # Initialize axis and button states
-                if hasattr(self, 'axes_frame'):
-                    self.update_axes_display()
-                if hasattr(self, 'buttons_frame'):
-                    self.update_buttons_display()
-
-                return True
-            return True
-        else:
-            self.joystick = None
-            self.config_manager.joystick = None
-            self.gamepad_name.set("Non connecté")
-            self.status_text.set("Aucun gamepad détecté. Veuillez connecter un gamepad.")
-            return False
+    def close(self):
+        """Stop background sampling and telemetry before the window goes away"""
+        self.sampler.stop()
+        if self.telemetry_poller is not None:
+            self.telemetry_poller.stop()
+        self.live_reader.detach()
+
+    def gamepad_opened(self, instance_id, profile):
+        """Take the gamepad the sampler thread opened, with its profile already applied"""
+        joystick = self.sampler.joystick
+        if joystick is None or joystick.get_instance_id() != instance_id:
+            # Removed again since; its DEVICE_REMOVED event follows
+            return
+        self.joystick = joystick
+        self.config_manager.joystick = joystick
+        self.gamepad_name.set(joystick.get_name())
+        self.status_text.set(f"Connecté à {joystick.get_name()} "
+                             f"({'profil chargé' if profile else 'mapping par défaut'})")
+        self.setup_ui_variables()
+
+        # Create the live axis and button widgets for this device
+        self.build_input_widgets()
+        self.update_gamepad_info()
+
+    def show_no_gamepad(self):
+        """Forget the gamepad until the sampler opens another one"""
+        self.joystick = None
+        self.config_manager.joystick = None
+        self.listening_for = None
+        self.gamepad_name.set("Non connecté")
+        self.status_text.set("Aucun gamepad détecté. Veuillez connecter un gamepad.")
 
     def create_gui(self):
         """Create the main application GUI"""
@@ -103,6 +352,8 @@ class GamepadGUI:
         self.create_calibration_tab()
         self.create_performance_tab()
         self.create_test_tab()
+        self.create_history_tab()
+        self.create_telemetry_tab()
 
         # Bottom status bar
         self.status_bar = ttk.Frame(self.root)
@@ -114,6 +365,8 @@ class GamepadGUI:
         ttk.Label(self.status_bar, text="  Gamepad: ").pack(side=tk.LEFT)
         ttk.Label(self.status_bar, textvariable=self.gamepad_name).pack(side=tk.LEFT)
 
+        ttk.Label(self.status_bar, textvariable=self.frame_time_text).pack(side=tk.RIGHT)
+
         # Buttons at the bottom
         self.button_bar = ttk.Frame(self.root)
         self.button_bar.pack(fill=tk.X, side=tk.BOTTOM, padx=10, pady=5)
@@ -150,6 +403,8 @@ class GamepadGUI:
 2. Onglet Calibration: Permet de calibrer les axes et définir les deadzones.
 3. Onglet Performance: Configure les paramètres de performance comme la vitesse maximale.
 4. Onglet Test: Vous permet de tester la configuration en temps réel.
+5. Onglet Historique: Affiche l'évolution récente des axes pour régler les deadzones.
+6. Onglet Télémétrie: Affiche en direct les mesures du VESC (RPM, courants, tension, températures).
 
 Pour remapper une entrée:
 - Cliquez sur le bouton "Assigner" à côté du contrôle que vous souhaitez remapper
@@ -218,6 +473,8 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
         self.mapping_vars["boost_btn"] = IntVar(value=self.config["controls"]["boost_btn"])
         self.mapping_vars["reverse_btn"] = IntVar(value=self.config["controls"]["reverse_btn"])
         self.mapping_vars["cruise_toggle_btn"] = IntVar(value=self.config["controls"]["cruise_toggle_btn"])
+        self.mapping_vars["mode_cycle_btn"] = IntVar(value=self.config["controls"]["mode_cycle_btn"])
+        self.mapping_vars["takeover_btn"] = IntVar(value=self.config["controls"]["takeover_btn"])
 
         # Emergency stop button
         ttk.Label(controls_frame, text="Arrêt d'urgence:").grid(row=5, column=0, sticky=tk.W, padx=10, pady=2)
@@ -239,9 +496,19 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
         ttk.Label(controls_frame, textvariable=self.mapping_vars["cruise_toggle_btn"]).grid(row=8, column=1, padx=10, pady=2)
         ttk.Button(controls_frame, text="Assigner", command=lambda: self.start_listening("cruise_toggle_btn")).grid(row=8, column=2, padx=10, pady=2)
 
+        # Control mode button
+        ttk.Label(controls_frame, text="Mode suivant:").grid(row=9, column=0, sticky=tk.W, padx=10, pady=2)
+        ttk.Label(controls_frame, textvariable=self.mapping_vars["mode_cycle_btn"]).grid(row=9, column=1, padx=10, pady=2)
+        ttk.Button(controls_frame, text="Assigner", command=lambda: self.start_listening("mode_cycle_btn")).grid(row=9, column=2, padx=10, pady=2)
+
+        # Takeover button
+        ttk.Label(controls_frame, text="Prise de contrôle:").grid(row=10, column=0, sticky=tk.W, padx=10, pady=2)
+        ttk.Label(controls_frame, textvariable=self.mapping_vars["takeover_btn"]).grid(row=10, column=1, padx=10, pady=2)
+        ttk.Button(controls_frame, text="Assigner", command=lambda: self.start_listening("takeover_btn")).grid(row=10, column=2, padx=10, pady=2)
+
         # Status label for mapping feedback
         self.mapping_status = StringVar(value="Cliquez sur 'Assigner' puis actionnez le contrôle souhaité")
-        ttk.Label(controls_frame, textvariable=self.mapping_status, style="Info.TLabel").grid(row=9, column=0, columnspan=3, sticky=tk.W, padx=10, pady=10)
+        ttk.Label(controls_frame, textvariable=self.mapping_status, style="Info.TLabel").grid(row=11, column=0, columnspan=3, sticky=tk.W, padx=10, pady=10)
 
         # Live Gamepad Feedback
         feedback_frame = ttk.LabelFrame(tab, text="État du Gamepad en temps réel")
@@ -259,8 +526,7 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
 
         # Initialize the feedback displays
         if self.joystick:
-            self.update_axes_display()
-            self.update_buttons_display()
+            self.build_input_widgets()
 
     def create_calibration_tab(self):
         """Create the calibration tab for axes"""
@@ -366,11 +632,16 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
         self.performance_vars["max_duty_cycle"] = DoubleVar(value=self.config["performance"]["max_duty_cycle"])
         self.performance_vars["max_rpm"] = IntVar(value=self.config["performance"]["max_rpm"])
         self.performance_vars["max_current"] = DoubleVar(value=self.config["performance"]["max_current"])
+        self.performance_vars["max_brake_current"] = DoubleVar(value=self.config["performance"]["max_brake_current"])
         self.performance_vars["control_mode"] = StringVar(value=self.config["performance"]["control_mode"])
         self.performance_vars["boost_multiplier"] = DoubleVar(value=self.config["performance"]["boost_multiplier"])
         self.performance_vars["cruise_increment"] = DoubleVar(value=self.config["performance"]["cruise_increment"])
-        self.performance_vars["serial_port"] = StringVar(value=self.config["performance"].get("serial_port", "/dev/ttyACM0"))
-        self.performance_vars["baud_rate"] = IntVar(value=self.config["performance"].get("baud_rate", 115200))
+        self.performance_vars["serial_port"] = StringVar(value=self.config["performance"]["serial_port"])
+        self.performance_vars["baud_rate"] = IntVar(value=self.config["performance"]["baud_rate"])
+        self.performance_vars["serial_transport"] = StringVar(value=self.config["performance"]["serial_transport"])
+        self.performance_vars["input_rate_hz"] = IntVar(value=int(self.config["performance"]["input_rate_hz"]))
+        self.performance_vars["command_rate_hz"] = IntVar(value=int(self.config["performance"]["command_rate_hz"]))
+        self.performance_vars["mode_ramp_time"] = DoubleVar(value=self.config["performance"]["mode_ramp_time"])
 
         # Max Duty Cycle
         ttk.Label(performance_frame, text="Duty Cycle Maximum:").grid(row=0, column=0, sticky=tk.W, padx=10, pady=2)
@@ -393,7 +664,7 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
         # Control Mode
         ttk.Label(performance_frame, text="Mode de Contrôle:").grid(row=3, column=0, sticky=tk.W, padx=10, pady=2)
         control_mode_combo = ttk.Combobox(performance_frame, textvariable=self.performance_vars["control_mode"],
-                                         values=["duty_cycle", "rpm", "current"])
+                                         values=list(CONTROL_MODES), state="readonly")
         control_mode_combo.grid(row=3, column=1, sticky=tk.W, padx=10, pady=2)
 
         # Boost Multiplier
@@ -408,20 +679,54 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
                  orient=tk.HORIZONTAL, length=200).grid(row=5, column=1, padx=10, pady=2)
         ttk.Label(performance_frame, textvariable=self.performance_vars["cruise_increment"]).grid(row=5, column=2, padx=10, pady=2)
 
+        # Brake Current
+        ttk.Label(performance_frame, text="Courant de Freinage (A):").grid(row=6, column=0, sticky=tk.W, padx=10, pady=2)
+        ttk.Scale(performance_frame, from_=1, to=60, variable=self.performance_vars["max_brake_current"],
+                 orient=tk.HORIZONTAL, length=200).grid(row=6, column=1, padx=10, pady=2)
+        ttk.Label(performance_frame, textvariable=self.performance_vars["max_brake_current"]).grid(row=6, column=2, padx=10, pady=2)
+
         # Serial Connection Settings
         ttk.Label(performance_frame, text="Paramètres de connexion", style="Header.TLabel").grid(
-            row=6, column=0, sticky=tk.W, padx=10, pady=10)
+            row=7, column=0, sticky=tk.W, padx=10, pady=10)
 
         # Serial Port
-        ttk.Label(performance_frame, text="Port Série:").grid(row=7, column=0, sticky=tk.W, padx=10, pady=2)
+        ttk.Label(performance_frame, text="Port Série:").grid(row=8, column=0, sticky=tk.W, padx=10, pady=2)
         ttk.Entry(performance_frame, textvariable=self.performance_vars["serial_port"]).grid(
-            row=7, column=1, sticky=tk.W, padx=10, pady=2)
+            row=8, column=1, sticky=tk.W, padx=10, pady=2)
 
         # Baud Rate
-        ttk.Label(performance_frame, text="Vitesse (Baud):").grid(row=8, column=0, sticky=tk.W, padx=10, pady=2)
+        ttk.Label(performance_frame, text="Vitesse (Baud):").grid(row=9, column=0, sticky=tk.W, padx=10, pady=2)
         ttk.Combobox(performance_frame, textvariable=self.performance_vars["baud_rate"],
                     values=["9600", "19200", "38400", "57600", "115200", "230400"]).grid(
-            row=8, column=1, sticky=tk.W, padx=10, pady=2)
+            row=9, column=1, sticky=tk.W, padx=10, pady=2)
+
+        # Serial Transport
+        ttk.Label(performance_frame, text="Transport Série:").grid(row=10, column=0, sticky=tk.W, padx=10, pady=2)
+        ttk.Combobox(performance_frame, textvariable=self.performance_vars["serial_transport"],
+                    values=list(SERIAL_TRANSPORTS), state="readonly").grid(
+            row=10, column=1, sticky=tk.W, padx=10, pady=2)
+
+        # Loop Rates
+        ttk.Label(performance_frame, text="Cadences", style="Header.TLabel").grid(
+            row=11, column=0, sticky=tk.W, padx=10, pady=10)
+
+        # Gamepad Sampling Rate
+        ttk.Label(performance_frame, text="Échantillonnage Manette (Hz):").grid(row=12, column=0, sticky=tk.W, padx=10, pady=2)
+        ttk.Combobox(performance_frame, textvariable=self.performance_vars["input_rate_hz"],
+                    values=["100", "250", "500", "1000"]).grid(
+            row=12, column=1, sticky=tk.W, padx=10, pady=2)
+
+        # Command Rate
+        ttk.Label(performance_frame, text="Commandes VESC (Hz):").grid(row=13, column=0, sticky=tk.W, padx=10, pady=2)
+        ttk.Combobox(performance_frame, textvariable=self.performance_vars["command_rate_hz"],
+                    values=["20", "50", "100", "200"]).grid(
+            row=13, column=1, sticky=tk.W, padx=10, pady=2)
+
+        # Ramp after a control mode switch
+        ttk.Label(performance_frame, text="Rampe Changement de Mode (s):").grid(row=14, column=0, sticky=tk.W, padx=10, pady=2)
+        ttk.Scale(performance_frame, from_=0.0, to=2.0, variable=self.performance_vars["mode_ramp_time"],
+                 orient=tk.HORIZONTAL, length=200).grid(row=14, column=1, padx=10, pady=2)
+        ttk.Label(performance_frame, textvariable=self.performance_vars["mode_ramp_time"]).grid(row=14, column=2, padx=10, pady=2)
 
     def create_test_tab(self):
         """Create the test tab to verify configuration"""
@@ -495,13 +800,142 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
         self.button_states_display["cruise"] = StringVar(value="Off")
         ttk.Label(cruise_frame, textvariable=self.button_states_display["cruise"]).pack(side=tk.LEFT)
 
+        # What a running gamepad2car.py is actually sending, read from its shared live state
+        live_frame = ttk.LabelFrame(test_frame, text="Contrôleur en cours")
+        live_frame.pack(fill=tk.X, padx=10, pady=5)
+        self.live_state_text = StringVar(value="Aucun contrôleur en cours")
+        ttk.Label(live_frame, textvariable=self.live_state_text, style="Info.TLabel").pack(anchor=tk.W, padx=10, pady=5)
+
         # Output Display
         output_frame = ttk.LabelFrame(test_frame, text="Sortie VESC")
         output_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
         self.vesc_output = tk.Text(output_frame, height=8, width=70, wrap=tk.WORD)
         self.vesc_output.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        self.vesc_output.insert(tk.END, "La sortie VESC simulée sera affichée ici...\n")
+        self.vesc_log = TextLog(self.vesc_output)
+        self.vesc_log.append("La sortie VESC simulée sera affichée ici...")
+        self.vesc_log.flush(force=True)
+
+    def create_history_tab(self):
+        """Create the tab with scrolling history plots of the mapped axes"""
+        tab = ttk.Frame(self.notebook)
+        self.notebook.add(tab, text="Historique")
+
+        # Header
+        header = ttk.Frame(tab)
+        header.pack(fill=tk.X, padx=20, pady=10)
+
+        ttk.Label(header, text="Historique des Axes", style="Title.TLabel").pack(anchor=tk.W)
+        ttk.Label(header, text=f"{HISTORY_SECONDS:.0f} dernières secondes des axes mappés, bruts et après "
+                               f"deadzone/inversion (bande bleue: deadzone)").pack(anchor=tk.W)
+
+        canvas = tk.Canvas(tab, background="white", highlightthickness=0)
+        canvas.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        self.history_plot = AxisHistoryPlot(canvas)
+
+    def create_telemetry_tab(self):
+        """Create the live VESC telemetry tab"""
+        tab = ttk.Frame(self.notebook)
+        self.notebook.add(tab, text="Télémétrie")
+
+        # Header
+        header = ttk.Frame(tab)
+        header.pack(fill=tk.X, padx=20, pady=10)
+
+        ttk.Label(header, text="Télémétrie VESC", style="Title.TLabel").pack(anchor=tk.W)
+        ttk.Label(header, text="Valeurs lues en continu sur le VESC (GetValues) via le port série configuré").pack(anchor=tk.W)
+
+        # Connection controls
+        connection_frame = ttk.Frame(tab)
+        connection_frame.pack(fill=tk.X, padx=20, pady=5)
+        self.telemetry_button = ttk.Button(connection_frame, text="Connecter", command=self.toggle_telemetry)
+        self.telemetry_button.pack(side=tk.LEFT)
+        self.telemetry_status = StringVar(value="Déconnecté")
+        ttk.Label(connection_frame, textvariable=self.telemetry_status, style="Info.TLabel").pack(side=tk.LEFT, padx=10)
+
+        # Values: latest sample, mean over the display period
+        values_frame = ttk.LabelFrame(tab, text="Valeurs (dernière / moyenne)")
+        values_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+
+        self.telemetry_vars = {}
+        for row, (field, label, _) in enumerate(TELEMETRY_FIELDS):
+            ttk.Label(values_frame, text=f"{label}:").grid(row=row, column=0, sticky=tk.W, padx=10, pady=2)
+            self.telemetry_vars[field] = StringVar(value="-")
+            ttk.Label(values_frame, textvariable=self.telemetry_vars[field]).grid(row=row, column=1, sticky=tk.W, padx=10, pady=2)
+
+        row = len(TELEMETRY_FIELDS)
+        ttk.Label(values_frame, text="Pic courant moteur (A):").grid(row=row, column=0, sticky=tk.W, padx=10, pady=2)
+        self.telemetry_vars["peak_current"] = StringVar(value="-")
+        ttk.Label(values_frame, textvariable=self.telemetry_vars["peak_current"]).grid(row=row, column=1, sticky=tk.W, padx=10, pady=2)
+        ttk.Label(values_frame, text="Code défaut:").grid(row=row + 1, column=0, sticky=tk.W, padx=10, pady=2)
+        self.telemetry_vars["fault_code"] = StringVar(value="-")
+        ttk.Label(values_frame, textvariable=self.telemetry_vars["fault_code"]).grid(row=row + 1, column=1, sticky=tk.W, padx=10, pady=2)
+
+    def toggle_telemetry(self):
+        """Start or stop polling the VESC"""
+        if self.telemetry_poller is not None and self.telemetry_poller.running:
+            self.telemetry_poller.stop()
+            self.telemetry_button.config(text="Connecter")
+            self.telemetry_status.set("Déconnecté")
+            return
+
+        performance = self.config_manager.settings.performance
+        self.telemetry_poller = TelemetryPoller(performance.serial_port, performance.baud_rate)
+        if self.telemetry_poller.start():
+            self.telemetry_button.config(text="Déconnecter")
+            self.telemetry_status.set(f"Connecté à {performance.serial_port}")
+        else:
+            self.telemetry_status.set(f"Erreur: {self.telemetry_poller.error}")
+
+    def update_telemetry_display(self):
+        """Show the telemetry decimated to the display rate, returning True while polling"""
+        poller = self.telemetry_poller
+        if poller is None:
+            return False
+        if not poller.running:
+            if poller.error:
+                self.telemetry_status.set(f"Erreur: {poller.error}")
+                self.telemetry_button.config(text="Connecter")
+            return False
+
+        now = time.monotonic()
+        if now - self.last_telemetry_display < TELEMETRY_DISPLAY_INTERVAL:
+            return True
+        self.last_telemetry_display = now
+
+        window = poller.take()
+        if window is None:
+            self.telemetry_status.set(f"Connecté, aucune réponse ({poller.timeouts} requêtes perdues)")
+            return True
+
+        for field, _, fmt in TELEMETRY_FIELDS:
+            latest = getattr(window.latest, field)
+            mean = getattr(window.mean, field)
+            if latest is None:
+                self.telemetry_vars[field].set("n/d")
+            else:
+                self.telemetry_vars[field].set(f"{fmt.format(latest)} / {fmt.format(mean)}")
+        self.telemetry_vars["peak_current"].set(f"{window.peak_current_motor:.2f}")
+        self.telemetry_vars["fault_code"].set(str(window.latest.fault_code))
+        self.telemetry_status.set(f"{window.rate_hz:.0f} échantillons/s, {poller.timeouts} requêtes perdues")
+        return True
+
+    def sample_history(self, axes, timestamp):
+        """Record the mapped axes, raw and shaped, into the history plot"""
+        controls = self.config_manager.settings.controls
+        num_axes = len(axes)
+        throttle = axes[controls.throttle_axis] if controls.throttle_axis < num_axes else 0.0
+        brake = axes[controls.brake_axis] if controls.brake_axis < num_axes else 0.0
+        steering = axes[controls.steering_axis] if controls.steering_axis < num_axes else 0.0
+
+        shaped = self.config_manager.shape_axes(axes)
+        self.history_plot.append(timestamp, (
+            throttle,
+            brake,
+            steering,
+            shaped.throttle,
+            shaped.steering,
+        ))
 
     def start_listening(self, control_name):
         """Start listening for gamepad input to map a control"""
@@ -513,93 +947,192 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
         type_control = "bouton" if "btn" in control_name else "axe"
         self.mapping_status.set(f"En attente d'input... Actionnez l'{type_control} pour '{control_name}'")
 
-        # Initialize baseline for axis detection
-        if "axis" in control_name:
-            self.axis_baseline = []
-            for i in range(self.joystick.get_numaxes()):
-                self.axis_baseline.append(self.joystick.get_axis(i))
+        # Discard input that happened before listening started, and take the
+        # axis baseline from the latest sample
+        self.sampler.drain()
+        self.axis_baseline = list(self.sampler.snapshot.axes)
 
     def update_gamepad_status(self):
         """Update the gamepad status regularly"""
-        # Try to reconnect gamepad if not connected
-        if not self.joystick:
-            self.connect_gamepad()
+        frame_start = time.perf_counter()
+        changed = False
+
+        # Everything the sampler saw since the last update, in order
+        events = self.sampler.drain()
+        if events:
+            changed = True
+            self.handle_device_events(events)
 
         # Process events and get current values
         if self.joystick:
-            # Process pygame events
-            pygame.event.pump()
+            snapshot = self.sampler.snapshot
 
-            # Update axis and button displays if they exist
-            if hasattr(self, 'axes_frame'):
-                self.update_axes_display()
-            if hasattr(self, 'buttons_frame'):
-                self.update_buttons_display()
+            # Only refresh the widgets of the visible tab
+            current_tab = self.notebook.index(self.notebook.select())
+            if current_tab == MAPPING_TAB:
+                changed = self.update_axes_display(snapshot.axes) or changed
+                changed = self.update_buttons_display(snapshot.buttons) or changed
 
             # Handle listening for control mapping
             if self.listening_for:
-                self.detect_input()
+                self.detect_input(events)
 
             # Update test display
-            if self.notebook.index(self.notebook.select()) == 4:  # Test tab is selected
-                self.update_test_display()
+            if current_tab == TEST_TAB:
+                changed = self.update_test_display() or changed
+                self.vesc_log.flush()
+
+            # Plots scroll continuously, so keep polling at the fast rate
+            if current_tab == HISTORY_TAB:
+                self.feed_history(events, snapshot)
+                self.history_plot.redraw(self.config_manager.settings.calibration)
+                changed = True
+
+        # Telemetry and the running controller's state don't need a gamepad
+        current_tab = self.notebook.index(self.notebook.select())
+        if current_tab == TELEMETRY_TAB:
+            changed = self.update_telemetry_display() or changed
+        elif current_tab == TEST_TAB:
+            changed = self.update_live_state_display() or changed
+
+        self.record_frame_time(time.perf_counter() - frame_start)
+
+        # Poll quickly while input is arriving, back off gradually when idle
+        if changed:
+            self.poll_interval = MIN_POLL_INTERVAL
+        else:
+            self.poll_interval = min(MAX_POLL_INTERVAL, int(self.poll_interval * 1.5))
 
         # Schedule the next update
-        self.root.after(50, self.update_gamepad_status)
-
-    def update_axes_display(self):
-        """Update the axes display in the mapping tab"""
-        # Clear previous display
-        for widget in self.axes_frame.winfo_children():
-            if widget != self.axes_frame.winfo_children()[0]:  # Keep the header
-                widget.destroy()
-
-        # Display current axes values
-        for i in range(self.joystick.get_numaxes()):
-            value = self.joystick.get_axis(i)
-            self.axis_values[i] = value
+        self.root.after(self.poll_interval, self.update_gamepad_status)
+
+    def record_frame_time(self, duration):
+        """Record the duration of one GUI update and refresh the status bar once per second"""
+        self.frame_times.append(duration)
+        now = time.monotonic()
+        if now - self.last_frame_report >= 1.0:
+            self.last_frame_report = now
+            stats = self.frame_time_stats()
+            self.frame_time_text.set(f"Frame: {stats['mean_ms']:.2f} ms moy. / {stats['max_ms']:.2f} ms max "
+                                     f"| {self.poll_interval} ms")
+
+    def frame_time_stats(self):
+        """Return mean, 95th percentile and max GUI update time (ms) over the recent window"""
+        if not self.frame_times:
+            return {"frames": 0, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self.frame_times)
+        return {
+            "frames": len(ordered),
+            "mean_ms": sum(ordered) / len(ordered) * 1000,
+            "p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+            "max_ms": ordered[-1] * 1000,
+        }
+
+    def build_input_widgets(self):
+        """Create the live axis and button widgets once for the current device layout"""
+        if self.joystick:
+            layout = (self.joystick.get_numaxes(), self.joystick.get_numbuttons())
+        else:
+            layout = (0, 0)
+        if layout == self.input_layout:
+            return
+        self.input_layout = layout
+
+        for row in self.axis_rows + self.button_rows:
+            row.destroy()
+        self.axis_rows, self.axis_vars = [], []
+        self.button_rows, self.button_vars = [], []
+        self.axis_values.clear()
+        self.button_states.clear()
+
+        num_axes, num_buttons = layout
+        for i in range(num_axes):
+            var = StringVar(value="0.00")
             frame = ttk.Frame(self.axes_frame)
             frame.pack(fill=tk.X, pady=2)
             ttk.Label(frame, text=f"Axe {i}:").pack(side=tk.LEFT, padx=5)
-            ttk.Label(frame, text=f"{value:.2f}").pack(side=tk.LEFT, padx=5)
-
-    def update_buttons_display(self):
-        """Update the buttons display in the mapping tab"""
-        # Clear previous display
-        for widget in self.buttons_frame.winfo_children():
-            if widget != self.buttons_frame.winfo_children()[0]:  # Keep the header
-                widget.destroy()
-
-        # Display current button states
-        for i in range(self.joystick.get_numbuttons()):
-            state = self.joystick.get_button(i)
-            self.button_states[i] = state
+            ttk.Label(frame, textvariable=var).pack(side=tk.LEFT, padx=5)
+            self.axis_rows.append(frame)
+            self.axis_vars.append(var)
+
+        for i in range(num_buttons):
+            var = StringVar(value="off")
             frame = ttk.Frame(self.buttons_frame)
             frame.pack(fill=tk.X, pady=2)
             ttk.Label(frame, text=f"Bouton {i}:").pack(side=tk.LEFT, padx=5)
-            ttk.Label(frame, text="ON" if state else "off").pack(side=tk.LEFT, padx=5)
-
-    def detect_input(self):
-        """Detect gamepad input for mapping"""
+            ttk.Label(frame, textvariable=var).pack(side=tk.LEFT, padx=5)
+            self.button_rows.append(frame)
+            self.button_vars.append(var)
+
+    def update_axes_display(self, axes):
+        """Update the axes display in the mapping tab, returning True if any value changed"""
+        self.build_input_widgets()
+        changed = False
+        for i, var in enumerate(self.axis_vars[:len(axes)]):
+            # Compare at display precision so noise below 0.01 doesn't touch Tk
+            value = round(axes[i], 2)
+            if self.axis_values.get(i) != value:
+                self.axis_values[i] = value
+                var.set(f"{value:.2f}")
+                changed = True
+        return changed
+
+    def update_buttons_display(self, buttons):
+        """Update the buttons display in the mapping tab, returning True if any state changed"""
+        self.build_input_widgets()
+        changed = False
+        for i, var in enumerate(self.button_vars[:len(buttons)]):
+            state = buttons[i]
+            if self.button_states.get(i) != state:
+                self.button_states[i] = state
+                var.set("ON" if state else "off")
+                changed = True
+        return changed
+
+    def handle_device_events(self, events):
+        """React to the sampler losing its gamepad or opening another one"""
+        for event in events:
+            if event.kind == DEVICE_REMOVED:
+                if self.joystick and self.joystick.get_instance_id() == event.index:
+                    self.show_no_gamepad()
+                    self.build_input_widgets()
+                    self.update_gamepad_info()
+            elif event.kind == DEVICE_OPENED:
+                self.gamepad_opened(event.index, event.value > 0.0)
+
+    def detect_input(self, events):
+        """Detect gamepad input for mapping from the queued input edges"""
         if not self.joystick or not self.listening_for:
             return
 
-        if "btn" in self.listening_for:
-            # Detect button press
-            for i in range(self.joystick.get_numbuttons()):
-                if self.joystick.get_button(i):
-                    self.detected_input = i
+        for event in events:
+            if "btn" in self.listening_for:
+                # A press edge, however short, selects the button
+                if event.kind == BUTTON_DOWN:
+                    self.detected_input = event.index
                     self.apply_mapping()
                     return
-        else:
-            # Detect significant axis movement
-            for i in range(self.joystick.get_numaxes()):
-                current = self.joystick.get_axis(i)
-                if abs(current - self.axis_baseline[i]) > 0.5:
-                    self.detected_input = i
+            elif event.kind == AXIS_MOTION and event.index < len(self.axis_baseline):
+                # Significant movement away from where the axis rested when listening started
+                if abs(event.value - self.axis_baseline[event.index]) > 0.5:
+                    self.detected_input = event.index
                     self.apply_mapping()
                     return
 
+    def feed_history(self, events, snapshot):
+        """Add every axis sample seen since the last update to the history plot"""
+        axes = list(self.history_axes)
+        if len(axes) != len(snapshot.axes):
+            axes = list(snapshot.axes)
+        for event in events:
+            if event.kind == AXIS_MOTION and event.index < len(axes):
+                axes[event.index] = event.value
+                self.sample_history(axes, event.timestamp)
+
+        # Always end on the latest snapshot so the trace reaches the present
+        self.history_axes = snapshot.axes
+        self.sample_history(snapshot.axes, time.monotonic())
+
     def apply_mapping(self):
         """Apply the detected input to the mapping"""
         if not self.detected_input is None:
@@ -611,6 +1144,7 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
 
             # Update mapping var
             self.mapping_vars[self.listening_for].set(self.detected_input)
+            self.config_manager.update_settings()
 
             # Reset
             self.mapping_status.set(f"'{self.listening_for}' mappé à {'bouton' if 'btn' in self.listening_for else 'axe'} {self.detected_input}")
@@ -618,23 +1152,42 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
             self.detected_input = None
 
     def update_test_display(self):
-        """Update the test display tab"""
+        """Update the test display tab, returning True if the controls are active"""
         if not self.joystick:
-            return
+            return False
+
+        # Control values from the sampler's latest snapshot, without reading the gamepad here
+        snapshot = self.sampler.snapshot
+        if not snapshot.axes:
+            return False
+        controls = self.config_manager.shape_axes(snapshot.axes)
+        throttle = controls.throttle
+        steering = controls.steering
+
+        # Only touch the widgets when something visible changed
+        mapping = self.config_manager.settings.controls
+        buttons = snapshot.buttons
 
-        # Get control values
-        throttle = self.config_manager.get_control_value("throttle")
-        steering = self.config_manager.get_control_value("steering")
+        def pressed(index):
+            return index < len(buttons) and bool(buttons[index])
+
+        state = (round(throttle, 2), round(steering, 2),
+                 pressed(mapping.emergency_stop_btn), pressed(mapping.boost_btn),
+                 pressed(mapping.reverse_btn), pressed(mapping.cruise_toggle_btn))
+        if state == self.last_test_state:
+            return False
+        self.last_test_state = state
 
         # Update progress bars (scale from -1,1 to 0,100)
         self.throttle_value.set((throttle + 1) * 50)
         self.steering_value.set((steering + 1) * 50)
 
         # Update button states
-        self.button_states_display["emergency"].set("ON" if self.config_manager.is_button_pressed("emergency_stop") else "Off")
-        self.button_states_display["boost"].set("ON" if self.config_manager.is_button_pressed("boost") else "Off")
-        self.button_states_display["reverse"].set("ON" if self.config_manager.is_button_pressed("reverse") else "Off")
-        self.button_states_display["cruise"].set("ON" if self.config_manager.is_button_pressed("cruise_toggle") else "Off")
+        emergency, boost, reverse, cruise = state[2:]
+        self.button_states_display["emergency"].set("ON" if emergency else "Off")
+        self.button_states_display["boost"].set("ON" if boost else "Off")
+        self.button_states_display["reverse"].set("ON" if reverse else "Off")
+        self.button_states_display["cruise"].set("ON" if cruise else "Off")
 
         # Simulate VESC output
         if throttle != 0 or steering != 0:
@@ -643,14 +1196,32 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
                     self.config["performance"]["max_rpm"] if control_mode == "rpm" else \
                     self.config["performance"]["max_current"]
 
-            self.vesc_output.insert(tk.END, f"Envoi {control_mode}: Throttle={throttle:.2f}, Steering={steering:.2f}, "
-                                           f"Valeur={throttle * max_val:.2f}\n")
-            self.vesc_output.see(tk.END)
-
-            # Limit the number of lines in the output
-            lines = self.vesc_output.get("1.0", tk.END).split("\n")
-            if len(lines) > 50:
-                self.vesc_output.delete("1.0", f"{len(lines)-50}.0")
+            self.vesc_log.append(f"Envoi {control_mode}: Throttle={throttle:.2f}, Steering={steering:.2f}, "
+                                 f"Valeur={throttle * max_val:.2f}")
+        return True
+
+    def update_live_state_display(self):
+        """Show the state published by a running controller, returning True if it changed"""
+        reader = self.live_reader
+        now = time.monotonic()
+        if not reader.attached:
+            if now - self.last_live_attach < LIVE_STATE_ATTACH_INTERVAL:
+                return False
+            self.last_live_attach = now
+            if not reader.attach():
+                return False
+
+        state = reader.read()
+        if state is None or state.seq == self.last_live_seq:
+            if state is not None and state.age > LIVE_STATE_STALE:
+                # The controller stopped; a new one will create a new block
+                reader.detach()
+                self.last_live_seq = None
+                self.live_state_text.set("Aucun contrôleur en cours")
+            return False
+        self.last_live_seq = state.seq
+        self.live_state_text.set(format_state(state))
+        return True
 
     def run_axis_calibration(self, axis_name):
         """Run an interactive calibration for an axis"""
@@ -688,12 +1259,16 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
         min_value = DoubleVar()
         max_value = DoubleVar()
 
+        def current_axis():
+            axes = self.sampler.snapshot.axes
+            return axes[axis_index] if axis_index < len(axes) else 0.0
+
         def set_min():
-            min_value.set(self.joystick.get_axis(axis_index))
+            min_value.set(current_axis())
             min_btn.config(text=f"Min: {min_value.get():.2f}")
 
         def set_max():
-            max_value.set(self.joystick.get_axis(axis_index))
+            max_value.set(current_axis())
             max_btn.config(text=f"Max: {max_value.get():.2f}")
 
         min_btn = ttk.Button(button_frame, text="Définir Min", command=set_min)
@@ -721,11 +1296,18 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
         action_frame.pack(pady=20, fill=tk.X, padx=20)
 
         def save_calibration():
-            # Update config with new calibration values
-            self.config["calibration"][f"{axis_name}_min"] = min_value.get()
-            self.config["calibration"][f"{axis_name}_max"] = max_value.get()
-            self.config["calibration"][f"{axis_name}_deadzone"] = deadzone_var.get()
-            self.config["calibration"][f"invert_{axis_name}"] = bool(invert_var.get())
+            # Update config with new calibration values, restored if they don't validate
+            calibration = self.config["calibration"]
+            keys = (f"{axis_name}_min", f"{axis_name}_max", f"{axis_name}_deadzone", f"invert_{axis_name}")
+            previous = {key: calibration[key] for key in keys}
+            calibration[f"{axis_name}_min"] = min_value.get()
+            calibration[f"{axis_name}_max"] = max_value.get()
+            calibration[f"{axis_name}_deadzone"] = deadzone_var.get()
+            calibration[f"invert_{axis_name}"] = bool(invert_var.get())
+            if not self.config_manager.update_settings():
+                calibration.update(previous)
+                messagebox.showerror("Erreur", "Calibration invalide: la valeur min doit être inférieure à la valeur max")
+                return
 
             # Update UI variables
             self.calibration_vars[f"{axis_name}_min"].set(min_value.get())
@@ -742,7 +1324,7 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
         # Function to update current value display
         def update_display():
             if calibration_window.winfo_exists():
-                current_value.set(f"{self.joystick.get_axis(axis_index):.2f}")
+                current_value.set(f"{current_axis():.2f}")
                 calibration_window.after(50, update_display)
 
         # Start the update loop
@@ -765,6 +1347,7 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
 
         # Format info
         info = f"Nom: {name}\n"
+        info += f"GUID: {self.joystick.get_guid()}\n"
         info += f"Nombre d'axes: {num_axes}\n"
         info += f"Nombre de boutons: {num_buttons}\n"
         info += f"Nombre de chapeaux: {num_hats}\n\n"
@@ -778,6 +1361,8 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
         info += f"Boost: Bouton {self.config['controls']['boost_btn']}\n"
         info += f"Marche arrière: Bouton {self.config['controls']['reverse_btn']}\n"
         info += f"Régulateur de vitesse: Bouton {self.config['controls']['cruise_toggle_btn']}\n"
+        info += f"Mode suivant: Bouton {self.config['controls']['mode_cycle_btn']}\n"
+        info += f"Prise de contrôle: Bouton {self.config['controls']['takeover_btn']}\n"
 
         # Update text widget
         self.gamepad_info_text.config(state=tk.NORMAL)
@@ -787,18 +1372,13 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
 
     def refresh_gamepad(self):
         """Refresh the gamepad connection"""
-        if self.joystick:
-            self.joystick.quit()
-            self.joystick = None
-
-        pygame.joystick.quit()
-        pygame.joystick.init()
-
-        if self.connect_gamepad():
-            self.status_text.set(f"Gamepad actualisé: {self.joystick.get_name()}")
-            self.update_gamepad_info()
-        else:
-            self.status_text.set("Aucun gamepad détecté. Veuillez connecter un gamepad.")
+        # The sampler thread owns SDL input: stopping it shuts the subsystems down
+        # (closing the joystick) after its last read, and starting it again
+        # reinitialises them on the new sampler thread, which opens the gamepad
+        # for the next update to take
+        self.sampler.stop()
+        self.show_no_gamepad()
+        self.sampler.start()
 
     def save_config(self):
         """Save the current configuration"""
@@ -830,13 +1410,13 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
             messagebox.showinfo("Succès", "Configuration enregistrée avec succès!")
             self.status_text.set("Configuration enregistrée")
         else:
-            messagebox.showerror("Erreur", "Impossible d'enregistrer la configuration")
+            messagebox.showerror("Erreur", "Impossible d'enregistrer la configuration (valeurs invalides ou erreur d'écriture)")
 
     def restore_defaults(self):
         """Restore default configuration"""
         if messagebox.askyesno("Confirmer", "Êtes-vous sûr de vouloir restaurer la configuration par défaut ?"):
-            self.config = DEFAULT_CONFIG.copy()
-            self.config_manager.config = self.config
+            self.config_manager.reset_config()
+            self.config = self.config_manager.config
 
             # Update UI variables
             self.setup_ui_variables()
@@ -870,9 +1450,20 @@ N'oubliez pas d'enregistrer votre configuration avant de quitter!
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Graphical gamepad configuration for gamepad2car')
+    parser.add_argument('--frame-stats', action='store_true',
+                        help='Print GUI update frame time statistics on exit')
+    args = parser.parse_args()
+
     root = tk.Tk()
     app = GamepadGUI(root)
     root.mainloop()
+    app.close()
+
+    if args.frame_stats:
+        stats = app.frame_time_stats()
+        print(f"GUI frame time over {stats['frames']} frames: mean {stats['mean_ms']:.3f} ms, "
+              f"p95 {stats['p95_ms']:.3f} ms, max {stats['max_ms']:.3f} ms")
 
     # Ensure pygame quits properly
     pygame.quit()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+gui_frame_times.py - Measure the GUI's frame time, here and at a baseline revision
+
+Opens gamepad_gui.py's window with a stand-in gamepad whose axes sweep and
+whose buttons toggle, so every frame has input to show, and times each
+frame on the tabs that follow the gamepad live:
+1. update_gamepad_status(), the GUI's per-frame update
+2. root.update_idletasks(), the geometry and redraw work the update queued
+
+With --baseline REV, the same measurement runs on a git worktree of REV, so
+before/after figures come from the same machine and the same input. Needs
+an X display (DISPLAY); on a headless machine, run it under xvfb-run.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from gamepad_config import Colors
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_FRAMES = 2000
+
+# Tabs timed: (label, notebook index); both exist in every revision of the GUI
+TABS = (("Aperçu", 0), ("Mapping", 1), ("Test", 4))
+
+# Frames run on each tab before timing starts (widget creation, first layout)
+WARMUP_FRAMES = 50
+
+# Runs in the source directory under test; prints one JSON line of frame times per tab
+FRAME_SCRIPT = r"""
+import json, math, sys, time
+import tkinter as tk
+import pygame
+import gamepad_gui
+
+class SweepJoystick:
+    # Six axes sweeping at different rates and twelve buttons toggling
+    def __init__(self, index=0):
+        self.start = time.perf_counter()
+    def _t(self):
+        return time.perf_counter() - self.start
+    def init(self): pass
+    def quit(self): pass
+    def get_init(self): return True
+    def get_id(self): return 0
+    def get_instance_id(self): return 0
+    def get_guid(self): return "00000000000000000000000000000000"
+    def get_name(self): return "Sweep joystick"
+    def get_numaxes(self): return 6
+    def get_numbuttons(self): return 12
+    def get_numhats(self): return 0
+    def get_axis(self, i): return math.sin(self._t() * (i + 1))
+    def get_button(self, i): return int(self._t() * (i + 1)) % 2
+
+pygame.joystick.get_count = lambda: 1
+pygame.joystick.Joystick = SweepJoystick
+
+frames, warmup, tabs = int(sys.argv[1]), int(sys.argv[2]), json.loads(sys.argv[3])
+root = tk.Tk()
+app = gamepad_gui.GamepadGUI(root)
+results = {}
+for label, index in tabs:
+    app.notebook.select(index)
+    root.update()
+    times = []
+    for i in range(warmup + frames):
+        start = time.perf_counter()
+        app.update_gamepad_status()
+        root.update_idletasks()
+        if i >= warmup:
+            times.append(time.perf_counter() - start)
+        time.sleep(0.001)
+    results[label] = times
+if hasattr(app, "close"):
+    app.close()
+root.destroy()
+print(json.dumps(results))
+"""
+
+
+def frame_times(source_dir, frames=DEFAULT_FRAMES, warmup=WARMUP_FRAMES):
+    """Run FRAME_SCRIPT on the GUI in source_dir; returns {tab label: [frame seconds]}"""
+    result = subprocess.run([sys.executable, "-c", FRAME_SCRIPT, str(frames), str(warmup), json.dumps(TABS)],
+                            cwd=source_dir, env=dict(os.environ, PYTHONPATH=source_dir),
+                            stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"GUI frame timing failed in {source_dir}:\n{result.stderr.strip()}")
+    return json.loads(lines[-1])
+
+
+def baseline_frame_times(revision, frames=DEFAULT_FRAMES):
+    """frame_times() on a temporary git worktree of revision"""
+    with tempfile.TemporaryDirectory() as parent:
+        worktree = os.path.join(parent, "baseline")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, revision], cwd=HERE,
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            return frame_times(worktree, frames)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=HERE,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def summarize(times):
+    """(mean, p95, max) in ms"""
+    ordered = sorted(times)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return statistics.fmean(times) * 1000, p95 * 1000, ordered[-1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the GUI's frame time, here and at a baseline revision")
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES, help='Frames timed per tab')
+    parser.add_argument('--baseline', metavar='REV', help='Also measure this git revision, for comparison')
+    args = parser.parse_args()
+
+    if not os.environ.get("DISPLAY"):
+        print(f"{Colors.RED}No X display: set DISPLAY or run under xvfb-run{Colors.RESET}")
+        return 1
+
+    runs = [("current", lambda: frame_times(HERE, args.frames))]
+    if args.baseline:
+        runs.insert(0, (args.baseline, lambda: baseline_frame_times(args.baseline, args.frames)))
+
+    print(f"\n{Colors.CYAN}=== GUI frame time ({args.frames} frames per tab) ==={Colors.RESET}")
+    print(f"  {'revision':<14}{'tab':<10}{'mean ms':>9}{'p95 ms':>9}{'max ms':>9}")
+    for name, measure in runs:
+        try:
+            results = measure()
+        except RuntimeError as e:
+            print(f"{Colors.RED}{e}{Colors.RESET}")
+            return 1
+        for label, times in results.items():
+            mean, p95, worst = summarize(times)
+            print(f"  {name:<14}{label:<10}{mean:>9.3f}{p95:>9.3f}{worst:>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
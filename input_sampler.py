@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+input_sampler.py - Background gamepad sampling for gamepad2car tools
+
+Reads the gamepad in a dedicated thread at a high rate and exposes:
+1. The latest full input state as an immutable snapshot
+2. A queue of input edges (button presses/releases, axis motion, hotplug)
+
+With open_devices, the thread also opens the gamepad to sample itself: the
+first one at start, a new one plugged in while there is none, and the next
+one present when the sampled gamepad is removed.
+
+Consumers such as the Tk GUI only drain what has accumulated since their
+last update, so short taps and fast flicks are not lost between redraws.
+
+The sampling thread owns SDL input: it initialises the subsystems when it
+starts, is the only thread that pumps SDL events, and shuts SDL down when
+it stops. Other threads may still read the properties of opened devices.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import NamedTuple, Tuple
+
+# Set environment variables to prevent D-Bus issues BEFORE importing pygame
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+os.environ["SDL_DBUS_SCREENSAVER_INHIBIT"] = "0"
+
+import pygame
+
+from gamepad_config import init_input, quit_input
+
+# Default sampling rate of the background thread
+SAMPLER_RATE_HZ = 500
+
+# Maximum number of queued events kept when the consumer falls behind
+EVENT_QUEUE_SIZE = 4096
+
+# Longest wait for the sampling thread to initialise SDL input (s)
+START_TIMEOUT = 2.0
+
+# Event kinds
+BUTTON_DOWN = "button_down"
+BUTTON_UP = "button_up"
+AXIS_MOTION = "axis"
+DEVICE_ADDED = "device_added"
+DEVICE_REMOVED = "device_removed"
+DEVICE_OPENED = "device_opened"
+
+
+class InputSnapshot(NamedTuple):
+    """Full gamepad state at one sampling instant"""
+    timestamp: float
+    axes: Tuple[float, ...]
+    buttons: Tuple[int, ...]
+
+
+class InputEvent(NamedTuple):
+    """A single input edge; index is the button/axis index or the SDL device/instance id.
+
+    A DEVICE_OPENED event's value is 1.0 when on_open returned a true value.
+    """
+    kind: str
+    index: int
+    value: float
+    timestamp: float
+
+
+EMPTY_SNAPSHOT = InputSnapshot(0.0, (), ())
+
+# SDL events that belong to one gamepad's inputs
+JOYSTICK_INPUT_EVENTS = frozenset((pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP, pygame.JOYAXISMOTION))
+
+
+class InputSampler:
+    """Sample a joystick in a background thread.
+
+    The snapshot is replaced as a whole on every sample, so readers simply
+    take the current reference without locking. Events are appended to a
+    deque, whose append/popleft are atomic, and drained by the consumer.
+    Button and axis events of other gamepads than the sampled one are
+    dropped; hotplug events are kept for every device.
+
+    With open_devices, the sampler opens the gamepad it samples on its own
+    thread and calls on_open(joystick) there, e.g. to apply its profile,
+    before queuing a DEVICE_OPENED event; the consumer then takes the
+    joystick from the joystick attribute.
+    """
+
+    def __init__(self, joystick=None, rate_hz=SAMPLER_RATE_HZ, open_devices=False, on_open=None):
+        self.joystick = None
+        self.instance_id = None
+        self.period = 1.0 / rate_hz
+        self.open_devices = open_devices
+        self.on_open = on_open
+        self.snapshot = EMPTY_SNAPSHOT
+        self.events = deque(maxlen=EVENT_QUEUE_SIZE)
+        self.samples = 0
+        self._running = False
+        self._thread = None
+        self._ready = threading.Event()
+        self.set_joystick(joystick)
+
+    def set_joystick(self, joystick):
+        """Switch the sampled joystick (None stops reading state until a new one is set)"""
+        self.instance_id = joystick.get_instance_id() if joystick is not None else None
+        self.joystick = joystick
+        if joystick is None:
+            self.snapshot = EMPTY_SNAPSHOT
+
+    def start(self):
+        """Start the sampling thread and wait until it has initialised SDL input.
+
+        With open_devices, the first gamepad present is open by then.
+        """
+        if self._running:
+            return
+        self._running = True
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name="InputSampler", daemon=True)
+        self._thread.start()
+        self._ready.wait(START_TIMEOUT)
+
+    def stop(self):
+        """Stop the sampling thread, which shuts SDL input down, and wait for it to exit.
+
+        Joysticks opened while it ran are closed with the subsystem.
+        """
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.set_joystick(None)
+
+    def drain(self):
+        """Return and remove all events accumulated since the last call"""
+        events = []
+        pop = self.events.popleft
+        try:
+            while True:
+                events.append(pop())
+        except IndexError:
+            return events
+
+    def _run(self):
+        """Sampling loop, between SDL input start-up and shutdown on this thread"""
+        init_input()
+        if self.open_devices:
+            self.open_device(0, time.monotonic())
+        self._ready.set()
+        try:
+            next_sample = time.monotonic()
+            while self._running:
+                self.sample()
+                next_sample += self.period
+                delay = next_sample - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Fell behind (e.g. thread starved); resynchronise instead of bursting
+                    next_sample = time.monotonic()
+        finally:
+            self.joystick = None
+            quit_input()
+
+    def open_device(self, device_index, now):
+        """Open the gamepad at device_index, if present, and sample it from now on (sampler thread)"""
+        if device_index >= pygame.joystick.get_count():
+            return
+        try:
+            joystick = pygame.joystick.Joystick(device_index)
+            joystick.init()
+        except pygame.error:
+            # Unplugged again before it could be opened
+            return
+        result = self.on_open(joystick) if self.on_open is not None else None
+        self.set_joystick(joystick)
+        self.events.append(InputEvent(DEVICE_OPENED, self.instance_id, 1.0 if result else 0.0, now))
+
+    def sample(self):
+        """Collect pending SDL events and take one snapshot of the joystick"""
+        now = time.monotonic()
+        append = self.events.append
+
+        # SDL reports every button edge as an event, even taps shorter than our period.
+        # Unrelated events are consumed too so the SDL queue never fills up.
+        instance_id = self.instance_id
+        for event in pygame.event.get():
+            if event.type in JOYSTICK_INPUT_EVENTS and event.instance_id != instance_id:
+                # Another gamepad: it must not feed mapping detection or the plots
+                continue
+            if event.type == pygame.JOYBUTTONDOWN:
+                append(InputEvent(BUTTON_DOWN, event.button, 1.0, now))
+            elif event.type == pygame.JOYBUTTONUP:
+                append(InputEvent(BUTTON_UP, event.button, 0.0, now))
+            elif event.type == pygame.JOYAXISMOTION:
+                append(InputEvent(AXIS_MOTION, event.axis, event.value, now))
+            elif event.type == pygame.JOYDEVICEADDED:
+                append(InputEvent(DEVICE_ADDED, event.device_index, 0.0, now))
+                if self.open_devices and self.joystick is None:
+                    self.open_device(event.device_index, now)
+                    instance_id = self.instance_id
+            elif event.type == pygame.JOYDEVICEREMOVED:
+                append(InputEvent(DEVICE_REMOVED, event.instance_id, 0.0, now))
+                if self.open_devices and event.instance_id == instance_id:
+                    self.set_joystick(None)
+                    self.open_device(0, now)
+                    instance_id = self.instance_id
+
+        joystick = self.joystick
+        if joystick is None:
+            return
+        try:
+            axes = tuple([joystick.get_axis(i) for i in range(joystick.get_numaxes())])
+            buttons = tuple([joystick.get_button(i) for i in range(joystick.get_numbuttons())])
+        except pygame.error:
+            # Device vanished between the event check and the read
+            return
+        self.snapshot = InputSnapshot(now, axes, buttons)
+        self.samples += 1
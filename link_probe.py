@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+link_probe.py - Round-trip latency probe for the VESC serial link
+
+Measures how long the link between this computer and the VESC (USB-CDC
+cable, hubs, driver) takes to answer a request. Two phases run:
+
+1. Paced: one request per period at the requested rate, each timestamped
+   and matched with its reply (stop-and-wait, so a late reply is never
+   credited to the next request). Gives the RTT distribution and loss.
+2. Ceiling: requests sent back to back, first one at a time (the fastest
+   a loop that waits for fresh feedback can run), then with several in
+   flight (the raw request/reply throughput of the link).
+
+The VESC protocol has no echo command, so the probe uses requests the
+firmware answers directly: GetValues (the reply the control loop actually
+reads) or the firmware version (a short reply, closer to the bare link).
+
+Run with `gamepad2car.py --probe-link SECONDS`, or directly with a port.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from collections import deque
+from typing import NamedTuple, List
+
+from pyvesc import GetValues
+from pyvesc.packet.codec import frame, unframe
+from serial import SerialException
+
+from gamepad_config import Colors
+from vesc_transport import open_transport, PYSERIAL
+
+# Request payloads by probe name: (request payload, reply id)
+COMM_FW_VERSION = 0
+PROBE_REQUESTS = {
+    "values": (bytes([GetValues.id]), GetValues.id),
+    "version": (bytes([COMM_FW_VERSION]), COMM_FW_VERSION),
+}
+DEFAULT_PROBE_REQUEST = "values"
+
+# Default request rate of the paced phase (Hz)
+PROBE_RATE = 100.0
+
+# A reply later than this is counted as lost (s)
+PROBE_TIMEOUT = 0.1
+
+# Length of each ceiling phase (s) and requests in flight for the pipelined one
+CEILING_DURATION = 2.0
+PIPELINE_DEPTH = 4
+
+
+class ProbeResult(NamedTuple):
+    """Outcome of one probe phase"""
+    name: str
+    sent: int
+    received: int
+    duration: float
+    bytes_sent: int
+    bytes_received: int
+    rtts: List[float]
+
+    @property
+    def lost(self):
+        return self.sent - self.received
+
+    @property
+    def loss(self):
+        return self.lost / self.sent if self.sent else 0.0
+
+    @property
+    def reply_rate(self):
+        return self.received / self.duration if self.duration > 0 else 0.0
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class LinkProbe:
+    """Timestamped request/reply exchanges over an open transport"""
+
+    def __init__(self, port, request=DEFAULT_PROBE_REQUEST, timeout=PROBE_TIMEOUT):
+        payload, self.reply_id = PROBE_REQUESTS[request]
+        self.request = request
+        self.packet = frame(payload)
+        self.port = port
+        self.timeout = timeout
+        self.buffer = bytearray()
+        self.bytes_received = 0
+
+    def _read(self):
+        """Read whatever is available, waiting up to the transport timeout for the first byte"""
+        data = self.port.read(self.port.in_waiting or 1)
+        if data:
+            self.bytes_received += len(data)
+            self.buffer.extend(data)
+
+    def _replies(self):
+        """Count the complete probe replies in the buffer, dropping everything else"""
+        count = 0
+        while self.buffer:
+            payload, consumed = unframe(bytes(self.buffer))
+            if consumed == 0:
+                break
+            del self.buffer[:consumed]
+            if payload and payload[0] == self.reply_id:
+                count += 1
+        return count
+
+    def flush(self):
+        """Discard late replies so they aren't matched with the next request"""
+        while self.port.in_waiting:
+            self._read()
+        self.buffer.clear()
+
+    def exchange(self):
+        """Send one request and wait for its reply; returns the RTT in seconds or None if lost"""
+        clock = time.perf_counter
+        sent = clock()
+        deadline = sent + self.timeout
+        self.port.write(self.packet)
+        while True:
+            self._read()
+            now = clock()
+            if self.buffer and self._replies():
+                return now - sent
+            if now >= deadline:
+                self.flush()
+                return None
+
+    def paced(self, duration, rate):
+        """Stop-and-wait exchanges at rate Hz for duration seconds"""
+        period = 1.0 / rate
+        rtts = []
+        sent = 0
+        self.bytes_received = 0
+        start = next_send = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            rtt = self.exchange()
+            sent += 1
+            if rtt is not None:
+                rtts.append(rtt)
+            next_send += period
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # The link is slower than the requested rate: carry on back to back
+                next_send = time.perf_counter()
+        return ProbeResult(f"paced {rate:g} Hz", sent, len(rtts), time.perf_counter() - start,
+                           sent * len(self.packet), self.bytes_received, rtts)
+
+    def back_to_back(self, duration):
+        """Stop-and-wait exchanges with no pause: the fastest feedback loop the link allows"""
+        rtts = []
+        sent = 0
+        self.bytes_received = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            rtt = self.exchange()
+            sent += 1
+            if rtt is not None:
+                rtts.append(rtt)
+        return ProbeResult("back to back", sent, len(rtts), time.perf_counter() - start,
+                           sent * len(self.packet), self.bytes_received, rtts)
+
+    def pipelined(self, duration, depth=PIPELINE_DEPTH):
+        """Keep depth requests in flight; replies are matched in order"""
+        clock = time.perf_counter
+        in_flight = deque()
+        rtts = []
+        sent = 0
+        self.bytes_received = 0
+        start = last_reply = clock()
+        while True:
+            now = clock()
+            sending = now - start < duration
+            if sending:
+                while len(in_flight) < depth:
+                    self.port.write(self.packet)
+                    in_flight.append(clock())
+                    sent += 1
+            elif not in_flight:
+                break
+            self._read()
+            now = clock()
+            for _ in range(self._replies()):
+                if in_flight:
+                    rtts.append(now - in_flight.popleft())
+                    last_reply = now
+            if in_flight and now - max(in_flight[0], last_reply) > self.timeout:
+                # The oldest request won't be answered any more
+                in_flight.popleft()
+        elapsed = clock() - start
+        self.flush()
+        return ProbeResult(f"pipelined x{depth}", sent, len(rtts), elapsed,
+                           sent * len(self.packet), self.bytes_received, rtts)
+
+
+def run_probe(port, duration, rate=PROBE_RATE, request=DEFAULT_PROBE_REQUEST, ceiling=CEILING_DURATION):
+    """Run every phase over an open transport; returns the ProbeResults"""
+    probe = LinkProbe(port, request)
+    probe.flush()
+    results = [probe.paced(duration, rate)]
+    if ceiling > 0:
+        results.append(probe.back_to_back(ceiling))
+        results.append(probe.pipelined(ceiling))
+    return results
+
+
+def print_report(results, request=DEFAULT_PROBE_REQUEST):
+    """Print the RTT distribution, loss and throughput of each phase"""
+    print(f"\n{Colors.CYAN}=== Serial link probe ({request} requests) ==={Colors.RESET}")
+    print(f"  {'phase':<16}{'sent':>7}{'lost':>7}{'rate/s':>9}{'min ms':>9}{'p50 ms':>9}"
+          f"{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'stdev':>8}")
+    for result in results:
+        ordered = sorted(result.rtts)
+        loss_color = Colors.RED if result.lost else ""
+        loss_reset = Colors.RESET if result.lost else ""
+        stdev = statistics.pstdev(ordered) * 1000 if len(ordered) > 1 else 0.0
+        print(f"  {result.name:<16}{result.sent:>7}{loss_color}{result.lost:>7}{loss_reset}"
+              f"{result.reply_rate:>9.1f}"
+              f"{(ordered[0] if ordered else 0.0) * 1000:>9.3f}"
+              f"{percentile(ordered, 0.50) * 1000:>9.3f}{percentile(ordered, 0.90) * 1000:>9.3f}"
+              f"{percentile(ordered, 0.99) * 1000:>9.3f}{(ordered[-1] if ordered else 0.0) * 1000:>9.3f}"
+              f"{stdev:>8.3f}")
+
+    for result in results:
+        if result.duration > 0:
+            print(f"  {result.name}: {result.bytes_sent / result.duration / 1024:.1f} KiB/s out, "
+                  f"{result.bytes_received / result.duration / 1024:.1f} KiB/s in, "
+                  f"loss {result.loss * 100:.1f}%")
+
+    paced = results[0]
+    if not paced.rtts:
+        print(f"{Colors.RED}No replies: check the port, the baud rate and that the VESC is powered{Colors.RESET}")
+        return
+    p99 = percentile(sorted(paced.rtts), 0.99)
+    print(f"{Colors.YELLOW}A loop that waits for fresh feedback every tick can run at up to "
+          f"{1.0 / p99:.0f} Hz (p99 RTT {p99 * 1000:.2f} ms).{Colors.RESET}")
+    if len(results) > 2:
+        print(f"{Colors.YELLOW}Request/reply ceiling: {results[1].reply_rate:.0f}/s one at a time, "
+              f"{results[2].reply_rate:.0f}/s pipelined.{Colors.RESET}")
+
+
+def probe_port(port_name, baud_rate, transport=PYSERIAL, duration=5.0, rate=PROBE_RATE,
+               request=DEFAULT_PROBE_REQUEST):
+    """Open the port, probe it and print the report; returns a process exit code"""
+    print(f"{Colors.YELLOW}Probing {port_name} ({transport}, {baud_rate} baud): "
+          f"{duration:g} s at {rate:g} Hz, then {CEILING_DURATION * 2:g} s flat out...{Colors.RESET}")
+    try:
+        port = open_transport(transport, port_name, baud_rate)
+    except (SerialException, OSError, ValueError) as e:
+        print(f"{Colors.RED}Cannot open {port_name}: {e}{Colors.RESET}")
+        return 1
+    try:
+        results = run_probe(port, duration, rate, request)
+    except (SerialException, OSError) as e:
+        print(f"{Colors.RED}Link lost during the probe: {e}{Colors.RESET}")
+        return 1
+    except KeyboardInterrupt:
+        return 1
+    finally:
+        port.close()
+    print_report(results, request)
+    return 0 if results[0].received else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the round-trip latency of the VESC serial link')
+    parser.add_argument('port', help='Serial port of the VESC (e.g. /dev/ttyACM0)')
+    parser.add_argument('--baud-rate', type=int, default=115200)
+    parser.add_argument('--transport', default=PYSERIAL, help='Serial transport (pyserial or rawfd)')
+    parser.add_argument('--duration', type=float, default=5.0, help='Length of the paced phase (s)')
+    parser.add_argument('--rate', type=float, default=PROBE_RATE, help='Requests per second of the paced phase')
+    parser.add_argument('--request', choices=sorted(PROBE_REQUESTS), default=DEFAULT_PROBE_REQUEST,
+                        help='Request to time: GetValues or the firmware version')
+    args = parser.parse_args()
+    return probe_port(args.port, args.baud_rate, args.transport, args.duration, args.rate, args.request)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+live_state.py - Shared-memory view of the running controller
+
+gamepad2car.py publishes its per-tick state (raw inputs, shaped controls,
+the command sent to the VESC and the latest telemetry) into a small
+multiprocessing.shared_memory block. Other processes, such as the GUI's
+test tab, attach read-only and see exactly what the car is doing without
+opening the joystick or the serial port themselves.
+
+The block is protected by a seqlock: the writer makes the sequence number
+odd, writes the payload, then makes it even again. A reader copies the
+payload and retries if the sequence number was odd or changed meanwhile.
+The writer never waits for readers, so attaching costs the loop nothing.
+
+Run this file directly to print the live state of a running controller.
+"""
+
+import argparse
+import struct
+import sys
+import time
+from typing import NamedTuple, Optional, Tuple
+
+from gamepad_config import Colors
+from vehicle_model import DUTY, RPM, CURRENT, BRAKE
+
+# Default name of the shared memory block
+LIVE_STATE_NAME = "gamepad2car_state"
+
+# A state older than this is from a controller that is no longer running (s)
+LIVE_STATE_STALE = 1.0
+
+# Reader attempts before giving up on a block that is being rewritten
+MAX_READ_RETRIES = 100
+
+MAX_AXES = 16
+
+# Command kinds, by their index in the block (0 = nothing sent)
+COMMAND_KINDS = ("", DUTY, RPM, CURRENT, BRAKE)
+
+# Flag bits
+FLAG_REVERSE = 1
+FLAG_CRUISE = 2
+FLAG_BOOST = 4
+FLAG_GAMEPAD = 8
+FLAG_VESC = 16
+
+SEQ = struct.Struct("<Q")
+PAYLOAD = struct.Struct(
+    "<dQ"           # timestamp (time.time()), tick
+    "B16f"          # axis count, raw axes
+    "BI"            # button count, button bitmask
+    "fff"           # shaped throttle, steering, brake
+    "Bdd"           # command kind, command value, steering position
+    "Bf"            # flags, cruise speed
+    "dffff"         # telemetry timestamp, rpm, motor current, duty, input voltage
+)
+BLOCK_SIZE = SEQ.size + PAYLOAD.size
+
+
+class LiveTelemetry(NamedTuple):
+    timestamp: float
+    rpm: float
+    current_motor: float
+    duty: float
+    voltage: float
+
+
+class LiveState(NamedTuple):
+    """One consistent copy of the controller state"""
+    seq: int
+    timestamp: float
+    tick: int
+    axes: Tuple[float, ...]
+    buttons: Tuple[int, ...]
+    throttle: float
+    steering: float
+    brake: float
+    command_kind: str
+    command_value: float
+    steering_position: float
+    reverse: bool
+    cruise: bool
+    boost: bool
+    gamepad_connected: bool
+    vesc_connected: bool
+    cruise_speed: float
+    telemetry: Optional[LiveTelemetry]
+
+    @property
+    def age(self):
+        """Seconds since the controller published this state"""
+        return time.time() - self.timestamp
+
+
+class LiveStateWriter:
+    """Single-writer side of the block, owned by the controller"""
+
+    def __init__(self, name=LIVE_STATE_NAME):
+        self.name = name
+        self.shm = None
+        self.seq = 0
+        self._axes = [0.0] * MAX_AXES
+
+    def open(self):
+        """Create the block, replacing one left behind by a crashed controller"""
+        # Imported on use: it pulls in most of multiprocessing, which --no-share-state runs don't need
+        from multiprocessing import shared_memory
+        try:
+            self.shm = shared_memory.SharedMemory(self.name, create=True, size=BLOCK_SIZE)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(self.name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(self.name, create=True, size=BLOCK_SIZE)
+        SEQ.pack_into(self.shm.buf, 0, 0)
+
+    def close(self):
+        """Remove the block"""
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def publish(self, tick, axes, buttons, controls, command, steering_position, flags, cruise_speed,
+                telemetry=None):
+        """Publish one tick. controls is (throttle, steering, brake), command is (kind, value)."""
+        buf = self.shm.buf
+        padded = self._axes
+        count = min(len(axes), MAX_AXES)
+        padded[:count] = axes[:count]
+        num_buttons = min(len(buttons), 32)
+        mask = 0
+        for i in range(num_buttons):
+            if buttons[i]:
+                mask |= 1 << i
+        kind, value = command
+        if telemetry is not None:
+            telemetry = (telemetry.timestamp, telemetry.rpm, telemetry.current_motor, telemetry.duty,
+                         telemetry.voltage)
+        else:
+            telemetry = (0.0, 0.0, 0.0, 0.0, 0.0)
+
+        # Odd sequence number: write in progress
+        self.seq += 1
+        SEQ.pack_into(buf, 0, self.seq)
+        PAYLOAD.pack_into(buf, SEQ.size, time.time(), tick, count, *padded, num_buttons, mask,
+                          *controls, COMMAND_KINDS.index(kind), value, steering_position,
+                          flags, cruise_speed, *telemetry)
+        self.seq += 1
+        SEQ.pack_into(buf, 0, self.seq)
+
+
+class LiveStateReader:
+    """Read-only side of the block"""
+
+    def __init__(self, name=LIVE_STATE_NAME):
+        self.name = name
+        self.shm = None
+        self.retries = 0
+
+    @property
+    def attached(self):
+        return self.shm is not None
+
+    def attach(self):
+        """Attach to the block; returns False if no controller is publishing"""
+        from multiprocessing import shared_memory
+        try:
+            try:
+                self.shm = shared_memory.SharedMemory(self.name, track=False)
+            except TypeError:
+                # Before Python 3.13 the resource tracker would unlink the block when
+                # this reader exits, so stop it from tracking a block we don't own
+                from multiprocessing import resource_tracker
+                self.shm = shared_memory.SharedMemory(self.name)
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+        except FileNotFoundError:
+            return False
+        if self.shm.size < BLOCK_SIZE:
+            self.detach()
+            return False
+        return True
+
+    def detach(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+
+    def read(self):
+        """Return a consistent LiveState, or None if nothing was published or the writer kept racing us"""
+        buf = self.shm.buf
+        for _ in range(MAX_READ_RETRIES):
+            before = SEQ.unpack_from(buf, 0)[0]
+            if before == 0:
+                return None
+            if before & 1:
+                self.retries += 1
+                continue
+            payload = PAYLOAD.unpack_from(buf, SEQ.size)
+            if SEQ.unpack_from(buf, 0)[0] == before:
+                return self._decode(before, payload)
+            self.retries += 1
+        return None
+
+    @staticmethod
+    def _decode(seq, payload):
+        timestamp, tick, num_axes = payload[0:3]
+        axes = payload[3:3 + num_axes]
+        (num_buttons, mask, throttle, steering, brake, kind, value, steering_position, flags,
+         cruise_speed, telemetry_time, rpm, current_motor, duty, voltage) = payload[3 + MAX_AXES:]
+        telemetry = None
+        if telemetry_time:
+            telemetry = LiveTelemetry(telemetry_time, rpm, current_motor, duty, voltage)
+        return LiveState(
+            seq=seq,
+            timestamp=timestamp,
+            tick=tick,
+            axes=axes,
+            buttons=tuple((mask >> i) & 1 for i in range(num_buttons)),
+            throttle=throttle,
+            steering=steering,
+            brake=brake,
+            command_kind=COMMAND_KINDS[kind] if kind < len(COMMAND_KINDS) else "",
+            command_value=value,
+            steering_position=steering_position,
+            reverse=bool(flags & FLAG_REVERSE),
+            cruise=bool(flags & FLAG_CRUISE),
+            boost=bool(flags & FLAG_BOOST),
+            gamepad_connected=bool(flags & FLAG_GAMEPAD),
+            vesc_connected=bool(flags & FLAG_VESC),
+            cruise_speed=cruise_speed,
+            telemetry=telemetry,
+        )
+
+
+def format_state(state):
+    """One-line summary of a LiveState"""
+    parts = [f"tick {state.tick}",
+             f"throttle {state.throttle:+.2f}", f"steering {state.steering:+.2f}", f"brake {state.brake:.2f}"]
+    if state.command_kind:
+        parts.append(f"sent {state.command_kind} {state.command_value:.3f}")
+    if state.reverse:
+        parts.append("REVERSE")
+    if state.cruise:
+        parts.append(f"CRUISE:{state.cruise_speed:.2f}")
+    if state.boost:
+        parts.append("BOOST")
+    if state.telemetry is not None:
+        parts.append(f"{state.telemetry.rpm:.0f} ERPM {state.telemetry.current_motor:.1f} A")
+    if not state.gamepad_connected:
+        parts.append("no gamepad")
+    if not state.vesc_connected:
+        parts.append("no VESC")
+    return " | ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print the live state of a running gamepad2car controller')
+    parser.add_argument('--name', default=LIVE_STATE_NAME, help='Shared memory block name')
+    parser.add_argument('--rate', type=float, default=10.0, help='Display updates per second')
+    args = parser.parse_args()
+
+    reader = LiveStateReader(args.name)
+    if not reader.attach():
+        print(f"{Colors.RED}No running controller publishes '{args.name}'{Colors.RESET}")
+        return 1
+    try:
+        while True:
+            state = reader.read()
+            if state is None:
+                line = "Waiting for the first tick..."
+            elif state.age > LIVE_STATE_STALE:
+                line = f"{Colors.YELLOW}Controller stopped {state.age:.0f} s ago{Colors.RESET}"
+            else:
+                line = format_state(state)
+            print(f"\r{line}\033[K", end="", flush=True)
+            time.sleep(1.0 / args.rate)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        reader.detach()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
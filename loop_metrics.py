@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+loop_metrics.py - Loop and link health metrics for gamepad2car
+
+This module provides:
+1. LoopMetrics: plain counters and a fixed tick-duration ring updated by
+   the control loop (a few attribute writes per tick, no locks)
+2. MetricsServer: a background thread that aggregates those values once
+   per period and serves the latest aggregate over HTTP, on a local TCP
+   port or a Unix socket, as Prometheus text (/metrics) or JSON (/metrics.json)
+
+Scrapes only read the pre-aggregated snapshot, so however often the
+endpoint is scraped the control loop does no extra work. The HTTP modules
+are imported when a server starts, so the controller doesn't pay for them
+at startup when no endpoint is configured.
+"""
+
+import json
+import os
+import threading
+import time
+
+from gamepad_config import Colors
+
+# Number of recent tick durations kept for percentiles
+TICK_WINDOW = 1024
+
+# Aggregation period of the server thread (s)
+AGGREGATE_PERIOD = 1.0
+
+METRIC_PREFIX = "gamepad2car"
+
+
+class LoopMetrics:
+    """Counters written by the control loop.
+
+    Only the control thread writes; the aggregator reads. Every field is a
+    single int/float attribute or a slot of a preallocated list, so reads
+    never see a torn value and no lock is needed.
+    """
+
+    def __init__(self, window=TICK_WINDOW):
+        self.started = time.monotonic()
+        self.ticks = 0
+        self.input_samples = 0
+        self.tick_durations = [0.0] * window
+        self.tick_seconds_total = 0.0   # Working time of every tick since start, for the summary's _sum
+        self.packets_written = 0
+        self.bytes_written = 0
+        self.serial_errors = 0
+        self.vesc_connects = 0
+        self.gamepad_connects = 0
+        self.gamepad_disconnects = 0
+        self.gamepad_resume_seconds = 0.0  # Time the latest gamepad reconnect took to resume control
+        self.gc_collections = 0
+
+    def record_tick(self, duration):
+        """Record the working time of one tick (s), excluding the sleep"""
+        self.tick_durations[self.ticks % len(self.tick_durations)] = duration
+        self.tick_seconds_total += duration
+        self.ticks += 1
+
+    def record_write(self, size):
+        """Record one packet written to the serial port"""
+        self.packets_written += 1
+        self.bytes_written += size
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class MetricsServer:
+    """Aggregate LoopMetrics in the background and serve the result.
+
+    state is a callable returning a dict of current control-state gauges
+    (numbers or booleans); it is called from the aggregator thread.
+    """
+
+    def __init__(self, metrics, state=None, port=None, socket_path=None, host="127.0.0.1",
+                 period=AGGREGATE_PERIOD):
+        if port is None and socket_path is None:
+            raise ValueError("MetricsServer needs a port or a socket path")
+        self.metrics = metrics
+        self.state = state or dict
+        self.port = port
+        self.socket_path = socket_path
+        self.host = host
+        self.period = period
+        self.snapshot = {}
+        self._last_ticks = 0
+        self._last_samples = 0
+        self._last_time = time.monotonic()
+        self._running = False
+        self._server = None
+        self._threads = []
+
+    def aggregate(self):
+        """Compute a new snapshot from the live counters"""
+        m = self.metrics
+        now = time.monotonic()
+        ticks = m.ticks
+        tick_seconds_total = m.tick_seconds_total
+        window = min(ticks, len(m.tick_durations))
+        ordered = sorted(m.tick_durations[:window])
+        elapsed = now - self._last_time
+        samples = m.input_samples
+        rate = (ticks - self._last_ticks) / elapsed if elapsed > 0 else 0.0
+        input_rate = (samples - self._last_samples) / elapsed if elapsed > 0 else 0.0
+        self._last_ticks = ticks
+        self._last_samples = samples
+        self._last_time = now
+
+        self.snapshot = {
+            "uptime_seconds": now - m.started,
+            "loop_rate_hz": rate,
+            "ticks_total": ticks,
+            "input_rate_hz": input_rate,
+            "input_samples_total": samples,
+            "tick_seconds": {
+                "p50": percentile(ordered, 0.50),
+                "p90": percentile(ordered, 0.90),
+                "p99": percentile(ordered, 0.99),
+                "max": ordered[-1] if ordered else 0.0,
+                "sum": tick_seconds_total,
+                "count": ticks,
+            },
+            "packets_written_total": m.packets_written,
+            "bytes_written_total": m.bytes_written,
+            "serial_errors_total": m.serial_errors,
+            "reconnects_total": {
+                "vesc": max(0, m.vesc_connects - 1),
+                "gamepad": max(0, m.gamepad_connects - 1),
+            },
+            "gamepad_disconnects_total": m.gamepad_disconnects,
+            "gamepad_resume_seconds": m.gamepad_resume_seconds,
+            "gc_collections_total": m.gc_collections,
+            "control": {name: float(value) for name, value in self.state().items()},
+        }
+
+    def render_prometheus(self):
+        """Render the snapshot in the Prometheus text exposition format"""
+        s = self.snapshot
+        if not s:
+            return ""
+        p = METRIC_PREFIX
+        lines = [
+            f"# TYPE {p}_uptime_seconds gauge", f"{p}_uptime_seconds {s['uptime_seconds']:.3f}",
+            f"# TYPE {p}_loop_rate_hz gauge", f"{p}_loop_rate_hz {s['loop_rate_hz']:.3f}",
+            f"# TYPE {p}_ticks_total counter", f"{p}_ticks_total {s['ticks_total']}",
+            f"# TYPE {p}_input_rate_hz gauge", f"{p}_input_rate_hz {s['input_rate_hz']:.3f}",
+            f"# TYPE {p}_input_samples_total counter", f"{p}_input_samples_total {s['input_samples_total']}",
+            f"# TYPE {p}_tick_seconds summary",
+        ]
+        # Quantiles over the recent tick window; _sum and _count over every tick since start
+        tick_seconds = s["tick_seconds"]
+        for quantile, name in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99"), ("1", "max")):
+            lines.append(f'{p}_tick_seconds{{quantile="{quantile}"}} {tick_seconds[name]:.6f}')
+        lines += [
+            f"{p}_tick_seconds_sum {tick_seconds['sum']:.6f}",
+            f"{p}_tick_seconds_count {tick_seconds['count']}",
+            f"# TYPE {p}_packets_written_total counter", f"{p}_packets_written_total {s['packets_written_total']}",
+            f"# TYPE {p}_bytes_written_total counter", f"{p}_bytes_written_total {s['bytes_written_total']}",
+            f"# TYPE {p}_serial_errors_total counter", f"{p}_serial_errors_total {s['serial_errors_total']}",
+            f"# TYPE {p}_reconnects_total counter",
+        ]
+        for device, count in s["reconnects_total"].items():
+            lines.append(f'{p}_reconnects_total{{device="{device}"}} {count}')
+        lines += [
+            f"# TYPE {p}_gamepad_disconnects_total counter",
+            f"{p}_gamepad_disconnects_total {s['gamepad_disconnects_total']}",
+            f"# TYPE {p}_gamepad_resume_seconds gauge",
+            f"{p}_gamepad_resume_seconds {s['gamepad_resume_seconds']:.6f}",
+            f"# TYPE {p}_gc_collections_total counter",
+            f"{p}_gc_collections_total {s['gc_collections_total']}",
+        ]
+        for name, value in s["control"].items():
+            lines += [f"# TYPE {p}_control_{name} gauge", f"{p}_control_{name} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+    def render_json(self):
+        return json.dumps(self.snapshot, indent=2) + "\n"
+
+    def start(self):
+        """Start the aggregator and HTTP server threads. Returns False if the endpoint can't be bound."""
+        handler = self._handler_class()
+        tcp_server, unix_server = _server_classes()
+        try:
+            if self.socket_path:
+                if os.path.exists(self.socket_path):
+                    os.unlink(self.socket_path)
+                self._server = unix_server(self.socket_path, handler)
+            else:
+                self._server = tcp_server((self.host, self.port), handler)
+        except OSError as e:
+            print(f"{Colors.RED}Cannot start metrics endpoint: {e}{Colors.RESET}")
+            return False
+
+        self._running = True
+        self.aggregate()
+        self._threads = [
+            threading.Thread(target=self._aggregate_loop, name="MetricsAggregator", daemon=True),
+            threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        print(f"{Colors.GREEN}Metrics available at {self.address}{Colors.RESET}")
+        return True
+
+    def stop(self):
+        """Stop serving and remove the Unix socket"""
+        self._running = False
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    @property
+    def address(self):
+        if self.socket_path:
+            return f"unix:{self.socket_path} (/metrics, /metrics.json)"
+        return f"http://{self.host}:{self._server.server_address[1] if self._server else self.port}/metrics"
+
+    def _aggregate_loop(self):
+        while self._running:
+            time.sleep(self.period)
+            self.aggregate()
+
+    def _handler_class(self):
+        from http.server import BaseHTTPRequestHandler
+
+        server = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body, content_type = server.render_prometheus(), "text/plain; version=0.0.4"
+                elif path == "/metrics.json":
+                    body, content_type = server.render_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def address_string(self):
+                # Unix socket clients have no (host, port) address
+                return self.client_address[0] if self.client_address else "local"
+
+            def log_message(self, format, *args):
+                # Keep the controller's terminal display clean
+                pass
+
+        return MetricsHandler
+
+
+def _server_classes():
+    """Threading HTTP servers over TCP and over a Unix socket"""
+    import socketserver
+    from http.server import HTTPServer
+
+    class TCPHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    return TCPHTTPServer, UnixHTTPServer
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+loop_profiler.py - Control loop profiling for gamepad2car
+
+This module provides:
+1. Per-stage tick timings (events, controls, drive command, steering, display)
+2. A deterministic profile through cProfile, written as a .pstats file
+3. A sampling profile of the control thread, written as collapsed stacks
+   (.folded, readable by flamegraph.pl, speedscope or inferno)
+
+Everything uses the standard library, so it runs on the car as is.
+Load a .pstats file with `python -m pstats FILE`.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from gamepad_config import Colors
+
+# Profiling modes
+DETERMINISTIC = "deterministic"
+SAMPLING = "sampling"
+PROFILE_MODES = (DETERMINISTIC, SAMPLING)
+
+# Sampling profiler interval (s)
+SAMPLE_INTERVAL = 0.001
+
+
+class TickTimer:
+    """Accumulate the time spent in each named stage of the control loop.
+
+    start() marks the beginning of a tick; lap(name) charges the time since
+    the previous mark to that stage. Durations are kept so percentiles can be
+    reported; at 100 Hz a minute of profiling is only a few thousand floats.
+    """
+
+    def __init__(self):
+        self.stages = defaultdict(list)
+        self.ticks = []
+        self._tick_start = 0.0
+        self._mark = 0.0
+
+    def start(self):
+        """Begin a new tick"""
+        now = time.perf_counter()
+        if self._tick_start:
+            self.ticks.append(now - self._tick_start)
+        self._tick_start = self._mark = now
+
+    def lap(self, name):
+        """Charge the time since the previous mark to a stage"""
+        now = time.perf_counter()
+        self.stages[name].append(now - self._mark)
+        self._mark = now
+
+    def report(self):
+        """Return the timing report as lines of text"""
+        lines = [f"{'stage':<16}{'calls':>8}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'total %':>9}"]
+        grand_total = sum(sum(durations) for durations in self.stages.values()) or 1.0
+        rows = list(self.stages.items())
+        if self.ticks:
+            rows.append(("whole tick", self.ticks))
+        for name, durations in rows:
+            ordered = sorted(durations)
+            count = len(ordered)
+            total = sum(ordered)
+            share = f"{total / grand_total * 100:>8.1f}%" if name != "whole tick" else ""
+            lines.append(f"{name:<16}{count:>8}{total / count * 1000:>10.3f}"
+                         f"{ordered[count // 2] * 1000:>10.3f}"
+                         f"{ordered[min(count - 1, int(count * 0.99))] * 1000:>10.3f}"
+                         f"{ordered[-1] * 1000:>10.3f}{share}")
+        return lines
+
+
+class NullTickTimer:
+    """Stand-in used when not profiling, so the loop needs no conditionals"""
+
+    def start(self):
+        pass
+
+    def lap(self, name):
+        pass
+
+
+class StackSampler:
+    """Periodically sample the Python stack of one thread.
+
+    Stacks are counted in collapsed form ("outer;inner;leaf"), which is the
+    input format of the usual flamegraph tools.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = defaultdict(int)
+        self.samples = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="StackSampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        while self._running:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.counts[";".join(reversed(stack))] += 1
+                self.samples += 1
+            time.sleep(self.interval)
+
+    def write(self, path):
+        """Write the collapsed stacks to a file"""
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class LoopProfiler:
+    """Profile the control loop for a fixed duration and write the results"""
+
+    def __init__(self, duration, mode=DETERMINISTIC, output=None):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.duration = duration
+        self.mode = mode
+        self.output = output or time.strftime("gamepad2car-profile-%Y%m%d-%H%M%S")
+        self.timer = TickTimer()
+        self.deadline = None
+        self._profile = None
+        self._sampler = None
+
+    def start(self):
+        """Start profiling the calling thread"""
+        self.deadline = time.monotonic() + self.duration
+        if self.mode == DETERMINISTIC:
+            # Imported here so the controller doesn't load cProfile and pstats unless it profiles
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident())
+            self._sampler.start()
+
+    def expired(self):
+        """True once the profiling duration has elapsed"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def stop(self):
+        """Stop profiling, write the profile and the tick report; returns the written paths"""
+        paths = []
+        if self._profile is not None:
+            self._profile.disable()
+            path = self.output + ".pstats"
+            self._profile.dump_stats(path)
+            paths.append(path)
+            self._profile = None
+        if self._sampler is not None:
+            self._sampler.stop()
+            path = self.output + ".folded"
+            self._sampler.write(path)
+            paths.append(path)
+            self._sampler = None
+
+        report = self.timer.report()
+        path = self.output + ".ticks.txt"
+        with open(path, 'w') as f:
+            f.write("\n".join(report) + "\n")
+        paths.append(path)
+
+        print(f"\n{Colors.CYAN}=== Control loop profile ({self.mode}, {self.duration:.0f} s) ==={Colors.RESET}")
+        for line in report:
+            print(line)
+        for path in paths:
+            print(f"{Colors.GREEN}Written: {path}{Colors.RESET}")
+        return paths
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+loop_rates.py - Check the input and command rates the control loop achieves
+
+Runs GamepadController.run() for a few seconds per (input rate, command
+rate) pair, with a stand-in joystick and a pseudo-terminal in place of the
+VESC, and measures:
+1. the input sampling rate, from the controller's sample counter
+2. the command rate on the wire, from the drive commands decoded on the pty
+
+A pair passes when both rates are within RATE_TOLERANCE of the configured
+ones. Both are measured over the same window, from the first command
+received to the last.
+"""
+
+import argparse
+import contextlib
+import os
+import select
+import sys
+import threading
+import time
+
+from pyvesc import SetDutyCycle, SetRPM, SetCurrent, SetCurrentBrake
+from pyvesc.packet.codec import unframe
+
+from gamepad_config import Colors, ConfigError, DEFAULT_CONFIG, merge_config, validate_config
+from gamepad2car import GamepadController
+from tick_allocations import ConstantJoystick
+from vesc_transport import PtyTransport
+
+DEFAULT_RATES = ("1000:50", "500:100", "100:100")
+DEFAULT_DURATION = 3.0
+
+# Largest relative error accepted between a configured and an achieved rate
+RATE_TOLERANCE = 0.05
+
+DRIVE_COMMAND_IDS = frozenset((SetDutyCycle.id, SetRPM.id, SetCurrent.id, SetCurrentBrake.id))
+
+
+class WireCounter:
+    """Count the drive commands written to the pty and sample a counter at each one"""
+
+    def __init__(self, fd, counter):
+        self.fd = fd
+        self.counter = counter
+        self.commands = 0
+        self.first = None   # (time, counter value) at the first command
+        self.last = None    # (time, counter value, commands) at the latest one
+        self._buffer = bytearray()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="WireCounter", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while self._running:
+            readable, _, _ = select.select([self.fd], [], [], 0.05)
+            if not readable:
+                continue
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError:
+                return
+            now = time.perf_counter()
+            self._buffer.extend(data)
+            while self._buffer:
+                payload, consumed = unframe(bytes(self._buffer))
+                if consumed == 0:
+                    break
+                del self._buffer[:consumed]
+                if payload and payload[0] in DRIVE_COMMAND_IDS:
+                    self.commands += 1
+                    if self.first is None:
+                        self.first = (now, self.counter())
+                    self.last = (now, self.counter(), self.commands)
+
+
+def measure_rates(input_rate, command_rate, duration=DEFAULT_DURATION):
+    """Run the controller loop for duration seconds; returns the achieved (input, command) rates"""
+    rates = {"input_rate_hz": input_rate, "command_rate_hz": command_rate}
+    # Reject an invalid pair with the configuration's own message (ConfigError)
+    validate_config(merge_config(DEFAULT_CONFIG, {"performance": rates}))
+
+    pty = PtyTransport()
+    with contextlib.redirect_stdout(open(os.devnull, "w")) as quiet:
+        controller = GamepadController(share_state=None, serial_port=pty.peer_name, performance=rates)
+    quiet.close()
+
+    controls = controller.settings.controls
+    axes = [0.0] * (max(controls.throttle_axis, controls.steering_axis, controls.brake_axis) + 1)
+    axes[controls.throttle_axis] = 0.2
+    axes[controls.brake_axis] = -1.0
+    controller.joystick = controller.config_manager.joystick = ConstantJoystick(axes)
+
+    counter = WireCounter(pty.peer_fd, lambda: controller.metrics.input_samples)
+    counter.start()
+    stopper = threading.Timer(duration, lambda: setattr(controller, "running", False))
+    stopper.start()
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, "w")) as quiet:
+            controller.run()
+        quiet.close()
+    finally:
+        stopper.cancel()
+        # The stop command written on exit is not part of the measured window
+        last = counter.last
+        counter.stop()
+        pty.close()
+
+    if counter.first is None or last is None or last[0] <= counter.first[0]:
+        return 0.0, 0.0
+    elapsed = last[0] - counter.first[0]
+    return (last[1] - counter.first[1]) / elapsed, (last[2] - 1) / elapsed
+
+
+def parse_rates(text):
+    """'INPUT:COMMAND' in Hz"""
+    try:
+        input_rate, command_rate = (float(value) for value in text.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected INPUT:COMMAND rates in Hz, got {text!r}")
+    return input_rate, command_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the input and command rates the control loop achieves')
+    parser.add_argument('--rates', type=parse_rates, nargs='+', metavar='INPUT:COMMAND',
+                        default=[parse_rates(r) for r in DEFAULT_RATES],
+                        help=f'Rate pairs to run, in Hz (default {" ".join(DEFAULT_RATES)})')
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='Seconds per rate pair')
+    parser.add_argument('--tolerance', type=float, default=RATE_TOLERANCE,
+                        help=f'Largest relative rate error accepted (default {RATE_TOLERANCE:g})')
+    args = parser.parse_args()
+
+    print(f"\n{Colors.CYAN}=== Achieved loop rates ({args.duration:g} s per pair) ==={Colors.RESET}")
+    print(f"  {'input Hz':>9}{'achieved':>10}{'command Hz':>12}{'achieved':>10}")
+    failures = 0
+    for input_rate, command_rate in args.rates:
+        try:
+            achieved_input, achieved_command = measure_rates(input_rate, command_rate, args.duration)
+        except ConfigError as e:
+            print(f"  {Colors.RED}{input_rate:g}:{command_rate:g} rejected: {e}{Colors.RESET}")
+            failures += 1
+            continue
+        passed = (abs(achieved_input - input_rate) <= args.tolerance * input_rate
+                  and abs(achieved_command - command_rate) <= args.tolerance * command_rate)
+        failures += not passed
+        color = Colors.GREEN if passed else Colors.RED
+        print(f"{color}  {input_rate:>9g}{achieved_input:>10.1f}{command_rate:>12g}{achieved_command:>10.1f}"
+              f"  {'ok' if passed else 'FAIL'}{Colors.RESET}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+realtime.py - Realtime scheduling options for the control loop
+
+On a loaded computer (a Jetson encoding video while logging, for example)
+the control thread competes for the CPU and its tick timing jitters. This
+module applies the "realtime" configuration section to the calling thread:
+
+1. cpu: pin the thread to one CPU (os.sched_setaffinity)
+2. scheduler "fifo" with priority: SCHED_FIFO, so ordinary processes can't
+   preempt it (os.sched_setscheduler)
+3. nice: a nice level for the normal scheduler
+4. lock_memory: mlockall() through ctypes, so the loop never waits on a
+   page fault
+
+Options that need privileges (CAP_SYS_NICE, CAP_IPC_LOCK or matching
+ulimits) are skipped with a clear report instead of stopping the controller.
+
+Run this file with `jitter` to compare tick jitter with and without each option.
+"""
+
+import argparse
+import errno
+import os
+import resource
+import sys
+import time
+from typing import NamedTuple
+
+from gamepad_config import Colors, DEFAULT_CONFIG, RealtimeConfig, merge_config, validate_config
+
+# Schedulers selectable through realtime.scheduler
+SCHED_OTHER = "other"
+SCHED_FIFO = "fifo"
+
+# mlockall() flags from <sys/mman.h>
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+# Jitter benchmark: tick period (s) matches the controller's sleep
+JITTER_PERIOD = 0.01
+JITTER_DURATION = 5.0
+
+PRIVILEGE_HINT = ("grant the capability with: sudo setcap cap_sys_nice,cap_ipc_lock+ep "
+                  f"{os.path.realpath(sys.executable)}")
+
+
+class RealtimeResult(NamedTuple):
+    """Outcome of one scheduling option"""
+    option: str
+    applied: bool
+    detail: str
+
+
+def _privilege_error(option, error, limit_hint):
+    """Explain a failed privileged call"""
+    if error.errno in (errno.EPERM, errno.EACCES):
+        return RealtimeResult(option, False, f"not permitted; {limit_hint} or {PRIVILEGE_HINT}")
+    return RealtimeResult(option, False, os.strerror(error.errno) if error.errno else str(error))
+
+
+def pin_cpu(cpu):
+    """Pin the calling thread to one CPU"""
+    option = f"cpu {cpu}"
+    if not hasattr(os, "sched_setaffinity"):
+        return RealtimeResult(option, False, "CPU affinity is not supported on this platform")
+    available = sorted(os.sched_getaffinity(0))
+    if cpu not in available:
+        return RealtimeResult(option, False, f"CPU {cpu} is not available (allowed: {available})")
+    try:
+        os.sched_setaffinity(0, {cpu})
+    except OSError as e:
+        return RealtimeResult(option, False, str(e))
+    return RealtimeResult(option, True, f"pinned to CPU {cpu}")
+
+
+def set_fifo(priority):
+    """Switch the calling thread to SCHED_FIFO at priority"""
+    option = f"SCHED_FIFO {priority}"
+    if not hasattr(os, "SCHED_FIFO"):
+        return RealtimeResult(option, False, "SCHED_FIFO is not supported on this platform")
+    low, high = os.sched_get_priority_min(os.SCHED_FIFO), os.sched_get_priority_max(os.SCHED_FIFO)
+    if not low <= priority <= high:
+        return RealtimeResult(option, False, f"priority must be in [{low}, {high}]")
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+    except OSError as e:
+        limit = resource.getrlimit(resource.RLIMIT_RTPRIO)[0] if hasattr(resource, "RLIMIT_RTPRIO") else 0
+        return _privilege_error(option, e, f"raise RLIMIT_RTPRIO (ulimit -r, now {limit})")
+    return RealtimeResult(option, True, "realtime FIFO scheduling")
+
+
+def set_nice(nice):
+    """Set the nice level of the calling thread"""
+    option = f"nice {nice}"
+    try:
+        # On Linux this applies to the calling thread only
+        os.setpriority(os.PRIO_PROCESS, 0, nice)
+    except OSError as e:
+        return _privilege_error(option, e, "raise RLIMIT_NICE (ulimit -e)")
+    return RealtimeResult(option, True, f"nice level {os.getpriority(os.PRIO_PROCESS, 0)}")
+
+
+def lock_memory():
+    """mlockall(MCL_CURRENT | MCL_FUTURE) through ctypes"""
+    # ctypes is only loaded when memory locking is requested
+    import ctypes
+    import ctypes.util
+
+    option = "mlockall"
+    library = ctypes.util.find_library("c")
+    try:
+        libc = ctypes.CDLL(library, use_errno=True)
+        mlockall = libc.mlockall
+    except (OSError, AttributeError):
+        return RealtimeResult(option, False, "mlockall is not available on this platform")
+    if mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+        code = ctypes.get_errno()
+        limit = resource.getrlimit(resource.RLIMIT_MEMLOCK)[0]
+        limit = "unlimited" if limit == resource.RLIM_INFINITY else f"{limit // 1024} KiB"
+        if code == errno.ENOMEM:
+            # Unprivileged processes may only lock up to RLIMIT_MEMLOCK
+            return RealtimeResult(option, False, f"the process is larger than the locked memory limit; "
+                                                 f"raise RLIMIT_MEMLOCK (ulimit -l, now {limit}) or {PRIVILEGE_HINT}")
+        return _privilege_error(option, OSError(code, os.strerror(code)),
+                                f"raise RLIMIT_MEMLOCK (ulimit -l, now {limit})")
+    return RealtimeResult(option, True, "all current and future pages locked in RAM")
+
+
+def apply_realtime(realtime):
+    """Apply a RealtimeConfig to the calling thread; returns a RealtimeResult per requested option"""
+    results = []
+    fifo = False
+    if realtime.cpu >= 0:
+        results.append(pin_cpu(realtime.cpu))
+    if realtime.scheduler == SCHED_FIFO:
+        result = set_fifo(realtime.priority)
+        fifo = result.applied
+        results.append(result)
+    if realtime.nice != 0:
+        if fifo:
+            # Nice levels only matter to the normal scheduler
+            results.append(RealtimeResult(f"nice {realtime.nice}", False, "ignored under SCHED_FIFO"))
+        else:
+            results.append(set_nice(realtime.nice))
+    if realtime.lock_memory:
+        results.append(lock_memory())
+    return results
+
+
+def print_report(results):
+    """Print what was applied and what was skipped"""
+    if not results:
+        return
+    print(f"{Colors.CYAN}Realtime options:{Colors.RESET}")
+    for result in results:
+        if result.applied:
+            print(f"  {Colors.GREEN}{result.option}: {result.detail}{Colors.RESET}")
+        else:
+            print(f"  {Colors.YELLOW}{result.option} skipped: {result.detail}{Colors.RESET}")
+
+
+def measure_jitter(duration=JITTER_DURATION, period=JITTER_PERIOD):
+    """Run a periodic loop like the controller's and return its wake-up lateness (s) and page faults"""
+    lateness = []
+    clock = time.perf_counter
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    deadline = start = clock()
+    while deadline - start < duration:
+        deadline += period
+        delay = deadline - clock()
+        if delay > 0:
+            time.sleep(delay)
+        lateness.append(clock() - deadline)
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults
+    return lateness, faults
+
+
+def _jitter_worker(realtime, duration, period, queue):
+    results = apply_realtime(realtime)
+    lateness, faults = measure_jitter(duration, period)
+    queue.put((results, lateness, faults))
+
+
+def _load_worker():
+    """Burn CPU like a competing process"""
+    x = 0
+    while True:
+        x = (x * 1103515245 + 12345) & 0xFFFFFFFF
+
+
+def jitter_benchmark(base, duration=JITTER_DURATION, period=JITTER_PERIOD, load=0):
+    """Measure tick jitter with no option, each configured option alone, then all of them.
+
+    Each run happens in a fresh process so scheduling changes don't carry over.
+    """
+    import multiprocessing
+
+    defaults = RealtimeConfig(**DEFAULT_CONFIG["realtime"])
+    variants = [("baseline", defaults)]
+    if base.cpu >= 0:
+        variants.append((f"cpu {base.cpu}", defaults._replace(cpu=base.cpu)))
+    if base.nice != 0:
+        variants.append((f"nice {base.nice}", defaults._replace(nice=base.nice)))
+    if base.scheduler == SCHED_FIFO:
+        variants.append((f"fifo {base.priority}", defaults._replace(scheduler=SCHED_FIFO, priority=base.priority)))
+    if base.lock_memory:
+        variants.append(("mlockall", defaults._replace(lock_memory=True)))
+    if len(variants) > 2:
+        variants.append(("all", base))
+
+    loaders = [multiprocessing.Process(target=_load_worker, daemon=True) for _ in range(load)]
+    for process in loaders:
+        process.start()
+
+    print(f"Tick jitter, {period * 1000:g} ms period for {duration:g} s per run"
+          + (f", {load} competing busy processes" if load else "") + ":")
+    print(f"  {'options':<14}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}{'max us':>10}{'faults':>8}  notes")
+    rows = {}
+    try:
+        for label, realtime in variants:
+            queue = multiprocessing.Queue()
+            worker = multiprocessing.Process(target=_jitter_worker, args=(realtime, duration, period, queue))
+            worker.start()
+            results, lateness, faults = queue.get()
+            worker.join()
+            lateness.sort()
+            skipped = [r.option for r in results if not r.applied]
+            notes = f"{Colors.YELLOW}not applied: {', '.join(skipped)}{Colors.RESET}" if skipped else ""
+            mean = sum(lateness) / len(lateness)
+            print(f"  {label:<14}{mean * 1e6:>10.0f}{lateness[len(lateness) // 2] * 1e6:>10.0f}"
+                  f"{lateness[int(len(lateness) * 0.99)] * 1e6:>10.0f}{lateness[-1] * 1e6:>10.0f}"
+                  f"{faults:>8}  {notes}")
+            rows[label] = lateness
+    finally:
+        for process in loaders:
+            process.terminate()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Realtime scheduling options for the control loop')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    jitter = subparsers.add_parser('jitter', help='Compare tick jitter with and without each option')
+    jitter.add_argument('--cpu', type=int, default=0, help='CPU to pin to (default 0)')
+    jitter.add_argument('--priority', type=int, default=50, help='SCHED_FIFO priority (default 50)')
+    jitter.add_argument('--nice', type=int, default=-10, help='Nice level (default -10)')
+    jitter.add_argument('--duration', type=float, default=JITTER_DURATION, help='Seconds per run')
+    jitter.add_argument('--load', type=int, default=0, metavar='N',
+                        help='Busy processes competing for the CPU during the runs')
+    args = parser.parse_args()
+
+    if args.command == 'jitter':
+        config = merge_config(DEFAULT_CONFIG, {"realtime": {
+            "cpu": args.cpu, "scheduler": SCHED_FIFO, "priority": args.priority,
+            "nice": args.nice, "lock_memory": True}})
+        jitter_benchmark(validate_config(config).realtime, args.duration, load=args.load)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
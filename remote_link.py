@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+remote_link.py - Low-latency UDP gamepad link for gamepad2car
+
+The driver's computer runs the sender, which packs the gamepad state into
+one small datagram per tick:
+
+    magic "G2", version, sequence number, send timestamp,
+    axis count, button count, button bitmask, axes as int16
+
+On the car, RemoteGamepad reads those datagrams without blocking and
+behaves like a pygame joystick, so the normal control path uses it
+unchanged. It drops duplicate, out-of-order and late packets, tracks loss
+and one-way jitter, and reports the link as lost when no fresh packet
+arrives within the timeout so the controller can fail safe. While the link
+is up it stays locked to the sender's address and drops everything else.
+Once the link has timed out, a restarted sender or one at a new address is
+taken: its sequence numbers and clock offset replace the previous sender's.
+
+Usage:
+    ./remote_link.py send CAR_HOST[:PORT]     # on the driver's computer
+    ./gamepad2car.py --remote-listen PORT     # on the car
+    ./remote_link.py loopback --loss 0.2      # end-to-end check over localhost
+"""
+
+import argparse
+import math
+import os
+import random
+import socket
+import struct
+import sys
+import time
+from typing import NamedTuple, Tuple
+
+from gamepad_config import Colors
+
+# Default UDP port of the link
+REMOTE_PORT = 9478
+
+# Sender rate (datagrams per second)
+SEND_RATE_HZ = 100
+
+# Time without a fresh packet after which the link counts as lost (s)
+LINK_TIMEOUT = 0.2
+
+# Packets delayed this much longer than the fastest one seen are dropped as stale (s)
+MAX_PACKET_DELAY = 0.1
+
+# Packets a restarted or new sender may need before the loopback check sees it accepted (or rejected)
+MAX_RESUME_PACKETS = 3
+
+# Jitter estimator gain (RFC 3550 uses 1/16)
+JITTER_GAIN = 1.0 / 16.0
+
+PACKET_MAGIC = b"G2"
+PACKET_VERSION = 1
+HEADER = struct.Struct("<2sBIdBBI")
+MAX_AXES = 16
+MAX_BUTTONS = 32
+SEQ_MASK = 0xFFFFFFFF
+
+
+class RemoteState(NamedTuple):
+    """Decoded gamepad datagram"""
+    seq: int
+    sent: float
+    axes: Tuple[float, ...]
+    buttons: Tuple[int, ...]
+
+
+def encode_state(seq, sent, axes, buttons):
+    """Pack a gamepad state into a datagram"""
+    axes = axes[:MAX_AXES]
+    buttons = buttons[:MAX_BUTTONS]
+    mask = 0
+    for i, pressed in enumerate(buttons):
+        if pressed:
+            mask |= 1 << i
+    scaled = [int(max(-1.0, min(1.0, value)) * 32767) for value in axes]
+    return HEADER.pack(PACKET_MAGIC, PACKET_VERSION, seq & SEQ_MASK, sent, len(axes), len(buttons), mask) \
+        + struct.pack(f"<{len(scaled)}h", *scaled)
+
+
+def decode_state(data):
+    """Unpack a datagram; raises ValueError if it isn't a valid gamepad packet"""
+    if len(data) < HEADER.size:
+        raise ValueError("Packet too short")
+    magic, version, seq, sent, num_axes, num_buttons, mask = HEADER.unpack_from(data)
+    if magic != PACKET_MAGIC or version != PACKET_VERSION:
+        raise ValueError("Not a gamepad packet")
+    if num_axes > MAX_AXES or num_buttons > MAX_BUTTONS or len(data) != HEADER.size + 2 * num_axes:
+        raise ValueError("Malformed gamepad packet")
+    axes = tuple(value / 32767 for value in struct.unpack_from(f"<{num_axes}h", data, HEADER.size))
+    buttons = tuple((mask >> i) & 1 for i in range(num_buttons))
+    return RemoteState(seq, sent, axes, buttons)
+
+
+def is_newer(seq, last):
+    """True if seq follows last, allowing for wrap-around"""
+    return 0 < ((seq - last) & SEQ_MASK) < 0x80000000
+
+
+class GamepadSender:
+    """Send gamepad states to the car; loss simulates a bad link for testing"""
+
+    def __init__(self, address, loss=0.0):
+        self.address = address
+        self.loss = loss
+        self.seq = 0
+        self.sent = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, axes, buttons):
+        """Send one state; returns the packet (also when the simulated link drops it)"""
+        self.seq = (self.seq + 1) & SEQ_MASK
+        packet = encode_state(self.seq, time.time(), axes, buttons)
+        if not (self.loss and random.random() < self.loss):
+            self.sock.sendto(packet, self.address)
+            self.sent += 1
+        return packet
+
+    def close(self):
+        self.sock.close()
+
+
+class RemoteGamepad:
+    """Joystick-compatible input source fed by the UDP link.
+
+    poll() must be called once per control tick: it drains every pending
+    datagram without blocking, keeps the newest valid one and returns the
+    indices of buttons pressed since the previous state. While the link is
+    lost the gamepad reports no axes and no buttons.
+    """
+
+    def __init__(self, port=REMOTE_PORT, host="0.0.0.0", timeout=LINK_TIMEOUT,
+                 max_delay=MAX_PACKET_DELAY):
+        self.port = port
+        self.host = host
+        self.timeout = timeout
+        self.max_delay = max_delay
+        self.sock = None
+        self.sender = None
+        self.active = False
+        self.axes = ()
+        self.buttons = ()
+
+        # Link statistics
+        self.received = 0
+        self.accepted = 0
+        self.stale = 0
+        self.late = 0
+        self.invalid = 0
+        self.foreign = 0    # Packets from another address while the link was up
+        self.lost = 0
+        self.jitter = 0.0
+
+        self.last_seq = None
+        self._last_arrival = None
+        self._last_transit = None
+        self._min_transit = None
+
+    def open(self):
+        """Bind the UDP socket; returns the bound port"""
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((self.host, self.port))
+        self.sock.setblocking(False)
+        self.port = self.sock.getsockname()[1]
+        return self.port
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def restart_stream(self):
+        """Forget the sequence number and clock offset of the previous sender"""
+        self.last_seq = None
+        self._last_transit = None
+        self._min_transit = None
+
+    def poll(self, now=None):
+        """Process pending datagrams; returns the indices of newly pressed buttons"""
+        pressed = []
+        now = time.monotonic() if now is None else now
+        # Buttons already held when the link comes back are not new presses
+        resuming = self._last_arrival is None or now - self._last_arrival > self.timeout
+        if resuming:
+            # The link may come back from a restarted sender, counting from 0
+            # again with another clock: nothing from before the loss applies
+            self.restart_stream()
+        while True:
+            try:
+                data, address = self.sock.recvfrom(512)
+            except (BlockingIOError, InterruptedError):
+                break
+            arrival = time.time()
+            self.received += 1
+            try:
+                state = decode_state(data)
+            except ValueError:
+                self.invalid += 1
+                continue
+
+            # Locked to the sender while the link is up: a stray or second sender
+            # can only take over once the link has timed out
+            if address != self.sender and not resuming:
+                self.foreign += 1
+                continue
+
+            if self.last_seq is not None and not is_newer(state.seq, self.last_seq):
+                self.stale += 1
+                continue
+
+            # Sender and car clocks differ by a constant offset, so compare each
+            # transit time with the fastest one seen rather than with zero
+            transit = arrival - state.sent
+            if self._min_transit is None or transit < self._min_transit:
+                self._min_transit = transit
+            if transit - self._min_transit > self.max_delay:
+                self.late += 1
+                continue
+            if self._last_transit is not None:
+                self.jitter += JITTER_GAIN * (abs(transit - self._last_transit) - self.jitter)
+            self._last_transit = transit
+
+            if self.last_seq is not None:
+                self.lost += ((state.seq - self.last_seq) & SEQ_MASK) - 1
+            self.last_seq = state.seq
+            self._last_arrival = time.monotonic()
+            self.sender = address
+            self.accepted += 1
+
+            previous = self.buttons
+            if not resuming:
+                pressed.extend(i for i, value in enumerate(state.buttons)
+                               if value and (i >= len(previous) or not previous[i]))
+            resuming = False
+            self.axes = state.axes
+            self.buttons = state.buttons
+
+        self.active = self._last_arrival is not None and now - self._last_arrival <= self.timeout
+        if not self.active:
+            # Fail safe: no stale input survives a lost link
+            self.axes = ()
+            self.buttons = ()
+            pressed = []
+        return pressed
+
+    @property
+    def loss_ratio(self):
+        total = self.accepted + self.lost
+        return self.lost / total if total else 0.0
+
+    # pygame.joystick.Joystick compatible interface
+
+    def init(self):
+        pass
+
+    def get_init(self):
+        return True
+
+    def get_name(self):
+        return f"Remote gamepad ({self.sender[0] if self.sender else 'no sender'})"
+
+    def get_numaxes(self):
+        return len(self.axes)
+
+    def get_numbuttons(self):
+        return len(self.buttons)
+
+    def get_numhats(self):
+        return 0
+
+    def get_axis(self, index):
+        return self.axes[index] if index < len(self.axes) else 0.0
+
+    def get_button(self, index):
+        return self.buttons[index] if index < len(self.buttons) else 0
+
+
+def parse_address(text):
+    """HOST[:PORT] to a (host, port) tuple"""
+    host, _, port = text.partition(":")
+    return host, int(port) if port else REMOTE_PORT
+
+
+def run_sender(address, rate_hz, loss):
+    """Read the local gamepad and stream it to the car"""
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.environ["SDL_DBUS_SCREENSAVER_INHIBIT"] = "0"
+    import pygame
+
+    pygame.display.init()
+    pygame.joystick.init()
+    if pygame.joystick.get_count() < 1:
+        print(f"{Colors.RED}No gamepads found. Please connect a gamepad.{Colors.RESET}")
+        return 1
+    joystick = pygame.joystick.Joystick(0)
+    joystick.init()
+
+    sender = GamepadSender(address, loss)
+    print(f"{Colors.GREEN}Sending {joystick.get_name()} to {address[0]}:{address[1]} at {rate_hz} Hz{Colors.RESET}")
+    print("Ctrl+C: Quit")
+    period = 1.0 / rate_hz
+    next_send = time.monotonic()
+    try:
+        while True:
+            pygame.event.pump()
+            axes = [joystick.get_axis(i) for i in range(joystick.get_numaxes())]
+            buttons = [joystick.get_button(i) for i in range(joystick.get_numbuttons())]
+            sender.send(axes, buttons)
+
+            next_send += period
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_send = time.monotonic()
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Stopped after {sender.seq} packets{Colors.RESET}")
+    finally:
+        sender.close()
+        pygame.quit()
+    return 0
+
+
+def run_loopback(duration, rate_hz, loss, reorder):
+    """Send a synthetic gamepad over localhost with simulated loss and reordering and check the receiver"""
+    receiver = RemoteGamepad(host="127.0.0.1", port=0)
+    port = receiver.open()
+    sender = GamepadSender(("127.0.0.1", port), loss)
+    period = 1.0 / rate_hz
+    held = None
+    reordered = 0
+    out_of_order_accepted = 0
+    mismatches = 0
+    last_accepted = 0
+
+    print(f"Loopback: {duration:.1f} s at {rate_hz} Hz, loss {loss:.0%}, reorder {reorder:.0%}")
+    start = time.monotonic()
+    while time.monotonic() - start < duration:
+        t = time.monotonic() - start
+        axes = [math.sin(t), math.sin(t * 2.0), math.sin(t * 3.0) * 0.5 - 0.5]
+        buttons = [int(t % 0.5 < 0.1), 0, 1]
+
+        # Reordering: hold a packet back and deliver it after the next one
+        if held is None and reorder and random.random() < reorder:
+            sender.seq = (sender.seq + 1) & SEQ_MASK
+            held = encode_state(sender.seq, time.time(), axes, buttons)
+        else:
+            sender.send(axes, buttons)
+            if held is not None:
+                sender.sock.sendto(held, ("127.0.0.1", port))
+                reordered += 1
+                held = None
+
+        time.sleep(0.001)
+        receiver.poll()
+        if receiver.accepted:
+            if receiver.last_seq < last_accepted:
+                out_of_order_accepted += 1
+            last_accepted = receiver.last_seq
+            # The receiver must hold the newest accepted state exactly (int16 quantization aside)
+            expected = decode_state(encode_state(0, 0.0, axes, buttons))
+            if receiver.last_seq == sender.seq and any(
+                    abs(a - b) > 1e-4 for a, b in zip(receiver.axes, expected.axes)):
+                mismatches += 1
+        time.sleep(max(0.0, period - 0.001))
+
+    active_before = receiver.active
+    # Blackout: the sender stops, the receiver must fail safe within the timeout
+    blackout_start = time.monotonic()
+    while receiver.active and time.monotonic() - blackout_start < 1.0:
+        receiver.poll()
+        time.sleep(0.005)
+    fail_safe_after = time.monotonic() - blackout_start
+    failed_safe = not receiver.active and receiver.get_numaxes() == 0
+    sender_port = sender.sock.getsockname()[1]
+    sender.close()
+
+    takeover_presses = []
+
+    def resume_packets(sock, clock_offset):
+        """Stream from sock as a fresh sender, holding button 0; returns the packets
+        sent until the receiver takes it, or None"""
+        accepted = receiver.accepted
+        for seq in range(1, MAX_RESUME_PACKETS + 1):
+            sock.sendto(encode_state(seq, time.time() + clock_offset, [0.0], [1]), ("127.0.0.1", port))
+            time.sleep(period)
+            takeover_presses.extend(receiver.poll())
+            if receiver.accepted > accepted and receiver.sender == sock.getsockname() and receiver.active:
+                return seq
+        return None
+
+    # The sender restarts at the same address after the link timed out: its
+    # sequence numbers start again from 0 and its clock offset has changed
+    restarted = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    restarted.bind(("127.0.0.1", sender_port))
+    restart_packets = resume_packets(restarted, clock_offset=-5.0)
+    # Another sender is ignored while the link is up...
+    other = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    other.bind(("127.0.0.1", 0))
+    foreign_before = receiver.foreign
+    intruder_packets = resume_packets(other, clock_offset=-3.0)
+    intruder_rejected = receiver.foreign > foreign_before
+    # ...and takes over once the link has timed out
+    restarted.close()
+    while receiver.active:
+        receiver.poll()
+        time.sleep(0.005)
+    switch_packets = resume_packets(other, clock_offset=-3.0)
+    other.close()
+    receiver.close()
+
+    print(f"  Sent {sender.seq} packets, received {receiver.received}, accepted {receiver.accepted}")
+    print(f"  Reordered {reordered}, dropped as stale {receiver.stale}, late {receiver.late}, invalid {receiver.invalid}, "
+          f"from another sender {receiver.foreign}")
+    print(f"  Measured loss {receiver.loss_ratio:.1%}, one-way jitter {receiver.jitter * 1000:.3f} ms")
+    print(f"  Fail-safe after {fail_safe_after * 1000:.0f} ms of silence "
+          f"(timeout {receiver.timeout * 1000:.0f} ms)")
+    print(f"  Restarted sender taken after {restart_packets or 'no'} packet(s); new sender address "
+          f"{'taken' if intruder_packets else 'rejected'} while the link was up "
+          f"({receiver.foreign} packets dropped), taken after {switch_packets or 'no'} packet(s) once it timed out")
+
+    checks = [
+        ("link was active while sending", active_before),
+        ("no out-of-order packet accepted", out_of_order_accepted == 0),
+        ("received state matches what was sent", mismatches == 0),
+        ("link reported lost after blackout", failed_safe),
+        ("fail-safe within timeout + one poll", fail_safe_after <= receiver.timeout + 0.05),
+        ("restarted sender resumes the link", restart_packets is not None),
+        ("new sender address rejected while the link is up", intruder_packets is None and intruder_rejected),
+        ("new sender address taken after the timeout", switch_packets is not None),
+        ("buttons held by a resumed sender are not new presses", not takeover_presses),
+    ]
+    # A packet overtaken by a newer one is dropped, so it counts as lost too
+    if loss or reorder:
+        checks.append(("measured loss close to simulated loss + reordering",
+                       abs(receiver.loss_ratio - (loss + reorder)) < 0.1))
+    if reordered:
+        # Unless the simulated loss dropped the packet that overtook it
+        checks.append(("overtaken packets were dropped as stale", 0 < receiver.stale <= reordered))
+
+    failed = 0
+    for name, ok in checks:
+        colour = Colors.GREEN if ok else Colors.RED
+        print(f"  {colour}{'PASS' if ok else 'FAIL'}{Colors.RESET} {name}")
+        failed += not ok
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='UDP gamepad link for gamepad2car')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    send = subparsers.add_parser('send', help='Stream the local gamepad to the car')
+    send.add_argument('address', help=f'Car address, HOST[:PORT] (default port {REMOTE_PORT})')
+    send.add_argument('--rate', type=int, default=SEND_RATE_HZ, help='Packets per second')
+    send.add_argument('--loss', type=float, default=0.0, help='Simulated packet loss (0..1) for testing')
+
+    loopback = subparsers.add_parser('loopback', help='End-to-end check over localhost')
+    loopback.add_argument('--duration', type=float, default=2.0, help='Seconds of traffic')
+    loopback.add_argument('--rate', type=int, default=SEND_RATE_HZ, help='Packets per second')
+    loopback.add_argument('--loss', type=float, default=0.2, help='Simulated packet loss (0..1)')
+    loopback.add_argument('--reorder', type=float, default=0.05, help='Fraction of packets delivered out of order')
+
+    args = parser.parse_args()
+    if args.command == 'send':
+        return run_sender(parse_address(args.address), args.rate, args.loss)
+    return run_loopback(args.duration, args.rate, args.loss, args.reorder)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+replay_trace.py - Replay a throttle/brake trace through the control logic and a vehicle model
+
+Feeds each recorded control tick through the same throttle/brake blending and
+command scaling as gamepad2car.py, drives vehicle_model.VehicleModel with the
+result and reports the stopping response of every brake application.
+
+Trace format: CSV with a header containing at least time (s), throttle and
+brake columns (throttle in [-1, 1], brake in [0, 1]). Without a trace file a
+built-in synthetic run (accelerate, brake with the throttle still held, then
+full brake) is used.
+
+Every run is also checked, and the exit status is 1 on any mismatch:
+1. each tick with brake input sends SetCurrentBrake at brake x
+   max_brake_current and no drive command, whatever the throttle
+2. raw brake trigger readings map to the expected brake: released at rest,
+   full at full travel, and released while the trigger still reports the
+   0 SDL gives some triggers before their first move
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+from gamepad_config import DEFAULT_CONFIG, CONFIG_FILE, Colors, GamepadConfig, merge_config, validate_config
+from gamepad2car import blend_throttle_brake, CommandEncoder, compile_strategies, compile_brake
+from vehicle_model import VehicleModel, BRAKE
+
+# Vehicle speed below which the car counts as stopped (m/s)
+STOPPED_SPEED = 0.05
+
+# Largest brake current error accepted (A)
+CURRENT_TOLERANCE = 1e-9
+
+# Raw brake trigger readings in order, with the brake each must give:
+# (description, raw axis value, expected brake in [0, 1])
+TRIGGER_READINGS = (
+    ("reports 0 before its first move", 0.0, 0.0),
+    ("at rest", -1.0, 0.0),
+    ("fully pressed", 1.0, 1.0),
+    ("half pressed", 0.0, 0.5),
+    ("released", -1.0, 0.0),
+)
+
+
+def load_settings(path):
+    """Load validated settings from a configuration file, or the defaults"""
+    config = DEFAULT_CONFIG
+    if path and os.path.exists(path):
+        with open(path, 'r') as f:
+            config = merge_config(DEFAULT_CONFIG, json.load(f))
+    return validate_config(config)
+
+
+def load_trace(path):
+    """Read (time, throttle, brake) rows from a CSV trace"""
+    rows = []
+    with open(path, newline='') as f:
+        for record in csv.DictReader(f):
+            rows.append((float(record["time"]), float(record["throttle"]), float(record.get("brake") or 0.0)))
+    return rows
+
+
+def synthetic_trace(tick=0.01, throttle=0.8, accelerate_time=3.0, overlap=0.5, overlap_time=0.5,
+                    brake=1.0, brake_time=4.0):
+    """Accelerate at a fixed throttle, press the brake part way with the throttle still held, then full brake"""
+    rows = []
+    steps = int((accelerate_time + overlap_time + brake_time) / tick)
+    for i in range(steps):
+        t = i * tick
+        if t < accelerate_time:
+            rows.append((t, throttle, 0.0))
+        elif t < accelerate_time + overlap_time:
+            rows.append((t, throttle, overlap))
+        else:
+            rows.append((t, 0.0, brake))
+    return rows
+
+
+def replay(rows, performance, model=None, commands=None):
+    """Run the trace through the control logic and the model.
+
+    Returns a list of brake events: dicts with onset time, speed at onset,
+    time to stop (None if the car did not stop), distance and peak deceleration.
+    With commands, the (kind, value) sent on each tick is appended to it.
+    """
+    model = model or VehicleModel()
+    encoder = CommandEncoder()
+    strategy = compile_strategies(performance, encoder)[performance.control_mode]
+    brake = compile_brake(performance, encoder)
+    events = []
+    current = None
+    previous_speed = model.speed
+
+    for i, (t, throttle_value, brake_value) in enumerate(rows):
+        dt = rows[i + 1][0] - t if i + 1 < len(rows) else (t - rows[i - 1][0] if i else 0.01)
+        throttle_value, brake_value = blend_throttle_brake(throttle_value, brake_value)
+        if brake_value > 0.0:
+            kind, value = brake.kind, brake.value(brake_value)
+            if current is None:
+                current = {"onset": t, "speed": model.speed, "distance_start": model.distance,
+                           "time_to_stop": None, "peak_decel": 0.0}
+                events.append(current)
+        else:
+            kind, value = strategy.kind, strategy.value(throttle_value)
+            current = None
+
+        if commands is not None:
+            commands.append((kind, value))
+        state = model.step(dt, kind, value)
+        if current is not None:
+            decel = (previous_speed - state.speed) / dt if dt > 0 else 0.0
+            current["peak_decel"] = max(current["peak_decel"], decel)
+            if current["time_to_stop"] is None and abs(state.speed) < STOPPED_SPEED:
+                current["time_to_stop"] = state.time - current["onset"]
+            current["distance"] = state.distance - current["distance_start"]
+        previous_speed = state.speed
+
+    return events
+
+
+def check_commands(rows, commands, performance):
+    """Ticks whose command breaks the brake rules: a list of (time, expected, sent)"""
+    mismatches = []
+    for (t, throttle_value, brake_value), (kind, value) in zip(rows, commands):
+        if brake_value > 0.0:
+            # The brake wins over any throttle, proportionally to the trigger
+            expected = (BRAKE, brake_value * performance.max_brake_current)
+            if kind != BRAKE or abs(value - expected[1]) > CURRENT_TOLERANCE:
+                mismatches.append((t, expected, (kind, value)))
+        elif kind == BRAKE:
+            mismatches.append((t, "drive command", (kind, value)))
+    return mismatches
+
+
+def check_trigger(settings, readings=TRIGGER_READINGS):
+    """Feed raw trigger readings through the controller's axis shaping.
+
+    Returns (description, raw value, expected brake, brake) for each reading,
+    read in order by the same GamepadConfig, as from a gamepad just attached.
+    """
+    manager = GamepadConfig()
+    manager.settings = settings
+    manager.normalizer = None
+    brake_axis = settings.controls.brake_axis
+    axes = [0.0] * (max(settings.controls.throttle_axis, settings.controls.steering_axis, brake_axis) + 1)
+    results = []
+    for description, raw, expected in readings:
+        axes[brake_axis] = raw
+        results.append((description, raw, expected, manager.shape_axes(axes).brake))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a throttle/brake trace through the control logic')
+    parser.add_argument('trace', nargs='?', help='CSV trace with time, throttle and brake columns')
+    parser.add_argument('--config', default=CONFIG_FILE, help='Configuration file to take limits from')
+    parser.add_argument('--max-brake-current', type=float, help='Override performance.max_brake_current (A)')
+    args = parser.parse_args()
+
+    settings = load_settings(args.config)
+    performance = settings.performance
+    if args.max_brake_current is not None:
+        performance = performance._replace(max_brake_current=args.max_brake_current)
+
+    if args.trace:
+        rows = load_trace(args.trace)
+        print(f"Replaying {len(rows)} ticks from {args.trace}")
+    else:
+        rows = synthetic_trace()
+        print(f"{Colors.YELLOW}No trace given, using a synthetic accelerate-then-brake run (throttle held into the brake){Colors.RESET}")
+
+    commands = []
+    events = replay(rows, performance, commands=commands)
+    failures = 0
+    if not events:
+        print("No brake applications in the trace")
+
+    print(f"\n{Colors.CYAN}Stopping response (brake current {performance.max_brake_current:.1f} A at full trigger){Colors.RESET}")
+    for event in events:
+        stop = f"{event['time_to_stop']:.2f} s" if event["time_to_stop"] is not None else "did not stop"
+        print(f"  t={event['onset']:.2f} s: from {event['speed']:.2f} m/s, stop {stop}, "
+              f"distance {event.get('distance', 0.0):.2f} m, peak decel {event['peak_decel']:.2f} m/s^2")
+    if not args.trace and (len(events) != 1 or events[0]["time_to_stop"] is None):
+        failures += 1
+        print(f"  {Colors.RED}The synthetic run must end stopped after a single brake application{Colors.RESET}")
+
+    print(f"\n{Colors.CYAN}Brake commands{Colors.RESET}")
+    mismatches = check_commands(rows, commands, performance)
+    braking = sum(1 for row in rows if row[2] > 0.0)
+    overlapping = sum(1 for row in rows if row[2] > 0.0 and row[1] != 0.0)
+    if mismatches:
+        failures += 1
+        print(f"  {Colors.RED}FAIL{Colors.RESET} {len(mismatches)} of {len(rows)} ticks sent the wrong command")
+        for t, expected, sent in mismatches[:5]:
+            print(f"    t={t:.2f} s: expected {expected}, sent {sent}")
+    else:
+        print(f"  {Colors.GREEN}PASS{Colors.RESET} {braking} braking ticks, {overlapping} with the throttle held: "
+              f"proportional brake current, no drive command")
+
+    print(f"\n{Colors.CYAN}Brake trigger (axis {settings.controls.brake_axis}){Colors.RESET}")
+    for description, raw, expected, brake in check_trigger(settings):
+        ok = abs(brake - expected) <= 1e-9
+        failures += not ok
+        colour = Colors.GREEN if ok else Colors.RED
+        print(f"  {colour}{'PASS' if ok else 'FAIL'}{Colors.RESET} {description}: raw {raw:+.2f} "
+              f"-> brake {brake:.2f} (expected {expected:.2f})")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+session_log.py - Columnar log of every driving session, and its analysis
+
+While gamepad2car.py drives, every command tick is recorded as one row of
+aligned columns: the raw mapped axes, the shaped controls, the command sent
+to the VESC and the latest telemetry. Rows fill a preallocated chunk in
+memory; a full chunk is handed to a writer thread, which saves each column
+as its own .npy file, so the control loop never waits on the disk:
+
+    sessions/2026-10-19_14-03-22/
+        session.json            # columns, rates, limits and the chunk list
+        chunk-0000/time.npy     # one file per column
+        chunk-0000/rpm.npy
+        ...
+
+The manifest is rewritten after every chunk, so a crash loses at most the
+chunk being filled. The writer thread starts with the first row, after the
+first command has gone out, and imports numpy and allocates the buffers
+itself: recording adds nothing to the time to first command. The few rows
+recorded before the buffers are ready are counted as skipped.
+
+The analysis memory-maps one chunk at a time and reduces it with vectorized
+numpy operations, so multi-hour logs are summarized in bounded memory.
+Percentiles come from fixed-bin histograms accumulated over a second pass.
+
+Run this file with `list`, `stats SESSION` or `report SESSION`.
+"""
+
+import argparse
+import json
+import math
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+from gamepad_config import Colors, np
+from live_state import COMMAND_KINDS
+
+SESSION_DIR = "sessions"
+MANIFEST = "session.json"
+MANIFEST_VERSION = 1
+
+# Rows per chunk: at 100 Hz a chunk holds about 11 minutes and weighs about 4 MB
+CHUNK_ROWS = 65536
+
+# Column name and numpy dtype of each recorded row, in row order
+COLUMNS = (
+    ("time", "f8"),             # Tick start, seconds since the session started
+    ("tick_seconds", "f4"),     # Working time of the tick
+    ("input_throttle", "f4"),   # Raw mapped axes (NaN without a gamepad)
+    ("input_steering", "f4"),
+    ("input_brake", "f4"),
+    ("throttle", "f4"),         # Shaped controls
+    ("steering", "f4"),
+    ("brake", "f4"),
+    ("command", "u1"),          # Index into COMMAND_KINDS
+    ("command_value", "f4"),
+    ("steering_position", "f4"),
+    ("flags", "u1"),            # live_state FLAG_* bits
+    ("rpm", "f4"),              # Latest telemetry (NaN until the first reply)
+    ("current_motor", "f4"),
+    ("current_in", "f4"),
+    ("duty", "f4"),
+    ("voltage", "f4"),
+    ("temp_fet", "f4"),
+)
+COLUMN_NAMES = tuple(name for name, _ in COLUMNS)
+
+# Row values of the telemetry columns before the VESC has answered
+NO_TELEMETRY = (math.nan,) * 6
+NO_INPUTS = (math.nan,) * 3
+
+# Fraction of max_duty_cycle above which the car counts as running at full duty
+MAX_DUTY_FRACTION = 0.99
+
+# Histogram bins per column for the percentiles
+HISTOGRAM_BINS = 10000
+PERCENTILES = (50, 90, 99, 99.9)
+
+# Throttle bins of the stick-to-RPM table
+THROTTLE_BINS = 10
+
+
+class SessionWriter:
+    """Record rows into preallocated chunks, saved column by column by a writer thread"""
+
+    def __init__(self, directory, metadata=None, chunk_rows=CHUNK_ROWS):
+        self.directory = directory
+        self.metadata = dict(metadata or {})
+        self.chunk_rows = chunk_rows
+        self.start = None
+        self.rows = 0
+        self.skipped = 0        # Rows recorded before the buffers were ready
+        self.allocated = 0      # Extra chunk buffers allocated because the disk fell behind
+        self.chunks = []
+        self._rows = None
+        self._count = 0
+        self._free = queue.Queue()
+        self._full = queue.Queue()
+        self._thread = None
+
+    def open(self):
+        """Create the session directory and its manifest"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.start = time.perf_counter()
+        self.metadata.setdefault("started", datetime.now().isoformat(timespec="seconds"))
+        self._write_manifest()
+
+    def record(self, row):
+        """Store one row, a tuple in COLUMNS order"""
+        rows = self._rows
+        if rows is None:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="SessionWriter", daemon=True)
+                self._thread.start()
+            self.skipped += 1
+            return
+        rows[self._count] = row
+        self._count += 1
+        if self._count == self.chunk_rows:
+            self._rotate()
+
+    def _rotate(self):
+        """Hand the full chunk to the writer thread and continue in a free one"""
+        self._full.put((self._rows, self._count))
+        self._count = 0
+        try:
+            self._rows = self._free.get_nowait()
+        except queue.Empty:
+            self.allocated += 1
+            self._rows = np.empty(self.chunk_rows, dtype=row_dtype())
+
+    def close(self):
+        """Save the partial chunk and wait for the writer thread to finish"""
+        if self._thread is not None:
+            if self._rows is not None and self._count:
+                self._full.put((self._rows, self._count))
+            self._full.put(None)
+            self._thread.join()
+            self._thread = None
+        self._rows = None
+        if self.start is not None:
+            self._write_manifest()
+
+    def _run(self):
+        # Importing numpy and touching the buffers happen here, off the control thread
+        dtype = row_dtype()
+        self._free.put(np.zeros(self.chunk_rows, dtype=dtype))
+        self._rows = np.zeros(self.chunk_rows, dtype=dtype)
+        while True:
+            item = self._full.get()
+            if item is None:
+                return
+            rows, count = item
+            try:
+                self._save_chunk(rows, count)
+            except OSError as e:
+                print(f"\n{Colors.RED}Session log: cannot save chunk {len(self.chunks)}: {e}{Colors.RESET}")
+            self._free.put(rows)
+
+    def _save_chunk(self, rows, count):
+        name = f"chunk-{len(self.chunks):04d}"
+        path = os.path.join(self.directory, name)
+        os.makedirs(path, exist_ok=True)
+        for column in COLUMN_NAMES:
+            np.save(os.path.join(path, f"{column}.npy"), rows[column][:count])
+        self.chunks.append({"name": name, "rows": count})
+        self.rows += count
+        self._write_manifest()
+
+    def _write_manifest(self):
+        manifest = dict(self.metadata, version=MANIFEST_VERSION, columns=dict(COLUMNS),
+                        command_kinds=COMMAND_KINDS, chunks=self.chunks, rows=self.rows,
+                        skipped_rows=self.skipped)
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+
+def row_dtype():
+    return np.dtype(list(COLUMNS))
+
+
+def new_session_path(root=SESSION_DIR):
+    """Directory of a session starting now"""
+    return os.path.join(root, datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
+
+
+class SessionReader:
+    """Memory-mapped access to a recorded session, one chunk at a time"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"{directory}: unsupported session version {self.manifest.get('version')}")
+        self.columns = tuple(self.manifest["columns"])
+        self.rows = self.manifest["rows"]
+
+    def chunks(self, columns=None):
+        """Yield {column: read-only memory-mapped array} for each chunk"""
+        for chunk in self.manifest["chunks"]:
+            path = os.path.join(self.directory, chunk["name"])
+            yield {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                   for name in (columns or self.columns)}
+
+
+class ColumnStats(NamedTuple):
+    """Summary of one column; NaNs (no telemetry yet, no gamepad) are left out"""
+    count: int
+    mean: float
+    std: float
+    minimum: float
+    maximum: float
+    percentiles: dict
+
+
+class StreamingStats:
+    """Two-pass column statistics in bounded memory.
+
+    The first pass accumulates count, sums and range; the second fills a
+    histogram over that range, from which percentiles are interpolated to
+    within (maximum - minimum) / bins.
+    """
+
+    def __init__(self, bins=HISTOGRAM_BINS):
+        self.bins = bins
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.histogram = None
+
+    def add(self, values):
+        """First pass over one chunk"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if not values.size:
+            return
+        self.count += values.size
+        self.total += values.sum()
+        self.squares += np.dot(values, values)
+        self.minimum = min(self.minimum, values.min())
+        self.maximum = max(self.maximum, values.max())
+
+    def add_histogram(self, values):
+        """Second pass over one chunk"""
+        if not self.count:
+            return
+        if self.histogram is None:
+            self.histogram = np.zeros(self.bins, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        span = self.maximum - self.minimum
+        if span == 0:
+            self.histogram[0] += values.size
+            return
+        index = ((values - self.minimum) * (self.bins / span)).astype(np.int64)
+        np.minimum(index, self.bins - 1, out=index)
+        self.histogram += np.bincount(index, minlength=self.bins)
+
+    def percentile(self, q):
+        if not self.count:
+            return math.nan
+        if self.histogram is None or self.maximum == self.minimum:
+            return float(self.minimum)
+        cumulative = np.cumsum(self.histogram)
+        target = q / 100.0 * self.count
+        i = int(np.searchsorted(cumulative, target))
+        i = min(i, self.bins - 1)
+        below = cumulative[i - 1] if i else 0
+        inside = self.histogram[i]
+        fraction = (target - below) / inside if inside else 0.0
+        width = (self.maximum - self.minimum) / self.bins
+        return float(self.minimum + (i + fraction) * width)
+
+    def result(self, percentiles=PERCENTILES):
+        if not self.count:
+            return ColumnStats(0, math.nan, math.nan, math.nan, math.nan, {q: math.nan for q in percentiles})
+        mean = self.total / self.count
+        variance = max(self.squares / self.count - mean * mean, 0.0)
+        return ColumnStats(self.count, mean, math.sqrt(variance), float(self.minimum), float(self.maximum),
+                           {q: self.percentile(q) for q in percentiles})
+
+
+def intervals(reader):
+    """Yield (chunk, seconds since the previous tick) per chunk; the first row gets NaN"""
+    previous = math.nan
+    for chunk in reader.chunks():
+        times = chunk["time"]
+        gaps = np.empty(len(times))
+        if len(times):
+            gaps[0] = times[0] - previous
+            np.subtract(times[1:], times[:-1], out=gaps[1:])
+            previous = float(times[-1])
+        yield chunk, gaps
+
+
+def column_stats(reader, columns=None, percentiles=PERCENTILES):
+    """ColumnStats of each column, plus "interval" (time between ticks)"""
+    columns = list(columns or reader.columns)
+    stats = {name: StreamingStats() for name in columns + ["interval"]}
+    for histogram in (False, True):
+        for chunk, gaps in intervals(reader):
+            for name, accumulator in stats.items():
+                values = gaps if name == "interval" else chunk[name]
+                (accumulator.add_histogram if histogram else accumulator.add)(values)
+    return {name: accumulator.result(percentiles) for name, accumulator in stats.items()}
+
+
+class SessionReport(NamedTuple):
+    """Driving summary of one session"""
+    duration: float
+    rows: int
+    command_rate: float
+    peak_current_motor: float
+    peak_current_motor_time: float
+    peak_current_in: float
+    time_at_max_duty: float
+    interval: ColumnStats
+    tick_seconds: ColumnStats
+    throttle_rpm_correlation: float
+    rpm_per_throttle: float         # Least-squares slope of RPM against shaped throttle
+    throttle_bins: list             # (throttle low, high, ticks, mean RPM)
+
+
+def session_report(reader, throttle_bins=THROTTLE_BINS):
+    """Reduce a session chunk by chunk into a SessionReport"""
+    max_duty = reader.manifest.get("performance", {}).get("max_duty_cycle", 1.0) * MAX_DUTY_FRACTION
+    peak_motor = peak_in = -math.inf
+    peak_time = math.nan
+    full_duty = 0.0
+    sums = np.zeros(5)  # n, sum x, sum y, sum xx, sum xy, over ticks with telemetry
+    sum_yy = 0.0
+    edges = np.linspace(-1.0, 1.0, throttle_bins + 1)
+    bin_ticks = np.zeros(throttle_bins, dtype=np.int64)
+    bin_rpm = np.zeros(throttle_bins)
+    interval = StreamingStats()
+    tick = StreamingStats()
+    first = last = math.nan
+
+    for chunk, gaps in intervals(reader):
+        if not len(gaps):
+            continue
+        if math.isnan(first):
+            first = float(chunk["time"][0])
+        last = float(chunk["time"][-1])
+        interval.add(gaps)
+        tick.add(chunk["tick_seconds"])
+
+        current_motor = np.abs(np.asarray(chunk["current_motor"], dtype=np.float64))
+        if np.isfinite(current_motor).any():
+            i = int(np.nanargmax(current_motor))
+            if current_motor[i] > peak_motor:
+                peak_motor = float(current_motor[i])
+                peak_time = float(chunk["time"][i])
+        current_in = np.asarray(chunk["current_in"], dtype=np.float64)
+        if np.isfinite(current_in).any():
+            peak_in = max(peak_in, float(np.nanmax(current_in)))
+
+        # Ticks at full duty, weighted by the time since the previous tick
+        at_max = np.abs(chunk["duty"]) >= max_duty
+        full_duty += float(np.nansum(gaps[at_max]))
+
+        throttle = np.asarray(chunk["throttle"], dtype=np.float64)
+        rpm = np.asarray(chunk["rpm"], dtype=np.float64)
+        valid = np.isfinite(rpm) & np.isfinite(throttle)
+        x, y = throttle[valid], rpm[valid]
+        sums += (x.size, x.sum(), y.sum(), np.dot(x, x), np.dot(x, y))
+        sum_yy += float(np.dot(y, y))
+        index = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, throttle_bins - 1)
+        bin_ticks += np.bincount(index, minlength=throttle_bins)
+        bin_rpm += np.bincount(index, weights=y, minlength=throttle_bins)
+
+    for chunk, gaps in intervals(reader):
+        interval.add_histogram(gaps)
+        tick.add_histogram(chunk["tick_seconds"])
+
+    n, sx, sy, sxx, sxy = sums
+    correlation = slope = math.nan
+    if n > 1:
+        var_x = n * sxx - sx * sx
+        var_y = n * sum_yy - sy * sy
+        if var_x > 0:
+            slope = (n * sxy - sx * sy) / var_x
+        if var_x > 0 and var_y > 0:
+            correlation = (n * sxy - sx * sy) / math.sqrt(var_x * var_y)
+    duration = last - first if reader.rows > 1 else 0.0
+    table = [(float(edges[i]), float(edges[i + 1]), int(bin_ticks[i]),
+              float(bin_rpm[i] / bin_ticks[i]) if bin_ticks[i] else math.nan)
+             for i in range(throttle_bins)]
+    return SessionReport(
+        duration=duration,
+        rows=reader.rows,
+        command_rate=(reader.rows - 1) / duration if duration > 0 else math.nan,
+        peak_current_motor=peak_motor if peak_motor > -math.inf else math.nan,
+        peak_current_motor_time=peak_time,
+        peak_current_in=peak_in if peak_in > -math.inf else math.nan,
+        time_at_max_duty=full_duty,
+        interval=interval.result(),
+        tick_seconds=tick.result(),
+        throttle_rpm_correlation=correlation,
+        rpm_per_throttle=slope,
+        throttle_bins=table,
+    )
+
+
+def list_sessions(root=SESSION_DIR):
+    """Session directories under root, oldest first"""
+    if not os.path.isdir(root):
+        return []
+    return sorted(os.path.join(root, name) for name in os.listdir(root)
+                  if os.path.isfile(os.path.join(root, name, MANIFEST)))
+
+
+def resolve_session(name, root=SESSION_DIR):
+    """A session directory, its name under root, or "latest" """
+    if name == "latest":
+        sessions = list_sessions(root)
+        if not sessions:
+            raise FileNotFoundError(f"no sessions under {root}")
+        return sessions[-1]
+    if os.path.isfile(os.path.join(name, MANIFEST)):
+        return name
+    return os.path.join(root, name)
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}"
+
+
+def print_sessions(root):
+    sessions = list_sessions(root)
+    if not sessions:
+        print(f"{Colors.YELLOW}No sessions under {root}{Colors.RESET}")
+        return
+    print(f"  {'session':<24}{'rows':>10}{'chunks':>8}  mode")
+    for path in sessions:
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+        mode = manifest.get("performance", {}).get("control_mode", "?")
+        print(f"  {os.path.basename(path):<24}{manifest['rows']:>10}{len(manifest['chunks']):>8}  {mode}")
+
+
+def print_stats(stats):
+    header = "".join(f"{f'p{q:g}':>11}" for q in PERCENTILES)
+    print(f"  {'column':<18}{'count':>10}{'mean':>11}{'std':>11}{'min':>11}{header}{'max':>11}")
+    for name, s in stats.items():
+        values = "".join(f"{s.percentiles[q]:>11.4g}" for q in PERCENTILES)
+        print(f"  {name:<18}{s.count:>10}{s.mean:>11.4g}{s.std:>11.4g}{s.minimum:>11.4g}{values}{s.maximum:>11.4g}")
+
+
+def print_report(report, manifest):
+    performance = manifest.get("performance", {})
+    print(f"  Duration:           {format_duration(report.duration)} ({report.rows} ticks, "
+          f"{report.command_rate:.1f} Hz achieved)")
+    if math.isnan(report.peak_current_motor):
+        print(f"  {Colors.YELLOW}No telemetry was received during the session{Colors.RESET}")
+    else:
+        print(f"  Peak motor current: {report.peak_current_motor:.1f} A "
+              f"at {format_duration(report.peak_current_motor_time)}")
+        print(f"  Peak input current: {report.peak_current_in:.1f} A")
+        share = report.time_at_max_duty / report.duration if report.duration else 0.0
+        print(f"  Time at max duty:   {report.time_at_max_duty:.1f} s ({share:.1%}; |duty| >= "
+              f"{MAX_DUTY_FRACTION:g} x {performance.get('max_duty_cycle', 1.0):g})")
+
+    p = report.interval.percentiles
+    print(f"  Tick interval:      p50 {p[50] * 1000:.2f} ms, p99 {p[99] * 1000:.2f} ms, "
+          f"p99.9 {p[99.9] * 1000:.2f} ms, max {report.interval.maximum * 1000:.2f} ms")
+    if performance.get("command_rate_hz"):
+        period = 1.0 / performance["command_rate_hz"]
+        print(f"  Tick jitter:        p99 {(p[99] - period) * 1000:+.2f} ms, "
+              f"max {(report.interval.maximum - period) * 1000:+.2f} ms against the {period * 1000:g} ms period")
+    p = report.tick_seconds.percentiles
+    print(f"  Tick work:          p50 {p[50] * 1e6:.0f} us, p99 {p[99] * 1e6:.0f} us, "
+          f"max {report.tick_seconds.maximum * 1e6:.0f} us")
+
+    if not math.isnan(report.throttle_rpm_correlation):
+        print(f"  Throttle vs RPM:    correlation {report.throttle_rpm_correlation:.3f}, "
+              f"{report.rpm_per_throttle:.0f} RPM per unit of throttle")
+        print(f"    {'throttle':<16}{'ticks':>10}{'mean RPM':>11}")
+        for low, high, ticks, rpm in report.throttle_bins:
+            if ticks:
+                print(f"    {f'{low:+.1f} .. {high:+.1f}':<16}{ticks:>10}{rpm:>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze the driving sessions recorded by gamepad2car.py')
+    parser.add_argument('--root', default=SESSION_DIR, help=f'Directory holding the sessions (default {SESSION_DIR})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='List the recorded sessions')
+    stats = subparsers.add_parser('stats', help='Statistics and percentiles of every column')
+    stats.add_argument('session', nargs='?', default='latest', help='Session directory or name (default latest)')
+    stats.add_argument('--columns', nargs='+', choices=COLUMN_NAMES, metavar='COLUMN',
+                       help='Columns to summarize (default all)')
+    report = subparsers.add_parser('report', help='Peak current, time at max duty, tick jitter, throttle vs RPM')
+    report.add_argument('session', nargs='?', default='latest', help='Session directory or name (default latest)')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        print_sessions(args.root)
+        return 0
+
+    try:
+        reader = SessionReader(resolve_session(args.session, args.root))
+    except (OSError, ValueError) as e:
+        print(f"{Colors.RED}Cannot open session: {e}{Colors.RESET}")
+        return 1
+    print(f"\n{Colors.CYAN}=== Session {os.path.basename(os.path.normpath(reader.directory))} "
+          f"({reader.rows} ticks, {len(reader.manifest['chunks'])} chunks) ==={Colors.RESET}")
+    if not reader.rows:
+        print(f"{Colors.YELLOW}The session has no saved rows{Colors.RESET}")
+        return 0
+    if args.command == 'stats':
+        print_stats(column_stats(reader, args.columns))
+    else:
+        print_report(session_report(reader), reader.manifest)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
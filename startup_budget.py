@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+startup_budget.py - Time from launching gamepad2car to its first VESC command
+
+Checks the controller's startup against a budget:
+1. Import breakdown: `python -X importtime` for gamepad2car and the headless
+   tools, listing what each direct import costs and checking that the
+   headless ones never load pygame or numpy
+2. Time to first command: gamepad2car.py is started on a pseudo-terminal
+   standing in for the VESC, and the time until the first byte reaches it
+   is measured over several runs, for a local gamepad (pygame and the SDL
+   joystick subsystem) and for the UDP link (no SDL at all)
+
+The bytecode cache is refreshed first so the numbers match an installed car,
+not a first run after editing the sources.
+"""
+
+import argparse
+import compileall
+import os
+import select
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import NamedTuple
+
+from gamepad_config import Colors
+from vesc_transport import PtyTransport
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GAMEPAD2CAR = os.path.join(HERE, "gamepad2car.py")
+
+# Median time to first command allowed with a local gamepad (s)
+STARTUP_BUDGET = 0.5
+
+DEFAULT_RUNS = 5
+
+# Give up on a run that hasn't sent anything after this long (s)
+FIRST_COMMAND_TIMEOUT = 10.0
+
+# Modules the headless tools must not load
+HEADLESS_MODULES = ("replay_trace", "link_probe")
+SDL_MODULES = ("pygame", "numpy")
+
+# Direct imports listed per module
+TOP_IMPORTS = 12
+
+# Controller variants timed: (label, extra command line arguments)
+STARTUP_MODES = (
+    ("local gamepad", []),
+    ("remote gamepad", ["--remote-listen", "0"]),
+)
+
+
+class ImportTime(NamedTuple):
+    """One line of -X importtime output"""
+    name: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def import_times(module):
+    """Import module in a fresh interpreter and return its ImportTime lines in import order"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # column header
+        stripped = name.lstrip()
+        times.append(ImportTime(stripped.strip(), (len(name) - len(stripped) - 1) // 2,
+                                int(self_us), int(cumulative_us)))
+    if result.returncode != 0 or not times:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip()}")
+    return times
+
+
+def print_import_breakdown(module, times, top=TOP_IMPORTS):
+    """Print the total and the heaviest direct imports of module"""
+    total = times[-1]
+    # Children are listed before their parent: walk back to the previous top-level import
+    first = len(times) - 1
+    while first > 0 and times[first - 1].depth > total.depth:
+        first -= 1
+    direct = sorted((t for t in times[first:-1] if t.depth == total.depth + 1),
+                    key=lambda t: t.cumulative_us, reverse=True)
+    print(f"  {Colors.BOLD}{module}{Colors.RESET}: {total.cumulative_us / 1000:.1f} ms "
+          f"({total.self_us / 1000:.1f} ms in the module itself)")
+    for entry in direct[:top]:
+        print(f"    {entry.name:<32}{entry.cumulative_us / 1000:>8.1f} ms")
+    if len(direct) > top:
+        rest = sum(t.cumulative_us for t in direct[top:])
+        print(f"    {f'{len(direct) - top} more':<32}{rest / 1000:>8.1f} ms")
+
+
+def first_command_time(extra_args=(), timeout=FIRST_COMMAND_TIMEOUT):
+    """Start gamepad2car.py on a pty and return the seconds until its first byte, or None"""
+    pty = PtyTransport()
+    # Sessions are recorded as in a normal run, into a directory thrown away afterwards
+    sessions = tempfile.TemporaryDirectory()
+    command = [sys.executable, GAMEPAD2CAR, "--serial-port", pty.peer_name, "--no-share-state",
+               "--session-dir", sessions.name, *extra_args]
+    try:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=HERE, stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            readable, _, _ = select.select([pty.peer_fd], [], [], timeout)
+            elapsed = time.perf_counter() - start if readable else None
+        finally:
+            # The controller stops cleanly on Ctrl+C
+            process.send_signal(signal.SIGINT)
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+    finally:
+        pty.close()
+        sessions.cleanup()
+    return elapsed
+
+
+def interpreter_start_time():
+    """Seconds to start and stop a bare interpreter, the floor under any startup"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check gamepad2car's time to first VESC command")
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help='Controller starts timed per mode')
+    parser.add_argument('--budget', type=float, default=STARTUP_BUDGET, metavar='SECONDS',
+                        help=f'Median time to first command allowed with a local gamepad '
+                             f'(default {STARTUP_BUDGET:g})')
+    parser.add_argument('--top', type=int, default=TOP_IMPORTS, help='Direct imports listed per module')
+    args = parser.parse_args()
+
+    compileall.compile_dir(HERE, maxlevels=0, quiet=1)
+
+    print(f"\n{Colors.CYAN}=== Import breakdown (-X importtime) ==={Colors.RESET}")
+    leaks = []
+    for module in ("gamepad2car",) + HEADLESS_MODULES:
+        times = import_times(module)
+        print_import_breakdown(module, times, args.top)
+        if module in HEADLESS_MODULES:
+            loaded = sorted({t.name for t in times if t.name in SDL_MODULES})
+            if loaded:
+                leaks.append(module)
+                print(f"    {Colors.RED}loads {', '.join(loaded)}{Colors.RESET}")
+
+    print(f"\n{Colors.CYAN}=== Time to first command ({args.runs} runs) ==={Colors.RESET}")
+    floor = statistics.median(interpreter_start_time() for _ in range(args.runs))
+    print(f"  {'mode':<18}{'median ms':>10}{'min ms':>10}{'max ms':>10}")
+    print(f"  {'bare interpreter':<18}{floor * 1000:>10.1f}")
+    medians = {}
+    for label, extra in STARTUP_MODES:
+        times = [first_command_time(extra) for _ in range(args.runs)]
+        if None in times:
+            print(f"  {label:<18}{Colors.RED}no command within {FIRST_COMMAND_TIMEOUT:g} s{Colors.RESET}")
+            medians[label] = None
+            continue
+        medians[label] = statistics.median(times)
+        print(f"  {label:<18}{medians[label] * 1000:>10.1f}{min(times) * 1000:>10.1f}{max(times) * 1000:>10.1f}")
+
+    local = medians[STARTUP_MODES[0][0]]
+    within = local is not None and local <= args.budget and not leaks
+    color = Colors.GREEN if within else Colors.RED
+    measured = f"{local * 1000:.0f} ms" if local is not None else "no command"
+    print(f"{color}Local gamepad: {measured} against a {args.budget * 1000:.0f} ms budget"
+          f"{', headless tools load SDL modules' if leaks else ''}{Colors.RESET}")
+    return 0 if within else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+tick_allocations.py - Check that the steady-state control tick allocates nothing
+
+Drives GamepadController.sample_tick() and control_tick() with a stand-in
+joystick holding constant inputs and a pseudo-terminal in place of the VESC,
+then checks over many ticks that:
+1. tracemalloc sees no net allocation: every block a tick allocates is
+   freed by the end of that tick, so memory doesn't grow
+2. the cyclic garbage collector never runs, because no container outlives
+   the tick that created it
+
+Both must hold for gc.freeze() plus idle-point collection to keep GC pauses
+out of the loop. Offending source lines are listed when the check fails.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import NamedTuple
+
+from gamepad_config import Colors
+from gamepad2car import GamepadController
+from loop_profiler import NullTickTimer
+from vesc_transport import PtyTransport, open_transport, PYSERIAL, RAWFD
+
+DEFAULT_TICKS = 10000
+WARMUP_TICKS = 1000
+
+# Ticks between two reads of the pty, well under its buffer size
+DRAIN_INTERVAL = 32
+
+# Number of offending source lines shown when the check fails
+TOP_OFFENDERS = 10
+
+
+class ConstantJoystick:
+    """Joystick stand-in with fixed axes and buttons"""
+
+    def __init__(self, axes, buttons=()):
+        self.axes = list(axes)
+        self.buttons = list(buttons) or [0] * 8
+
+    def init(self):
+        pass
+
+    def get_name(self):
+        return "Constant joystick"
+
+    def get_numaxes(self):
+        return len(self.axes)
+
+    def get_numbuttons(self):
+        return len(self.buttons)
+
+    def get_axis(self, index):
+        return self.axes[index]
+
+    def get_button(self, index):
+        return self.buttons[index] if index < len(self.buttons) else 0
+
+
+class AllocationReport(NamedTuple):
+    ticks: int
+    net_blocks: int
+    net_bytes: int
+    collections: int
+    offenders: list
+
+    @property
+    def passed(self):
+        return self.net_blocks <= 0 and self.collections == 0
+
+
+def measure_ticks(tick, ticks, between=None, warmup=WARMUP_TICKS):
+    """Run tick() ticks times under tracemalloc and count GC runs.
+
+    between(i) runs after each tick; its own allocations are filtered out
+    along with those of this module and tracemalloc. The warmup ticks run
+    traced through the same call path, so values a tick replaces (the last
+    command, the latest axes) are matched with their predecessors.
+    """
+    collections = 0
+
+    def count_collections(phase, info):
+        nonlocal collections
+        if phase == "start":
+            collections += 1
+
+    def run(count):
+        for i in range(count):
+            tick()
+            if between is not None:
+                between(i)
+
+    gc.collect()
+    tracemalloc.start(4)
+    try:
+        run(warmup)
+        gc.collect()
+        gc.freeze()
+        gc.callbacks.append(count_collections)
+        try:
+            # A first window settles the interpreter's free lists and caches;
+            # only the growth over the second one is what the ticks leave behind
+            run(ticks)
+            before = tracemalloc.take_snapshot()
+            run(ticks)
+        finally:
+            gc.callbacks.remove(count_collections)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    ignored = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    stats = after.filter_traces(ignored).compare_to(before.filter_traces(ignored), "traceback")
+    net_blocks = sum(stat.count_diff for stat in stats)
+    net_bytes = sum(stat.size_diff for stat in stats)
+    offenders = [stat for stat in stats if stat.count_diff > 0][:TOP_OFFENDERS]
+    return AllocationReport(ticks, net_blocks, net_bytes, collections, offenders)
+
+
+def print_report(report):
+    color = Colors.GREEN if report.passed else Colors.RED
+    print(f"{color}{report.ticks} ticks: {report.net_blocks:+d} net blocks "
+          f"({report.net_blocks / report.ticks:+.4f} per tick), {report.net_bytes:+d} net bytes, "
+          f"{report.collections} GC collections{Colors.RESET}")
+    if report.passed:
+        return
+    for stat in report.offenders:
+        frame = stat.traceback[-1]
+        print(f"  {stat.count_diff:+6d} blocks {stat.size_diff:+8d} B  {frame.filename}:{frame.lineno}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that the control tick allocates nothing')
+    parser.add_argument('--ticks', type=int, default=DEFAULT_TICKS)
+    parser.add_argument('--transport', choices=(PYSERIAL, RAWFD), default=RAWFD,
+                        help='Serial transport driven by the ticks')
+    parser.add_argument('--traction', action='store_true', help='Also exercise the traction control path')
+    parser.add_argument('--session', action='store_true',
+                        help='Also record every tick to a session log (in a temporary directory)')
+    args = parser.parse_args()
+
+    pty = PtyTransport()
+    os.set_blocking(pty.peer_fd, False)
+    session_dir = tempfile.TemporaryDirectory() if args.session else None
+    controller = GamepadController(share_state="gamepad2car_alloc_check", serial_port=pty.peer_name,
+                                  session_dir=session_dir.name if session_dir else None)
+    if controller.serial_conn is not None:
+        controller.serial_conn.close()
+    controller.serial_conn = open_transport(args.transport, pty.peer_name, 115200)
+    if args.traction:
+        controller.config_manager.config["traction_control"]["enabled"] = True
+        controller.config_manager.update_settings()
+        controller.settings = controller.config_manager.settings
+
+    # Half throttle with some steering, no brake
+    controls = controller.settings.controls
+    axes = [0.0] * max(controls.throttle_axis, controls.steering_axis, controls.brake_axis, 5) + [0.0]
+    axes[controls.throttle_axis] = -0.5 if controller.settings.calibration.invert_throttle else 0.5
+    axes[controls.steering_axis] = 0.3
+    axes[controls.brake_axis] = -1.0
+    controller.joystick = controller.config_manager.joystick = ConstantJoystick(axes)
+
+    # Each command tick follows the input samples of its period, as in the running loop
+    performance = controller.settings.performance
+    samples = max(1, round(performance.input_rate_hz / performance.command_rate_hz))
+    timer = NullTickTimer()
+
+    clock = time.perf_counter
+
+    def tick():
+        for _ in range(samples):
+            controller.sample_tick()
+        tick_start = clock()
+        controller.control_tick(timer)
+        if controller.session is not None:
+            controller.record_session(tick_start, clock() - tick_start)
+
+    def drain(i):
+        if i % DRAIN_INTERVAL == 0:
+            try:
+                os.read(pty.peer_fd, 65536)
+            except BlockingIOError:
+                pass
+
+    try:
+        report = measure_ticks(tick, args.ticks, drain)
+    finally:
+        controller.serial_conn.close()
+        if controller.live_state is not None:
+            controller.live_state.close()
+        if controller.session is not None:
+            controller.session.close()
+            session_dir.cleanup()
+        pty.close()
+
+    print(f"\n{Colors.CYAN}=== Control tick allocations ({args.transport}"
+          f"{', traction control' if args.traction else ''}{', session log' if args.session else ''})"
+          f" ==={Colors.RESET}")
+    print_report(report)
+    return 0 if report.passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
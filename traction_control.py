@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+traction_control.py - Closed-loop launch/traction control for gamepad2car
+
+Limits how fast the throttle command may rise while the VESC reports the
+wheel accelerating faster than the surface can take. Feedback comes from
+GetValues (ERPM and motor current) at the control rate. All the work per
+tick is a handful of float operations, so it fits in the control loop's
+time budget.
+
+Run this file directly to compare simulated full-throttle launches on a
+loose surface with and without traction control, from standstill and right
+after releasing the brake. It exits with status 1 when traction control
+doesn't reduce the peak wheel slip of every launch.
+"""
+
+import math
+import sys
+
+# Smoothing factor of the wheel acceleration estimate (0..1, higher = less smoothing)
+ACCEL_FILTER = 0.5
+
+# Simulated launches run by main(): (label, seconds on the brake before launching)
+LAUNCHES = (
+    ("from standstill", 0.0),
+    ("brake then launch", 1.0),
+)
+# Before braking, the car creeps forward at this duty for CREEP_TIME (s)
+CREEP_THROTTLE = 0.2
+CREEP_TIME = 0.5
+BRAKE_CURRENT = 20.0  # A
+
+# Smallest reduction of the peak wheel slip traction control must achieve in simulation
+MIN_SLIP_REDUCTION = 0.2
+
+
+class TractionControl:
+    """Rate-limit throttle increases, and cut back while the wheel spins up too fast"""
+
+    def __init__(self, config, period):
+        self.config = config
+        self.period = period    # Command period (s): the longest step a single tick may rise by
+        self.reset()
+
+    def reset(self, output=0.0):
+        """Forget the feedback history; the limited command starts again from output"""
+        self.output = output
+        self.accel = 0.0
+        self.slipping = False
+        self.last_erpm = None
+        self.last_time = None
+
+    def update_feedback(self, erpm, current_motor, timestamp):
+        """Update the wheel acceleration estimate from a telemetry sample"""
+        if self.last_time is not None and timestamp > self.last_time:
+            raw_accel = (abs(erpm) - abs(self.last_erpm)) / (timestamp - self.last_time)
+            self.accel += ACCEL_FILTER * (raw_accel - self.accel)
+        self.last_erpm = erpm
+        self.last_time = timestamp
+
+        # Only a driven wheel can be spinning up: ignore coasting and braking
+        config = self.config
+        self.slipping = self.accel > config.max_wheel_accel and abs(current_motor) >= config.min_current
+
+    def limit(self, command, dt):
+        """Return the throttle command ([-1, 1]) allowed this tick"""
+        config = self.config
+        output = self.output
+        # A late tick, or the first one after a pause in throttle commands, rises by one period at most
+        if dt > self.period:
+            dt = self.period
+
+        # Reducing the command is never delayed
+        if command * output >= 0.0 and abs(command) <= abs(output):
+            self.output = command
+            return command
+
+        # A change of direction starts again from zero
+        if command * output < 0.0:
+            output = 0.0
+
+        magnitude = abs(output)
+        if self.slipping:
+            magnitude = magnitude * config.slip_cutback + config.slip_rise_rate * dt
+        else:
+            magnitude += config.rise_rate * dt
+
+        self.output = math.copysign(min(abs(command), magnitude), command)
+        return self.output
+
+
+def simulate_launch(config, params, enabled, duration=2.0, tick=0.01, throttle=1.0, brake_time=0.0):
+    """Simulate a full-duty launch; returns (distance, peak slip speed, time to 3 m/s).
+
+    With brake_time, the car first creeps forward, then holds the brake that
+    long and launches on release, as when lining up at the start. Braking
+    resets traction control, and the pause in throttle commands reaches
+    limit() as one long step on the first tick after release. Distance and
+    time are counted from the launch.
+    """
+    from vehicle_model import VehicleModel, DUTY, BRAKE
+
+    model = VehicleModel(params)
+    traction = TractionControl(config, tick)
+    feedback = None
+    last_command_time = None
+
+    def drive(command):
+        nonlocal feedback, last_command_time
+        if enabled:
+            # Feedback requested last tick arrives this tick, as with the real VESC
+            if feedback is not None:
+                traction.update_feedback(*feedback)
+            dt = model.time - last_command_time if last_command_time is not None else 0.0
+            last_command_time = model.time
+            command = traction.limit(command, dt)
+        state = model.step(tick, DUTY, command)
+        feedback = (state.erpm, state.current_motor, state.time)
+        return state
+
+    if brake_time:
+        for _ in range(int(CREEP_TIME / tick)):
+            drive(CREEP_THROTTLE)
+        for _ in range(int(brake_time / tick)):
+            model.step(tick, BRAKE, BRAKE_CURRENT)
+            traction.reset()
+
+    start_time = model.time
+    start_distance = model.distance
+    peak_slip = 0.0
+    time_to_speed = None
+    for _ in range(int(duration / tick)):
+        state = drive(throttle)
+        peak_slip = max(peak_slip, state.wheel_speed - state.speed)
+        if time_to_speed is None and state.speed >= 3.0:
+            time_to_speed = state.time - start_time
+    return model.distance - start_distance, peak_slip, time_to_speed
+
+
+def main():
+    from gamepad_config import Colors, DEFAULT_CONFIG, validate_config
+    from vehicle_model import VehicleParams
+
+    loose = VehicleParams(friction_coefficient=0.35)
+    # The spin threshold must sit close to the grip-limited acceleration of the
+    # surface (about 13000 ERPM/s here); on the car it is tuned the same way
+    config = validate_config(DEFAULT_CONFIG).traction_control._replace(max_wheel_accel=12000.0)
+
+    print(f"Simulated full-throttle launches on a loose surface (mu={loose.friction_coefficient}, "
+          f"spin threshold {config.max_wheel_accel:.0f} ERPM/s)")
+    failures = 0
+    for label, brake_time in LAUNCHES:
+        print(f"  {label}:")
+        peak_slips = {}
+        for enabled in (False, True):
+            distance, peak_slip, time_to_speed = simulate_launch(config, loose, enabled, brake_time=brake_time)
+            peak_slips[enabled] = peak_slip
+            reached = f"{time_to_speed:.2f} s" if time_to_speed is not None else "not reached"
+            print(f"    Traction control {'ON ' if enabled else 'OFF'}: peak wheel slip {peak_slip:.2f} m/s, "
+                  f"0-3 m/s {reached}, distance after 2 s {distance:.2f} m")
+        if peak_slips[True] > (1.0 - MIN_SLIP_REDUCTION) * peak_slips[False]:
+            failures += 1
+            print(f"    {Colors.RED}Traction control doesn't reduce the peak wheel slip by "
+                  f"{MIN_SLIP_REDUCTION:.0%}{Colors.RESET}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+vehicle_model.py - Simple motor and vehicle dynamics for offline testing
+
+Models a DC/BLDC motor driving a wheel through a reduction, a tyre with a
+traction limit and a point-mass vehicle. It is deliberately simple: good
+enough to show stopping response, wheel spin and telemetry-like values when
+no car is at hand, not to predict lap times.
+"""
+
+import math
+from typing import NamedTuple
+
+# Command kinds understood by VehicleModel.step
+DUTY = "duty"
+CURRENT = "current"
+BRAKE = "brake"
+RPM = "rpm"
+
+GRAVITY = 9.81
+
+
+class VehicleParams(NamedTuple):
+    """Physical parameters of the modelled car"""
+    mass: float = 3.0               # kg
+    wheel_radius: float = 0.05      # m
+    gear_ratio: float = 10.0        # motor turns per wheel turn
+    wheel_inertia: float = 0.004    # kg.m^2 at the wheel, including reflected motor inertia
+    motor_kv: float = 3000.0        # rpm per volt
+    motor_resistance: float = 0.05  # ohm
+    pole_pairs: int = 2             # ERPM = RPM x pole pairs
+    battery_voltage: float = 12.0   # V
+    current_limit: float = 60.0     # A
+    friction_coefficient: float = 0.8
+    peak_slip: float = 0.15         # slip ratio at which the tyre reaches full grip
+    sliding_grip: float = 0.7       # fraction of peak grip left once the tyre slides
+    drag: float = 0.1               # N per (m/s)^2
+    rolling_resistance: float = 0.3 # N
+    rpm_gain: float = 0.02          # A per ERPM of error for the RPM speed controller
+
+
+class VehicleState(NamedTuple):
+    """Snapshot of the model, with VESC-like telemetry fields"""
+    time: float
+    speed: float            # vehicle speed (m/s)
+    wheel_speed: float      # wheel surface speed (m/s)
+    distance: float         # m
+    erpm: float
+    current_motor: float    # A
+    current_in: float       # A
+    duty: float
+
+
+class VehicleModel:
+    """Two-mass model: the driven wheel and the vehicle, coupled by tyre grip"""
+
+    def __init__(self, params=VehicleParams(), substep=0.0005):
+        self.params = params
+        self.substep = substep
+        self.time = 0.0
+        self.speed = 0.0
+        self.wheel_speed = 0.0
+        self.distance = 0.0
+        self.current = 0.0
+        self.duty = 0.0
+        self.kt = 60.0 / (2.0 * math.pi * params.motor_kv)  # Nm per amp
+
+    @property
+    def motor_omega(self):
+        """Motor angular speed (rad/s)"""
+        return self.wheel_speed / self.params.wheel_radius * self.params.gear_ratio
+
+    @property
+    def erpm(self):
+        return self.motor_omega * 60.0 / (2.0 * math.pi) * self.params.pole_pairs
+
+    def motor_current(self, kind, value):
+        """Motor current (A) resulting from a VESC-style command at the current speed"""
+        p = self.params
+        omega = self.motor_omega
+        if kind == DUTY:
+            self.duty = max(-1.0, min(1.0, value))
+            back_emf = omega * self.kt
+            current = (self.duty * p.battery_voltage - back_emf) / p.motor_resistance
+        elif kind == CURRENT:
+            current = value
+        elif kind == BRAKE:
+            # Regenerative braking opposes rotation and fades out at standstill
+            if abs(omega) < 1.0:
+                current = -omega * abs(value)
+            else:
+                current = -math.copysign(abs(value), omega)
+        elif kind == RPM:
+            current = p.rpm_gain * (value - self.erpm)
+        else:
+            raise ValueError(f"Unknown command kind: {kind}")
+        current = max(-p.current_limit, min(p.current_limit, current))
+
+        if kind != DUTY:
+            # Duty the controller needs to drive this current at this speed
+            voltage = omega * self.kt + current * p.motor_resistance
+            self.duty = max(-1.0, min(1.0, voltage / p.battery_voltage))
+        return current
+
+    def step(self, dt, kind, value):
+        """Advance the model by dt seconds under a constant command; returns the new state"""
+        p = self.params
+        steps = max(1, int(round(dt / self.substep)))
+        h = dt / steps
+        normal_force = p.mass * GRAVITY
+        for _ in range(steps):
+            self.current = self.motor_current(kind, value)
+            wheel_torque = self.current * self.kt * p.gear_ratio
+
+            # Tyre force from slip ratio: rises to the traction limit at peak
+            # slip, then falls off towards sliding grip as the wheel spins
+            reference = max(abs(self.speed), abs(self.wheel_speed), 0.5)
+            slip = (self.wheel_speed - self.speed) / reference
+            ratio = abs(slip) / p.peak_slip
+            if ratio <= 1.0:
+                grip = ratio
+            else:
+                grip = max(p.sliding_grip, 1.0 - (1.0 - p.sliding_grip) * (ratio - 1.0) / 2.0)
+            tyre_force = math.copysign(p.friction_coefficient * normal_force * grip, slip)
+
+            resistance = p.drag * self.speed * abs(self.speed)
+            if abs(self.speed) > 0.01:
+                resistance += math.copysign(p.rolling_resistance, self.speed)
+
+            self.wheel_speed += (wheel_torque - tyre_force * p.wheel_radius) / p.wheel_inertia \
+                * p.wheel_radius * h
+            self.speed += (tyre_force - resistance) / p.mass * h
+            self.distance += self.speed * h
+            self.time += h
+        return self.state()
+
+    def state(self):
+        """Current VehicleState"""
+        return VehicleState(
+            time=self.time,
+            speed=self.speed,
+            wheel_speed=self.wheel_speed,
+            distance=self.distance,
+            erpm=self.erpm,
+            current_motor=self.current,
+            current_in=self.current * abs(self.duty),
+            duty=self.duty,
+        )
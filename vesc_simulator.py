@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+vesc_simulator.py - Software VESC on a pseudo-terminal
+
+Opens a pty that behaves like a VESC on a serial port: it decodes pyvesc
+frames (SetDutyCycle, SetRPM, SetCurrent, SetCurrentBrake, SetPosition,
+GetValues and firmware version requests), drives vehicle_model.VehicleModel
+in real time and answers GetValues with telemetry computed from the model.
+
+It keeps its own statistics (frame rate per message type, malformed and
+unknown frames, and the latency from a command change's arrival to its
+effect), printed once per second and optionally saved as JSON, so load
+tests and CI runs need no hardware. The model steps on a fixed
+PHYSICS_PERIOD grid whatever arrives, like the VESC's control loop; a
+command has taken effect once the model's duty, motor current or ERPM has
+reached the commanded value.
+
+Usage:
+    ./vesc_simulator.py --link /tmp/vesc-sim
+    ./gamepad2car.py --serial-port /tmp/vesc-sim
+"""
+
+import argparse
+import json
+import os
+import select
+import struct
+import sys
+import time
+from collections import Counter, deque
+
+from pyvesc import GetValues, SetDutyCycle, SetRPM, SetCurrent, SetCurrentBrake, SetPosition
+from pyvesc.messages.base import VESCMessage
+from pyvesc.packet.codec import frame, unframe
+
+from gamepad_config import Colors
+from vehicle_model import VehicleModel, VehicleParams, DUTY, RPM, CURRENT, BRAKE
+from vesc_transport import PtyTransport
+
+# Model integration period (s)
+PHYSICS_PERIOD = 0.001
+
+# Like the VESC's app timeout: release the motor when commands stop (s)
+COMMAND_TIMEOUT = 1.0
+
+# Number of recent command latencies kept for percentiles
+LATENCY_WINDOW = 10000
+
+# How close the model must come to a command for it to have taken effect: duty, amps,
+# and for RPM commands a fraction of the target with a floor in ERPM
+DUTY_TOLERANCE = 0.001
+CURRENT_TOLERANCE = 0.1
+RPM_TOLERANCE = 0.02
+RPM_TOLERANCE_FLOOR = 100.0
+
+# Simple thermal model of the power stage
+AMBIENT_TEMP = 25.0
+FET_HEATING = 0.002     # degC/s per A^2
+FET_COOLING = 0.05      # 1/s
+
+# Battery internal resistance used for voltage sag (ohm)
+BATTERY_RESISTANCE = 0.03
+
+# Firmware version request (not in pyvesc) and the version reported
+COMM_FW_VERSION = 0
+FIRMWARE_VERSION = (5, 3)
+HARDWARE_NAME = b"VESC-SIM"
+
+COMMANDS = {
+    SetDutyCycle: (DUTY, lambda msg: msg.duty_cycle / 100000.0),
+    SetRPM: (RPM, lambda msg: msg.rpm),
+    SetCurrent: (CURRENT, lambda msg: msg.current / 1000.0),
+    SetCurrentBrake: (BRAKE, lambda msg: msg.current_brake / 1000.0),
+}
+
+GET_VALUES_FORMAT = ">B" + "".join(field[1] for field in GetValues.fields)
+
+
+def frame_size(payload):
+    """Length of the VESC frame carrying payload (start byte, length, payload, CRC, end byte)"""
+    return len(payload) + (2 if len(payload) < 256 else 3) + 3
+
+
+class SimulatorStats:
+    """Frame counters and command-to-effect latencies"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.frames = Counter()
+        self.bytes = 0
+        self.malformed = 0
+        self.unknown = 0
+        self.replies = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.superseded = 0     # command changes replaced by another before taking effect
+        self.not_reached = 0    # the last command change, if it never took effect
+        self._window_start = self.started
+        self._window_frames = 0
+        self.frame_rate = 0.0
+
+    def count_frame(self, name):
+        self.frames[name] += 1
+        self._window_frames += 1
+
+    def tick(self, now):
+        """Update the frame rate once per second; returns True when a new second started"""
+        elapsed = now - self._window_start
+        if elapsed < 1.0:
+            return False
+        self.frame_rate = self._window_frames / elapsed
+        self._window_frames = 0
+        self._window_start = now
+        return True
+
+    def summary(self):
+        """Statistics as a JSON-friendly dict"""
+        ordered = sorted(self.latencies)
+        elapsed = time.monotonic() - self.started
+        total = sum(self.frames.values())
+
+        def pct(fraction):
+            return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000 if ordered else 0.0
+
+        return {
+            "elapsed_s": elapsed,
+            "frames": dict(self.frames),
+            "frames_total": total,
+            "frame_rate_hz": total / elapsed if elapsed > 0 else 0.0,
+            "bytes": self.bytes,
+            "malformed": self.malformed,
+            "unknown": self.unknown,
+            "get_values_replies": self.replies,
+            "command_latency_ms": {
+                "mean": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+                "p50": pct(0.50),
+                "p99": pct(0.99),
+                "max": ordered[-1] * 1000 if ordered else 0.0,
+                "samples": len(ordered),
+                "superseded": self.superseded,
+                "not_reached": self.not_reached,
+            },
+        }
+
+
+class VescSimulator:
+    """A VESC on the far end of a pty"""
+
+    def __init__(self, params=VehicleParams()):
+        self.model = VehicleModel(params)
+        self.params = params
+        self.pty = PtyTransport()
+        self.fd = self.pty.peer_fd
+        self.stats = SimulatorStats()
+        self.buffer = bytearray()
+
+        self.kind = CURRENT
+        self.value = 0.0
+        self.position = 0.0
+        self.last_command = None
+        self.pending = None         # (arrival, kind, value) of the last command change, until it takes effect
+
+        # Accumulated telemetry
+        self.temp_fet = AMBIENT_TEMP
+        self.amp_hours = 0.0
+        self.amp_hours_charged = 0.0
+        self.watt_hours = 0.0
+        self.watt_hours_charged = 0.0
+        self.tachometer = 0.0
+        self.tachometer_abs = 0.0
+
+    @property
+    def port_name(self):
+        """Path the controller should open"""
+        return self.pty.peer_name
+
+    def close(self):
+        self.pty.close()
+        # A command change still waiting for its effect when the simulator stops
+        if self.pending is not None:
+            self.stats.not_reached += 1
+            self.pending = None
+
+    def receive(self, data, arrival):
+        """Decode every complete frame in the receive buffer"""
+        self.stats.bytes += len(data)
+        self.buffer.extend(data)
+        while self.buffer:
+            # pyvesc skips corrupt bytes up to the next frame that checks out
+            payload, consumed = unframe(bytes(self.buffer))
+            if consumed == 0:
+                break
+            del self.buffer[:consumed]
+            if payload is None or consumed > frame_size(payload):
+                self.stats.malformed += 1
+            if payload is not None:
+                self.handle_payload(payload, arrival)
+
+    def handle_payload(self, payload, arrival):
+        """Apply one decoded frame"""
+        # Requests are answered at once from the model's latest step, without stepping it early
+        if payload[0] == GetValues.id and len(payload) == 1:
+            self.stats.count_frame("GetValues")
+            os.write(self.fd, self.get_values_reply())
+            self.stats.replies += 1
+            return
+        if payload[0] == COMM_FW_VERSION and len(payload) == 1:
+            self.stats.count_frame("GetVersion")
+            os.write(self.fd, self.version_reply())
+            return
+        try:
+            msg = VESCMessage.unpack(payload)
+        except KeyError:
+            self.stats.unknown += 1
+            return
+        except struct.error:
+            self.stats.malformed += 1
+            return
+
+        name = type(msg).__name__
+        if type(msg) in COMMANDS:
+            kind, convert = COMMANDS[type(msg)]
+            value = convert(msg)
+            # Only a change of command has an effect to wait for; a repeat doesn't restart the clock
+            if (kind, value) != (self.kind, self.value):
+                if self.pending is not None:
+                    self.stats.superseded += 1
+                self.pending = (arrival, kind, value)
+            self.kind = kind
+            self.value = value
+            self.last_command = time.monotonic()
+        elif isinstance(msg, SetPosition):
+            self.position = msg.pos
+        else:
+            self.stats.unknown += 1
+            return
+        self.stats.count_frame(name)
+
+    def step(self, dt, now):
+        """Advance the model and the accumulated telemetry"""
+        if self.last_command is not None and now - self.last_command > COMMAND_TIMEOUT:
+            # Commands stopped: release the motor like the VESC's timeout does
+            self.kind, self.value = CURRENT, 0.0
+            self.last_command = None
+        state = self.model.step(dt, self.kind, self.value)
+
+        self.temp_fet += (FET_HEATING * state.current_motor ** 2
+                          - FET_COOLING * (self.temp_fet - AMBIENT_TEMP)) * dt
+        voltage = self.voltage(state)
+        charge = state.current_in * dt / 3600.0
+        if charge >= 0:
+            self.amp_hours += charge
+            self.watt_hours += charge * voltage
+        else:
+            self.amp_hours_charged -= charge
+            self.watt_hours_charged -= charge * voltage
+        # The VESC's tachometer counts 6 steps per electrical revolution
+        steps = state.erpm / 60.0 * 6.0 * dt
+        self.tachometer += steps
+        self.tachometer_abs += abs(steps)
+
+        if self.pending is not None and self.reached(state, *self.pending[1:]):
+            self.stats.latencies.append(time.perf_counter() - self.pending[0])
+            self.pending = None
+        return state
+
+    def reached(self, state, kind, value):
+        """Whether the model state shows the effect of a (kind, value) command"""
+        limit = self.params.current_limit
+        if kind == DUTY:
+            return abs(state.duty - max(-1.0, min(1.0, value))) <= DUTY_TOLERANCE
+        if kind == CURRENT:
+            return abs(state.current_motor - max(-limit, min(limit, value))) <= CURRENT_TOLERANCE
+        if kind == BRAKE:
+            # The brake opposes rotation, so only its magnitude is known in advance
+            return abs(abs(state.current_motor) - min(limit, abs(value))) <= CURRENT_TOLERANCE
+        return abs(state.erpm - value) <= max(RPM_TOLERANCE * abs(value), RPM_TOLERANCE_FLOOR)
+
+    def voltage(self, state):
+        return self.params.battery_voltage - state.current_in * BATTERY_RESISTANCE
+
+    def get_values_reply(self):
+        """Frame a GetValues reply from the current model state"""
+        state = self.model.state()
+        temp_pcb = AMBIENT_TEMP + (self.temp_fet - AMBIENT_TEMP) * 0.5
+        values = {
+            "temp_mos1": self.temp_fet, "temp_mos2": self.temp_fet, "temp_mos3": self.temp_fet,
+            "temp_mos4": self.temp_fet, "temp_mos5": self.temp_fet, "temp_mos6": self.temp_fet,
+            "temp_pcb": temp_pcb,
+            "current_motor": state.current_motor,
+            "current_in": state.current_in,
+            "duty_now": state.duty,
+            "rpm": state.erpm,
+            "v_in": self.voltage(state),
+            "amp_hours": self.amp_hours,
+            "amp_hours_charged": self.amp_hours_charged,
+            "watt_hours": self.watt_hours,
+            "watt_hours_charged": self.watt_hours_charged,
+            "tachometer": self.tachometer,
+            "tachometer_abs": self.tachometer_abs,
+        }
+        fields = []
+        for field in GetValues.fields[:-1]:
+            name, scale = field[0], field[2] if len(field) > 2 else 1
+            fields.append(int(round(values[name] * scale)))
+        # pyvesc can't encode the trailing fault code field, so pack the payload here
+        return frame(struct.pack(GET_VALUES_FORMAT, GetValues.id, *fields, b"\x00"))
+
+    def version_reply(self):
+        """Frame a firmware version reply: version, hardware name and a zero UUID"""
+        return frame(bytes([COMM_FW_VERSION, *FIRMWARE_VERSION]) + HARDWARE_NAME + b"\x00" + bytes(12))
+
+    def run(self, duration=None, quiet=False):
+        """Serve until interrupted or for duration seconds"""
+        start = last_step = time.monotonic()
+        next_step = start + PHYSICS_PERIOD
+        while duration is None or time.monotonic() - start < duration:
+            timeout = max(0.0, next_step - time.monotonic())
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+            if readable:
+                try:
+                    data = os.read(self.fd, 4096)
+                except OSError:
+                    data = b""
+                if data:
+                    self.receive(data, time.perf_counter())
+
+            # Commands take effect at the next step of the fixed grid, never earlier
+            now = time.monotonic()
+            if now >= next_step:
+                state = self.step(now - last_step, now)
+                last_step = now
+                next_step += PHYSICS_PERIOD
+                if next_step <= now:
+                    # Fell behind: skip the missed steps instead of running them in a burst
+                    next_step = now + PHYSICS_PERIOD
+
+                if self.stats.tick(now) and not quiet:
+                    print(f"\r{self.stats.frame_rate:7.1f} frames/s | {self.kind} {self.value:+8.3f} | "
+                          f"{state.speed:5.2f} m/s {state.erpm:8.0f} ERPM {state.current_motor:+6.1f} A | "
+                          f"malformed {self.stats.malformed}\033[K", end="", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulated VESC on a pseudo-terminal')
+    parser.add_argument('--link', metavar='PATH', help='Create a symlink to the pty (e.g. /tmp/vesc-sim)')
+    parser.add_argument('--duration', type=float, help='Stop after this many seconds (for CI)')
+    parser.add_argument('--stats-json', metavar='PATH', help='Write the final statistics to a JSON file')
+    parser.add_argument('--friction', type=float, default=VehicleParams().friction_coefficient,
+                        help='Tyre friction coefficient of the simulated surface')
+    parser.add_argument('--quiet', action='store_true', help='No per-second status line')
+    args = parser.parse_args()
+
+    simulator = VescSimulator(VehicleParams(friction_coefficient=args.friction))
+    port = simulator.port_name
+    if args.link:
+        if os.path.islink(args.link):
+            os.unlink(args.link)
+        os.symlink(port, args.link)
+        port = f"{args.link} -> {simulator.port_name}"
+    print(f"{Colors.GREEN}Simulated VESC on {port}{Colors.RESET}")
+    print("Ctrl+C: Quit")
+
+    try:
+        simulator.run(args.duration, args.quiet)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.close()
+        if args.link and os.path.islink(args.link):
+            os.unlink(args.link)
+
+    summary = simulator.stats.summary()
+    latency = summary["command_latency_ms"]
+    print(f"\n{Colors.CYAN}=== Simulator statistics ==={Colors.RESET}")
+    print(f"Frames: {summary['frames_total']} ({summary['frame_rate_hz']:.1f}/s) "
+          + ", ".join(f"{name} {count}" for name, count in sorted(summary["frames"].items())))
+    print(f"Malformed: {summary['malformed']}, unknown: {summary['unknown']}, "
+          f"GetValues replies: {summary['get_values_replies']}")
+    print(f"Command to effect ({latency['samples']} changes): mean {latency['mean']:.3f} ms, "
+          f"p50 {latency['p50']:.3f} ms, p99 {latency['p99']:.3f} ms, max {latency['max']:.3f} ms; "
+          f"superseded before taking effect {latency['superseded']}, not reached {latency['not_reached']}")
+    if args.stats_json:
+        with open(args.stats_json, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
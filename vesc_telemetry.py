@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+vesc_telemetry.py - Background VESC telemetry polling for gamepad2car
+
+This module provides:
+1. A Telemetry record built from the VESC's GetValues reply
+2. A poller thread that requests GetValues as fast as the VESC answers
+3. Decimation of the samples to the rate a display actually needs
+"""
+
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import pyvesc
+from pyvesc import GetValues
+from serial import Serial, SerialException
+
+# Upper bound on the request rate; the VESC's answer time is usually the real limit
+TELEMETRY_MAX_RATE_HZ = 500
+
+# Time to wait for a GetValues reply before counting it as lost (s)
+TELEMETRY_TIMEOUT = 0.1
+
+GET_VALUES_REQUEST = pyvesc.encode_request(GetValues)
+
+
+class Telemetry(NamedTuple):
+    """One decoded GetValues sample"""
+    timestamp: float
+    rpm: float
+    current_motor: float
+    current_in: float
+    duty: float
+    voltage: float
+    temp_fet: float
+    temp_motor: Optional[float]
+    fault_code: int
+
+
+class TelemetryWindow(NamedTuple):
+    """Telemetry decimated over one display period"""
+    latest: Telemetry
+    mean: Telemetry
+    peak_current_motor: float
+    samples: int
+    rate_hz: float
+
+
+def telemetry_from_message(msg, timestamp):
+    """Build a Telemetry record from a decoded GetValues message.
+
+    The FET temperature is the hottest MOSFET sensor. Firmware layouts
+    decoded by pyvesc without a motor sensor field report temp_motor as None.
+    """
+    temp_fet = max(msg.temp_mos1, msg.temp_mos2, msg.temp_mos3,
+                   msg.temp_mos4, msg.temp_mos5, msg.temp_mos6)
+    fault = msg.mc_fault_code
+    if isinstance(fault, bytes):
+        fault = fault[0] if fault else 0
+    return Telemetry(
+        timestamp=timestamp,
+        rpm=msg.rpm,
+        current_motor=msg.current_motor,
+        current_in=msg.current_in,
+        duty=msg.duty_now,
+        voltage=msg.v_in,
+        temp_fet=temp_fet,
+        temp_motor=getattr(msg, "temp_motor", None),
+        fault_code=fault,
+    )
+
+
+def read_message(port, buffer, timeout, wanted=GetValues):
+    """Read from port into buffer until a message of the wanted type is decoded.
+
+    Other messages are skipped and corrupt bytes discarded. Returns the message
+    or None when the timeout expires.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        while buffer:
+            try:
+                msg, consumed = pyvesc.decode(bytes(buffer))
+            except ValueError:
+                # Corrupt frame: drop a byte and resynchronise on the next start byte
+                del buffer[:1]
+                continue
+            if consumed == 0:
+                break
+            del buffer[:consumed]
+            if isinstance(msg, wanted):
+                return msg
+
+        if time.monotonic() >= deadline:
+            return None
+        data = port.read(port.in_waiting or 1)
+        if data:
+            buffer.extend(data)
+
+
+class FeedbackReader:
+    """Non-blocking GetValues exchange for use inside a control loop.
+
+    request() sends a GetValues request; poll() decodes whatever reply bytes
+    have already arrived without waiting, so the loop never blocks on the
+    VESC. Feedback therefore lags one control tick behind the request.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.latest = None
+        self.replies = 0
+
+    def request(self, port):
+        """Ask the VESC for a new GetValues reply; returns the number of bytes written"""
+        port.write(GET_VALUES_REQUEST)
+        return len(GET_VALUES_REQUEST)
+
+    def poll(self, port):
+        """Decode any complete replies already received; returns the latest Telemetry or None"""
+        waiting = port.in_waiting
+        if waiting:
+            self.buffer.extend(port.read(waiting))
+        msg = read_message(port, self.buffer, 0.0) if self.buffer else None
+        while msg is not None:
+            self.latest = telemetry_from_message(msg, time.monotonic())
+            self.replies += 1
+            msg = read_message(port, self.buffer, 0.0) if self.buffer else None
+        return self.latest
+
+
+class TelemetryPoller:
+    """Poll GetValues in a background thread and decimate for display.
+
+    Samples are accumulated under a small lock; take() returns the latest
+    value, the mean and the motor current peak since the previous take()
+    and resets the window, so the display sees every sample without having
+    to run at the sampling rate.
+    """
+
+    def __init__(self, serial_port, baud_rate, max_rate_hz=TELEMETRY_MAX_RATE_HZ):
+        self.serial_port = serial_port
+        self.baud_rate = baud_rate
+        self.period = 1.0 / max_rate_hz
+        self.error = None
+        self.samples = 0
+        self.timeouts = 0
+
+        self._lock = threading.Lock()
+        self._latest = None
+        self._reset_window()
+        self._window_start = time.monotonic()
+        self._running = False
+        self._thread = None
+        self._port = None
+
+    def _reset_window(self):
+        self._sums = [0.0] * 7
+        self._count = 0
+        self._peak_current = 0.0
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        """Open the serial port and start polling. Returns False if the port can't be opened."""
+        if self._running:
+            return True
+        try:
+            self._port = Serial(self.serial_port, self.baud_rate, timeout=TELEMETRY_TIMEOUT)
+        except SerialException as e:
+            self.error = str(e)
+            return False
+        self.error = None
+        self._running = True
+        self._window_start = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="TelemetryPoller", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Stop polling and close the serial port"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self._port is not None:
+            self._port.close()
+            self._port = None
+
+    def _run(self):
+        """Polling loop"""
+        buffer = bytearray()
+        next_request = time.monotonic()
+        while self._running:
+            try:
+                self._port.write(GET_VALUES_REQUEST)
+                msg = read_message(self._port, buffer, TELEMETRY_TIMEOUT)
+            except (SerialException, OSError) as e:
+                self.error = str(e)
+                self._running = False
+                break
+
+            if msg is None:
+                self.timeouts += 1
+                buffer.clear()
+            else:
+                self._record(telemetry_from_message(msg, time.monotonic()))
+
+            next_request += self.period
+            delay = next_request - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_request = time.monotonic()
+
+    def _record(self, sample):
+        """Add a sample to the current display window"""
+        with self._lock:
+            self._latest = sample
+            sums = self._sums
+            sums[0] += sample.rpm
+            sums[1] += sample.current_motor
+            sums[2] += sample.current_in
+            sums[3] += sample.duty
+            sums[4] += sample.voltage
+            sums[5] += sample.temp_fet
+            sums[6] += sample.temp_motor or 0.0
+            self._count += 1
+            if abs(sample.current_motor) > abs(self._peak_current):
+                self._peak_current = sample.current_motor
+        self.samples += 1
+
+    def take(self):
+        """Return the TelemetryWindow since the last call, or None if nothing new arrived"""
+        now = time.monotonic()
+        with self._lock:
+            count = self._count
+            if count == 0:
+                return None
+            latest = self._latest
+            sums = self._sums
+            peak = self._peak_current
+            elapsed = now - self._window_start
+            self._window_start = now
+            self._reset_window()
+
+        mean = Telemetry(
+            timestamp=latest.timestamp,
+            rpm=sums[0] / count,
+            current_motor=sums[1] / count,
+            current_in=sums[2] / count,
+            duty=sums[3] / count,
+            voltage=sums[4] / count,
+            temp_fet=sums[5] / count,
+            temp_motor=sums[6] / count if latest.temp_motor is not None else None,
+            fault_code=latest.fault_code,
+        )
+        rate = count / elapsed if elapsed > 0 else 0.0
+        return TelemetryWindow(latest, mean, peak, count, rate)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+vesc_transport.py - Serial transports for talking to the VESC
+
+Every transport offers the subset of the pyserial interface the rest of
+the code uses (write, read, in_waiting, is_open, close), so the control
+loop and the telemetry readers work with any of them:
+
+1. PySerialTransport: pyserial, the portable default
+2. RawFdTransport: a termios-configured file descriptor written with
+   os.write, skipping pyserial's per-call Python checks; the port is put
+   in raw mode and, where the driver supports it, low-latency mode
+3. PtyTransport: a pseudo-terminal pair for tests and simulators; the
+   test talks to peer_fd as if it were the VESC
+
+Run this file with `bench` to measure the per-write overhead of each backend.
+"""
+
+import argparse
+import array
+import errno
+import fcntl
+import os
+import select
+import statistics
+import struct
+import sys
+import termios
+import threading
+import time
+import tty
+
+from serial import Serial
+
+# Transports selectable through performance.serial_transport
+PYSERIAL = "pyserial"
+RAWFD = "rawfd"
+
+# Linux serial driver flag asking for low-latency (no batching) operation
+ASYNC_LOW_LATENCY = 0x2000
+TIOCGSERIAL = 0x541E
+TIOCSSERIAL = 0x541F
+# struct serial_struct is read and written back whole, as opaque ints (as
+# pyserial does): 32 ints cover it on every ABI, and flags is the fifth one
+SERIAL_STRUCT_INTS = 32
+SERIAL_FLAGS_INDEX = 4
+
+
+class PySerialTransport:
+    """pyserial backend"""
+
+    name = PYSERIAL
+
+    def __init__(self, port, baud_rate, timeout=0.05):
+        self.serial = Serial(port, baud_rate, timeout=timeout)
+        self.write = self.serial.write
+        self.read = self.serial.read
+
+    @property
+    def in_waiting(self):
+        return self.serial.in_waiting
+
+    @property
+    def is_open(self):
+        return self.serial.is_open
+
+    def close(self):
+        self.serial.close()
+
+
+class RawFdTransport:
+    """Raw file descriptor backend.
+
+    The fd is non-blocking: write() only waits when the kernel buffer is
+    full, and read() waits up to the timeout for the first byte like
+    pyserial does.
+    """
+
+    name = RAWFD
+
+    def __init__(self, port, baud_rate, timeout=0.05, fd=None):
+        self.timeout = timeout
+        self.fd = fd if fd is not None else os.open(port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            configure_raw(self.fd, baud_rate)
+        except (termios.error, OSError):
+            os.close(self.fd)
+            raise
+        self.low_latency = set_low_latency(self.fd)
+
+    def write(self, data):
+        """Write all of data; returns the number of bytes written"""
+        total = len(data)
+        try:
+            # Usually the whole packet fits in the kernel buffer at once
+            written = os.write(self.fd, data)
+        except BlockingIOError:
+            written = 0
+        if written == total:
+            return total
+        view = memoryview(data)
+        while written < total:
+            try:
+                written += os.write(self.fd, view[written:])
+            except BlockingIOError:
+                select.select([], [self.fd], [], self.timeout)
+        return total
+
+    def read(self, size=1):
+        """Read up to size bytes, waiting up to the timeout for the first one"""
+        try:
+            return os.read(self.fd, size)
+        except BlockingIOError:
+            pass
+        readable, _, _ = select.select([self.fd], [], [], self.timeout)
+        if not readable:
+            return b""
+        try:
+            return os.read(self.fd, size)
+        except BlockingIOError:
+            return b""
+
+    @property
+    def in_waiting(self):
+        return struct.unpack("i", fcntl.ioctl(self.fd, termios.FIONREAD, b"\0\0\0\0"))[0]
+
+    @property
+    def is_open(self):
+        return self.fd is not None
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class PtyTransport(RawFdTransport):
+    """Pseudo-terminal backend for tests: the other end is peer_fd"""
+
+    name = "pty"
+
+    def __init__(self, baud_rate=115200, timeout=0.05):
+        self.peer_fd, fd = os.openpty()
+        tty.setraw(self.peer_fd)
+        os.set_blocking(fd, False)
+        self.peer_name = os.ttyname(fd)
+        super().__init__(self.peer_name, baud_rate, timeout, fd=fd)
+
+    def close(self):
+        super().close()
+        if self.peer_fd is not None:
+            os.close(self.peer_fd)
+            self.peer_fd = None
+
+
+def configure_raw(fd, baud_rate):
+    """Put a tty in raw 8N1 mode at baud_rate, with reads returning immediately"""
+    attrs = termios.tcgetattr(fd)
+    iflag, oflag, cflag, lflag, ispeed, ospeed, cc = attrs
+    iflag &= ~(termios.IGNBRK | termios.BRKINT | termios.PARMRK | termios.ISTRIP | termios.INLCR
+               | termios.IGNCR | termios.ICRNL | termios.IXON | termios.IXOFF | termios.IXANY)
+    oflag &= ~termios.OPOST
+    lflag &= ~(termios.ECHO | termios.ECHONL | termios.ICANON | termios.ISIG | termios.IEXTEN)
+    cflag &= ~(termios.CSIZE | termios.PARENB | termios.CSTOPB)
+    cflag |= termios.CS8 | termios.CREAD | termios.CLOCAL
+    if hasattr(termios, "CRTSCTS"):
+        cflag &= ~termios.CRTSCTS
+    speed = getattr(termios, f"B{baud_rate}", None)
+    if speed is None:
+        raise OSError(errno.EINVAL, f"Unsupported baud rate for the raw transport: {baud_rate}")
+    cc[termios.VMIN] = 0
+    cc[termios.VTIME] = 0
+    termios.tcsetattr(fd, termios.TCSANOW, [iflag, oflag, cflag, lflag, speed, speed, cc])
+
+
+def set_low_latency(fd):
+    """Ask a Linux serial driver for low-latency mode; returns True if it was set"""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        # Only the flags are changed: every other field, including the port's
+        # I/O mapping pointers, goes back to the driver exactly as it was read
+        buf = array.array("i", [0] * SERIAL_STRUCT_INTS)
+        fcntl.ioctl(fd, TIOCGSERIAL, buf)
+        buf[SERIAL_FLAGS_INDEX] |= ASYNC_LOW_LATENCY
+        fcntl.ioctl(fd, TIOCSSERIAL, buf)
+        return True
+    except OSError:
+        # USB CDC-ACM ports (the VESC's usual link) and ptys don't support it
+        return False
+
+
+def open_transport(kind, port, baud_rate, timeout=0.05):
+    """Open a transport by configuration name; raises OSError (or SerialException) on failure"""
+    if kind == PYSERIAL:
+        return PySerialTransport(port, baud_rate, timeout)
+    if kind == RAWFD:
+        return RawFdTransport(port, baud_rate, timeout)
+    raise ValueError(f"Unknown serial transport: {kind}")
+
+
+def benchmark(count):
+    """Time count writes of a drive command packet through each backend, over a pty"""
+    # The controller's own encoding: its duty cycle strategy's preallocated packet
+    from gamepad2car import CommandEncoder, compile_strategies
+    from gamepad_config import DEFAULT_CONFIG, validate_config
+
+    performance = validate_config(DEFAULT_CONFIG).performance
+    strategy = compile_strategies(performance, CommandEncoder())["duty_cycle"]
+    packet = bytes(strategy.encode(0.5))
+    results = {}
+    for label in ("pyserial", "rawfd", "pty"):
+        pty = PtyTransport()
+        running = True
+
+        def drain():
+            # Keep the pty buffer empty so writes never block
+            while running:
+                readable, _, _ = select.select([pty.peer_fd], [], [], 0.05)
+                if readable:
+                    try:
+                        os.read(pty.peer_fd, 65536)
+                    except OSError:
+                        return
+
+        reader = threading.Thread(target=drain, daemon=True)
+        reader.start()
+        if label == "pyserial":
+            transport = PySerialTransport(pty.peer_name, 115200)
+        elif label == "rawfd":
+            transport = RawFdTransport(pty.peer_name, 115200)
+        else:
+            transport = pty
+
+        write = transport.write
+        durations = []
+        clock = time.perf_counter
+        for _ in range(count):
+            start = clock()
+            write(packet)
+            durations.append(clock() - start)
+            if len(durations) % 64 == 0:
+                time.sleep(0.0005)
+
+        running = False
+        reader.join()
+        if transport is not pty:
+            transport.close()
+        pty.close()
+        durations.sort()
+        results[label] = durations
+
+    print(f"Per-write overhead, {count} writes of a {len(packet)}-byte SetDutyCycle packet over a pty:")
+    print(f"  {'backend':<10}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+    for label, durations in results.items():
+        print(f"  {label:<10}{statistics.mean(durations) * 1e6:>10.2f}{durations[len(durations) // 2] * 1e6:>10.2f}"
+              f"{durations[int(len(durations) * 0.99)] * 1e6:>10.2f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='VESC serial transports')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    bench = subparsers.add_parser('bench', help='Measure per-write overhead of each backend')
+    bench.add_argument('--count', type=int, default=20000, help='Writes per backend')
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        benchmark(args.count)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())